@@ -1,12 +1,39 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, abort, g
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
 import jwt
 from functools import wraps
+from http_cache import conditional
+from identity import TokenMemo
+from security import limiter, parse_limit, login_throttle, sanitize_input
+import resumable
+from resumable import UploadError
 
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
+@api_bp.before_request
+def api_rate_limit():
+    """Satu bucket per klien untuk seluruh API, statistik punya bucket sendiri"""
+    if request.endpoint == 'api.api_stream':
+        return None  # long-lived, reconnects are paced by the retry field
+    name = 'RATELIMIT_STATS' if request.endpoint == 'api.api_get_stats' else 'RATELIMIT_API'
+    return limiter.check(*parse_limit(current_app.config[name]), scope=name[10:].lower())
+
+# Decoded tokens, so repeat calls skip the HMAC check
+tokens = TokenMemo(lambda token, key: jwt.decode(token, key, algorithms=["HS256"]))
+
+def token_user_id(token):
+    """User id of a valid token, None otherwise (rate-limit key)"""
+    try:
+        return tokens.get(token, current_app.config['SECRET_KEY'])['user_id']
+    except Exception:
+        return None
+
+limiter.token_user = token_user_id
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -22,13 +49,14 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token missing'}), 401
         
+        # Import at runtime to avoid circular imports
+        from app import get_identity
         try:
-            # Import models at runtime to avoid circular imports
-            from app import db, Report, Category, User, Comment
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user_id = data['user_id']
-            current_user = User.query.get(current_user_id)
-        except:
+            data = tokens.get(token, current_app.config['SECRET_KEY'])
+            current_user = get_identity(data['user_id'])
+        except Exception:
+            current_user = None
+        if current_user is None:
             return jsonify({'message': 'Token invalid'}), 401
         
         return f(current_user, *args, **kwargs)
@@ -39,15 +67,27 @@ def token_required(f):
 @api_bp.route('/auth/login', methods=['POST'])
 def api_login():
     """API Login endpoint"""
-    from app import db, Report, Category, User, Comment
+    from app import db, Report, Category, User, Comment, authenticate
     data = request.get_json()
     
-    if not data or not data.get('username') or not data.get('password'):
+    if not isinstance(data, dict) or not data.get('username') or not data.get('password'):
         return jsonify({'message': 'Username and password required'}), 400
-    
-    user = User.query.filter_by(username=data['username']).first()
-    
-    if user and user.check_password(data['password']):
+    if not isinstance(data['username'], str) or not isinstance(data['password'], str):
+        return jsonify({'message': 'Username and password must be strings'}), 400
+    
+    # Rejected before any hashing work
+    client_ip = limiter.client_ip()
+    wait = login_throttle.retry_after(data['username'], client_ip)
+    if wait:
+        response = jsonify({'message': 'Too many failed login attempts'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(wait)
+        return response
+    
+    user = authenticate(data['username'], data['password'])
+    
+    if user:
+        login_throttle.succeeded(data['username'])
         token = jwt.encode({
             'user_id': user.id,
             'exp': datetime.utcnow() + timedelta(hours=24)
@@ -64,12 +104,13 @@ def api_login():
             }
         }), 200
     
+    login_throttle.failed(data['username'], client_ip)
     return jsonify({'message': 'Invalid credentials'}), 401
 
 @api_bp.route('/auth/register', methods=['POST'])
 def api_register():
     """API Registration endpoint"""
-    from app import db, Report, Category, User, Comment
+    from app import db, Report, Category, User, Comment, invalidate_cache, publish_user_registered, hasher
     data = request.get_json()
     
     required_fields = ['username', 'email', 'password', 'full_name']
@@ -89,123 +130,133 @@ def api_register():
         email=data['email'],
         full_name=data['full_name'],
         phone=data.get('phone', ''),
-        password_hash=generate_password_hash(data['password'])
+        password_hash=hasher.hash(data['password'])
     )
     
     db.session.add(user)
     db.session.commit()
+    invalidate_cache('stats')
+    publish_user_registered()
     
     return jsonify({'message': 'User created successfully'}), 201
 
 # Reports Endpoints
+def report_list_args():
+    """page, per_page, status dan category_id dari query string"""
+    return (request.args.get('page', 1, type=int), request.args.get('per_page', 10, type=int),
+            request.args.get('status'), request.args.get('category_id', type=int))
+
+def report_fields_arg():
+    """Nama field dari ?fields= (urut, tanpa duplikat), None jika tidak diminta"""
+    value = request.args.get('fields')
+    if value is None:
+        return None
+    return tuple(sorted({name.strip() for name in value.split(',') if name.strip()}))
+
+def report_list_key(page, per_page, status, category_id, fields=None):
+    key = f'reports:v1:{page}:{per_page}:{status}:{category_id}'
+    return key if fields is None else f"{key}:{','.join(fields)}"
+
+def report_detail_key(report_id, fields=None):
+    key = f'report:{report_id}:detail'
+    return key if fields is None else f"{key}:{','.join(fields)}"
+
+def cached_report_details(report_ids, fields=None):
+    """({id: detail} yang ada di cache, id yang belum)"""
+    from app import cache
+    payloads = {}
+    for report_id in report_ids:
+        payload = cache.get(report_detail_key(report_id, fields))
+        if payload is not None:
+            payloads[report_id] = payload
+    return payloads, [report_id for report_id in report_ids if report_id not in payloads]
+
+def cache_report_details(payloads, fields=None):
+    from app import cache
+    for report_id, payload in payloads.items():
+        cache.set(report_detail_key(report_id, fields), payload, tags=(f'report:{report_id}', 'category'))
+
+def reports_by_id_payload(report_ids, payloads):
+    """Detail laporan dalam urutan ?ids= dan id yang tidak ditemukan"""
+    return {
+        'reports': [payloads[report_id] for report_id in report_ids if report_id in payloads],
+        'missing': [report_id for report_id in report_ids if report_id not in payloads]
+    }
+
 @api_bp.route('/reports', methods=['GET'])
+@conditional('reports')
 def api_get_reports():
-    """Get all reports with filtering"""
-    from app import db, Report, Category, User, Comment
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    status = request.args.get('status')
-    category_id = request.args.get('category_id', type=int)
-    
-    query = Report.query
-    
-    if status:
-        query = query.filter_by(status=status)
-    if category_id:
-        query = query.filter_by(category_id=category_id)
-    
-    reports = query.order_by(Report.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    
-    return jsonify({
-        'reports': [{
-            'id': report.id,
-            'title': report.title,
-            'description': report.description,
-            'location': report.location,
-            'latitude': report.latitude,
-            'longitude': report.longitude,
-            'status': report.status,
-            'priority': report.priority,
-            'created_at': report.created_at.isoformat(),
-            'updated_at': report.updated_at.isoformat(),
-            'category': {
-                'id': report.category.id,
-                'name': report.category.name,
-                'icon': report.category.icon
-            },
-            'reporter': {
-                'id': report.reporter.id,
-                'full_name': report.reporter.full_name
-            }
-        } for report in reports.items],
-        'pagination': {
-            'page': page,
-            'pages': reports.pages,
-            'per_page': per_page,
-            'total': reports.total,
-            'has_next': reports.has_next,
-            'has_prev': reports.has_prev
-        }
-    })
+    """Get all reports with filtering (?fields= untuk sparse fieldset, ?ids= untuk detail beberapa laporan)"""
+    from app import cache, get_report_page, report_list_fields
+    page, per_page, status, category_id = report_list_args()
+    fields = report_fields_arg()
+    if 'ids' in request.args:
+        return get_reports_by_id(fields)
+    
+    try:
+        serializer = report_list_fields(fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    key = report_list_key(page, per_page, status, category_id, fields)
+    return jsonify(cache.get_or_set(key, lambda: get_report_page(page, per_page, status, category_id, serializer),
+                                    tags=('reports', 'category')))
+
+def get_reports_by_id(fields):
+    """?ids=1,2,3: detail laporan dari cache, sisanya dalam satu batch query"""
+    from app import get_report_details, report_detail_fields, parse_report_ids
+    try:
+        report_ids = parse_report_ids(request.args['ids'])
+        detail = report_detail_fields(fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    payloads, missing = cached_report_details(report_ids, fields)
+    if missing:
+        fetched = get_report_details(missing, detail)
+        cache_report_details(fetched, fields)
+        payloads.update(fetched)
+    return jsonify(reports_by_id_payload(report_ids, payloads))
 
 @api_bp.route('/reports/<int:report_id>', methods=['GET'])
+@conditional('report')
 def api_get_report(report_id):
-    """Get single report details"""
-    from app import db, Report, Category, User, Comment
-    report = Report.query.get_or_404(report_id)
-    comments = Comment.query.filter_by(report_id=report_id).order_by(Comment.created_at.desc()).all()
-    
-    return jsonify({
-        'id': report.id,
-        'title': report.title,
-        'description': report.description,
-        'location': report.location,
-        'latitude': report.latitude,
-        'longitude': report.longitude,
-        'status': report.status,
-        'priority': report.priority,
-        'created_at': report.created_at.isoformat(),
-        'updated_at': report.updated_at.isoformat(),
-        'category': {
-            'id': report.category.id,
-            'name': report.category.name,
-            'description': report.category.description,
-            'icon': report.category.icon
-        },
-        'reporter': {
-            'id': report.reporter.id,
-            'full_name': report.reporter.full_name,
-            'email': report.reporter.email
-        },
-        'comments': [{
-            'id': comment.id,
-            'content': comment.content,
-            'created_at': comment.created_at.isoformat(),
-            'is_official': comment.is_official,
-            'author': {
-                'id': comment.author.id,
-                'full_name': comment.author.full_name
-            }
-        } for comment in comments]
-    })
+    """Get single report details (?fields= untuk sparse fieldset)"""
+    from app import cache, get_report_detail, report_detail_fields
+    fields = report_fields_arg()
+    try:
+        detail = report_detail_fields(fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    def build():
+        payload = get_report_detail(report_id, detail)
+        if payload is None:
+            abort(404)
+        return payload
+    
+    return jsonify(cache.get_or_set(report_detail_key(report_id, fields), build,
+                                    tags=(f'report:{report_id}', 'category')))
 
 @api_bp.route('/reports', methods=['POST'])
 @token_required
 def api_create_report(current_user):
     """Create new report"""
-    from app import db, Report, Category, User, Comment
+    from app import db, Report, Category, User, Comment, invalidate_cache, publish_report_created
     data = request.get_json()
     
     required_fields = ['title', 'description', 'location', 'category_id', 'priority']
     if not all(field in data for field in required_fields):
         return jsonify({'message': 'Missing required fields'}), 400
     
+    title, description, location = (sanitize_input(data[field]) for field in ('title', 'description', 'location'))
+    if not title or not description or not location:
+        return jsonify({'message': 'Missing required fields'}), 400
+    
     report = Report(
-        title=data['title'],
-        description=data['description'],
-        location=data['location'],
+        title=title,
+        description=description,
+        location=location,
         category_id=data['category_id'],
         priority=data['priority'],
         latitude=data.get('latitude'),
@@ -215,6 +266,8 @@ def api_create_report(current_user):
     
     db.session.add(report)
     db.session.commit()
+    invalidate_cache('stats', 'reports')
+    publish_report_created(report)
     
     return jsonify({
         'message': 'Report created successfully',
@@ -225,14 +278,15 @@ def api_create_report(current_user):
 @token_required
 def api_add_comment(current_user, report_id):
     """Add comment to report"""
-    from app import db, Report, Category, User, Comment
+    from app import db, Report, Category, User, Comment, invalidate_cache, notify_official_comment
     data = request.get_json()
     
-    if not data or not data.get('content'):
+    content = sanitize_input(data.get('content')) if data else ''
+    if not content:
         return jsonify({'message': 'Comment content required'}), 400
     
     comment = Comment(
-        content=data['content'],
+        content=content,
         report_id=report_id,
         user_id=current_user.id,
         is_official=current_user.is_admin
@@ -240,68 +294,213 @@ def api_add_comment(current_user, report_id):
     
     db.session.add(comment)
     db.session.commit()
+    invalidate_cache(f'report:{report_id}')
+    notify_official_comment(comment.report, comment, actor=current_user)
     
     return jsonify({'message': 'Comment added successfully'}), 201
 
+@api_bp.route('/reports/<int:report_id>/attachments', methods=['POST'])
+@token_required
+def api_add_attachments(current_user, report_id):
+    """Upload foto bukti (multipart, field 'files')"""
+    from app import db, Report, save_attachments, attachment_to_dict
+    report = Report.query.get_or_404(report_id)
+    
+    if report.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'message': 'Access denied'}), 403
+    
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files:
+        return jsonify({'message': 'No files uploaded'}), 400
+    
+    saved, rejected = save_attachments(report, files, current_user)
+    if not saved:
+        return jsonify({'message': 'No supported files uploaded', 'rejected': rejected}), 400
+    
+    return jsonify({
+        'message': 'Attachments uploaded successfully',
+        'attachments': [attachment_to_dict(attachment) for attachment in saved],
+        'rejected': rejected
+    }), 201
+
+# Resumable uploads (tus 1.0 subset, lihat resumable.py)
+
+def _tus_response(status=204, **headers):
+    response = Response(status=status)
+    response.headers['Tus-Resumable'] = resumable.TUS_VERSION
+    for name, value in headers.items():
+        response.headers[name.replace('_', '-')] = str(value)
+    return response
+
+def _tus_error(error):
+    response = jsonify({'message': error.message})
+    response.status_code = error.status
+    response.headers['Tus-Resumable'] = resumable.TUS_VERSION
+    return response
+
+def _own_upload(upload_id, current_user):
+    info = resumable.get_upload(upload_id)
+    if info is None or (info['user_id'] != current_user.id and not current_user.is_admin):
+        raise UploadError('Upload not found', 404)
+    return info
+
+@api_bp.errorhandler(UploadError)
+def handle_upload_error(error):
+    return _tus_error(error)
+
+@api_bp.route('/reports/<int:report_id>/uploads', methods=['POST'])
+@token_required
+def api_create_upload(current_user, report_id):
+    """Mulai resumable upload untuk file bukti besar (video, PDF)"""
+    from app import Report
+    from security import allowed_file
+    report = Report.query.get_or_404(report_id)
+    
+    if report.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'message': 'Access denied'}), 403
+    if request.headers.get('Tus-Resumable', resumable.TUS_VERSION) != resumable.TUS_VERSION:
+        return _tus_response(412, Tus_Version=resumable.TUS_VERSION)
+    
+    try:
+        length = int(request.headers.get('Upload-Length', ''))
+    except ValueError:
+        raise UploadError('Upload-Length required', 400)
+    metadata = resumable.parse_metadata(request.headers.get('Upload-Metadata'))
+    if not allowed_file(metadata.get('filename', '')):
+        raise UploadError('Unsupported file type', 400)
+    
+    info = resumable.create_upload(length, metadata, report.id, current_user.id)
+    return _tus_response(
+        201,
+        Location=f'{request.script_root}{api_bp.url_prefix}/uploads/{info["id"]}',
+        Upload_Offset=0,
+        Tus_Version=resumable.TUS_VERSION,
+        Tus_Extension=resumable.TUS_EXTENSIONS,
+        Tus_Max_Size=current_app.config['RESUMABLE_MAX_SIZE'],
+        Tus_Checksum_Algorithm=','.join(resumable.CHECKSUM_ALGORITHMS)
+    )
+
+@api_bp.route('/uploads/<upload_id>', methods=['HEAD'])
+@token_required
+def api_upload_offset(current_user, upload_id):
+    """Progress upload, klien melanjutkan dari Upload-Offset"""
+    info = _own_upload(upload_id, current_user)
+    completed = {'Upload_Attachment_Id': info['attachment_id']} if 'attachment_id' in info else {}
+    return _tus_response(200, Upload_Offset=info['offset'], Upload_Length=info['length'],
+                         Cache_Control='no-store', **completed)
+
+@api_bp.route('/uploads/<upload_id>', methods=['PATCH'])
+@token_required
+def api_upload_chunk(current_user, upload_id):
+    """Tambahkan chunk; chunk terakhir melampirkan file ke laporan"""
+    from app import db, Report, attach_file
+    from attachments import file_sha256
+    info = _own_upload(upload_id, current_user)
+    if 'attachment_id' in info:
+        # Retry of a final PATCH whose response was lost
+        return _tus_response(Upload_Offset=info['length'], Upload_Attachment_Id=info['attachment_id'])
+    
+    if request.mimetype != 'application/offset+octet-stream':
+        raise UploadError('Content-Type must be application/offset+octet-stream', 415)
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        raise UploadError('Upload-Offset required', 400)
+    checksum = None
+    if 'Upload-Checksum' in request.headers:
+        checksum = resumable.parse_checksum(request.headers['Upload-Checksum'])
+    
+    new_offset = resumable.append_chunk(upload_id, offset, request.stream, checksum)
+    if new_offset < info['length'] or new_offset == offset:
+        return _tus_response(Upload_Offset=new_offset)
+    
+    # Upload selesai: verifikasi checksum seluruh file lalu lampirkan
+    path = resumable.upload_path(upload_id)
+    sha256 = file_sha256(path)
+    expected = info['metadata'].get('sha256')
+    if expected and expected.lower() != sha256:
+        resumable.discard_upload(upload_id)
+        raise UploadError('Checksum Mismatch', 460)
+    
+    report = db.session.get(Report, info['report_id'])
+    if report is None:
+        resumable.discard_upload(upload_id)
+        raise UploadError('Report not found', 404)
+    metadata = info['metadata']
+    attachment = attach_file(report, path, metadata['filename'],
+                             metadata.get('filetype') or 'application/octet-stream', current_user, sha256)
+    resumable.complete_upload(upload_id, attachment.id)
+    return _tus_response(Upload_Offset=new_offset, Upload_Attachment_Id=attachment.id)
+
+@api_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@token_required
+def api_cancel_upload(current_user, upload_id):
+    """Batalkan upload yang belum selesai"""
+    _own_upload(upload_id, current_user)
+    resumable.discard_upload(upload_id)
+    return _tus_response()
+
 # Categories Endpoints
 @api_bp.route('/categories', methods=['GET'])
+@conditional('categories')
 def api_get_categories():
     """Get all categories"""
-    from app import db, Report, Category, User, Comment
-    categories = Category.query.all()
-    
-    return jsonify([{
-        'id': cat.id,
-        'name': cat.name,
-        'description': cat.description,
-        'icon': cat.icon
-    } for cat in categories])
+    from app import get_categories
+    return jsonify(get_categories())
 
 # Statistics Endpoints
 @api_bp.route('/stats/summary', methods=['GET'])
+@conditional('stats')
 def api_get_stats():
     """Get application statistics"""
-    from app import db, Report, Category, User, Comment
-    total_reports = Report.query.count()
-    total_users = User.query.count()
-    
-    stats_by_status = {
-        'pending': Report.query.filter_by(status='pending').count(),
-        'investigating': Report.query.filter_by(status='investigating').count(),
-        'resolved': Report.query.filter_by(status='resolved').count()
-    }
-    
-    stats_by_priority = {
-        'low': Report.query.filter_by(priority='low').count(),
-        'medium': Report.query.filter_by(priority='medium').count(),
-        'high': Report.query.filter_by(priority='high').count(),
-        'critical': Report.query.filter_by(priority='critical').count()
-    }
-    
-    categories_with_counts = []
-    for category in Category.query.all():
-        count = Report.query.filter_by(category_id=category.id).count()
-        categories_with_counts.append({
-            'id': category.id,
-            'name': category.name,
-            'icon': category.icon,
-            'count': count
-        })
-    
-    return jsonify({
-        'total_reports': total_reports,
-        'total_users': total_users,
-        'by_status': stats_by_status,
-        'by_priority': stats_by_priority,
-        'by_category': categories_with_counts
-    })
+    from app import get_report_stats
+    return jsonify(get_report_stats())
+
+# Live updates
+@api_bp.route('/stream', methods=['GET'])
+def api_stream():
+    """Server-Sent Events: stat deltas, new reports and status changes"""
+    from app import events
+    stream = events.stream(stream_last_event_id(), timeout=current_app.config.get('EVENTS_STREAM_TIMEOUT', 300))
+    return stream_response(stream)
+
+def stream_last_event_id():
+    """Last-Event-ID of a reconnecting EventSource (or ?last_event_id=), else None"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None
+
+def stream_response(body=None):
+    response = Response(body, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Background jobs
+@api_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@token_required
+def api_get_job(current_user, job_id):
+    """Status of a background job (owner or admin)"""
+    from app import task_queue
+    job = task_queue.get(job_id)
+    if job is None:
+        return jsonify({'message': 'Job not found'}), 404
+    if not current_user.is_admin and job['owner_id'] != current_user.id:
+        return jsonify({'message': 'Access denied'}), 403
+    
+    response = jsonify(job)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 # Admin Endpoints
 @api_bp.route('/admin/reports/<int:report_id>/status', methods=['PUT'])
 @token_required
 def api_update_report_status(current_user, report_id):
     """Update report status (admin only)"""
-    from app import db, Report, Category, User, Comment
+    from app import db, Report, Category, User, Comment, invalidate_cache, publish_status_changed, notify_status_changed
     if not current_user.is_admin:
         return jsonify({'message': 'Admin access required'}), 403
     
@@ -310,9 +509,112 @@ def api_update_report_status(current_user, report_id):
         return jsonify({'message': 'Status required'}), 400
     
     report = Report.query.get_or_404(report_id)
+    old_status = report.status
     report.status = data['status']
     report.updated_at = datetime.utcnow()
     
     db.session.commit()
+    invalidate_cache(f'report:{report_id}', 'stats', 'reports')
+    publish_status_changed(report, old_status)
+    notify_status_changed(report, old_status, actor=current_user)
     
-    return jsonify({'message': 'Status updated successfully'})
\ No newline at end of file
+    return jsonify({'message': 'Status updated successfully'})
+
+# Batch: beberapa GET dalam satu round-trip
+BATCH_ENDPOINTS = ('api.api_get_reports', 'api.api_get_report', 'api.api_get_categories',
+                   'api.api_get_stats', 'api.api_get_job')
+# Taken from the batch request itself, never from a sub-request's own headers
+BATCH_FORWARDED_HEADERS = ('Authorization', 'Cookie', 'Accept-Language', 'X-Forwarded-For')
+BATCH_IGNORED_HEADERS = ('X-Forwarded-For', 'Accept-Encoding')
+BATCH_RESPONSE_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Retry-After')
+
+@api_bp.route('/batch', methods=['POST'])
+def api_batch():
+    """Run read-only sub-requests ({"requests": [{"path": ..., "headers": {...}}]}) in one round-trip"""
+    data = request.get_json(silent=True) or {}
+    subrequests = data.get('requests')
+    limit = current_app.config['API_BATCH_MAX_REQUESTS']
+    if not isinstance(subrequests, list) or not subrequests:
+        return jsonify({'message': 'requests must be a non-empty list'}), 400
+    if len(subrequests) > limit:
+        return jsonify({'message': f'At most {limit} requests per batch'}), 400
+    
+    environs = []
+    for subrequest in subrequests:
+        error = batch_subrequest_error(subrequest)
+        if error:
+            return jsonify({'message': error}), 400
+        environ = subrequest_environ(subrequest['path'], subrequest.get('headers') or {})
+        # Route the path the way dispatching will (percent-decoded), not the raw string
+        try:
+            endpoint, _ = current_app.url_map.bind_to_environ(environ).match(method='GET')
+        except HTTPException:
+            endpoint = None
+        if endpoint not in BATCH_ENDPOINTS:
+            return jsonify({'message': f"Cannot batch {subrequest['path']}"}), 400
+        environs.append(environ)
+    
+    return jsonify({'responses': [dispatch_subrequest(environ) for environ in environs]})
+
+def batch_subrequest_error(subrequest):
+    if not isinstance(subrequest, dict) or not isinstance(subrequest.get('path'), str):
+        return 'Each request needs a path'
+    if subrequest.get('method', 'GET').upper() != 'GET':
+        return 'Only GET requests can be batched'
+    headers = subrequest.get('headers', {})
+    if not isinstance(headers, dict) or not all(isinstance(value, str) for value in headers.values()):
+        return 'headers must map names to strings'
+    return None
+
+def subrequest_environ(path, headers):
+    """WSGI environ of a sub-request; identity and client address come from the batch request"""
+    merged = Headers([(name, value) for name, value in headers.items()
+                      if name.lower() not in {ignored.lower() for ignored in BATCH_IGNORED_HEADERS}])
+    for name in BATCH_FORWARDED_HEADERS:
+        if name in request.headers:
+            merged.set(name, request.headers[name])
+    path, _, query_string = path.partition('?')
+    return EnvironBuilder(path=path, query_string=query_string, base_url=request.host_url, headers=merged,
+                          environ_base={'REMOTE_ADDR': request.remote_addr}).get_environ()
+
+def subrequest_error(status, message):
+    response = jsonify({'message': message})
+    response.status_code = status
+    return response
+
+def dispatch_subrequest(environ):
+    """Dispatch a GET through the app in the current app context, so every
+    sub-request uses the same database session (and identity map).
+    
+    Errors become JSON responses for that entry; the app's error handlers
+    render HTML pages and would fail the whole batch."""
+    app = current_app._get_current_object()
+    
+    # g belongs to the app context: give each sub-request its own
+    app_globals = vars(g._get_current_object())
+    saved = dict(app_globals)
+    app_globals.clear()
+    try:
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = app.dispatch_request()
+                except HTTPException as e:
+                    rv = e.response if e.response is not None else subrequest_error(e.code, e.name)
+                response = app.finalize_request(rv)
+            except Exception:
+                current_app.logger.exception('Batch sub-request %s failed', environ['PATH_INFO'])
+                response = subrequest_error(500, 'Internal Server Error')
+            body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True) or None
+            response.close()
+    finally:
+        app_globals.clear()
+        app_globals.update(saved)
+    
+    return {
+        'status': response.status_code,
+        'headers': {name: response.headers[name] for name in BATCH_RESPONSE_HEADERS if name in response.headers},
+        'body': body
+    }
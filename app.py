@@ -1,22 +1,99 @@
 # app.py - Main Flask Application
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, send_from_directory, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import func, event, select
 from datetime import datetime
+from math import ceil
 import os
+import sys
+import mimetypes
+from query_log import SlowQueryLogger
+from profiler import RequestProfiler
+from compression import ResponseCompressor
+import serializers
+from serializers import (isoformat, category_serializer, report_serializer, report_detail_serializer,
+                         report_summary_serializer, comment_serializer)
+from cache import create_cache
+from http_cache import conditional, version_stamp
+from events import create_event_bus
+from feed import RecentFeed
+from tasks import create_task_queue, PRIORITY_LOW
+from notifications import Notifier
+from identity import IdentityCache, snapshot, attach
+from hashing import PasswordHasher, HashingBusy
+from security import allowed_file, limiter, rate_limit, parse_limit, login_throttle, sanitize_input, user_markup
+from attachments import (UploadRequest, ThumbnailPool, store_blob, link_blob, blob_path, send_blob, is_image,
+                         THUMBNAIL_SUFFIX)
+import assets
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///environmental_reports.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///environmental_reports.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH') or 16 * 1024 * 1024)
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER') or os.path.join(app.root_path, 'static', 'uploads')
+app.config['MAX_ATTACHMENTS_PER_UPLOAD'] = int(os.environ.get('MAX_ATTACHMENTS_PER_UPLOAD', 10))
+app.config['THUMBNAIL_WORKERS'] = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+app.config['RESUMABLE_MAX_SIZE'] = int(os.environ.get('RESUMABLE_MAX_SIZE') or 1024 * 1024 * 1024)
+app.config['RESUMABLE_EXPIRY'] = int(os.environ.get('RESUMABLE_EXPIRY') or 24 * 3600)
+app.config['ATTACHMENT_SENDFILE'] = os.environ.get('ATTACHMENT_SENDFILE', '')  # '', x-accel, x-sendfile
+app.config['ATTACHMENT_ACCEL_PREFIX'] = os.environ.get('ATTACHMENT_ACCEL_PREFIX') or '/_uploads/'
+app.config['ATTACHMENT_CACHE_MAX_AGE'] = int(os.environ.get('ATTACHMENT_CACHE_MAX_AGE') or 86400)
+app.config['SLOW_QUERY_THRESHOLD'] = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.5))
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'local')
+app.config['CACHE_DEFAULT_TTL'] = int(os.environ.get('CACHE_DEFAULT_TTL', 300))
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL')
+app.config['EVENTS_DB_PATH'] = os.environ.get('EVENTS_DB_PATH')
+app.config['EVENTS_STREAM_TIMEOUT'] = int(os.environ.get('EVENTS_STREAM_TIMEOUT', 300))
+app.config['RECENT_FEED_SIZE'] = int(os.environ.get('RECENT_FEED_SIZE', 20))
+app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+app.config['RATELIMIT_STORAGE'] = os.environ.get('RATELIMIT_STORAGE', 'memory')  # memory, sqlite, redis (also login throttle)
+app.config['RATELIMIT_REDIS_URL'] = os.environ.get('RATELIMIT_REDIS_URL') or os.environ.get('CACHE_REDIS_URL')
+app.config['RATELIMIT_TRUSTED_PROXIES'] = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 0))
+app.config['RATELIMIT_API'] = os.environ.get('RATELIMIT_API', '300/minute')
+app.config['RATELIMIT_STATS'] = os.environ.get('RATELIMIT_STATS', '60/minute')
+app.config['IDENTITY_CACHE_TTL'] = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+app.config['IDENTITY_CACHE_SIZE'] = int(os.environ.get('IDENTITY_CACHE_SIZE', 10000))
+app.config['TASKS_DB_PATH'] = os.environ.get('TASKS_DB_PATH')
+app.config['TASKS_EAGER'] = os.environ.get('TASKS_EAGER', 'false').lower() in ['true', 'on', '1']
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER') or 'localhost'
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT') or 587)
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
+app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@ecoreport.local'
+app.config['NOTIFY_DIGEST_WINDOW'] = int(os.environ.get('NOTIFY_DIGEST_WINDOW', 300))
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+app.config['PASSWORD_HASH_WORKERS'] = os.environ.get('PASSWORD_HASH_WORKERS')  # default: separuh jumlah CPU
+app.config['PASSWORD_HASH_QUEUE'] = os.environ.get('PASSWORD_HASH_QUEUE')  # default: 2 per worker thread
+app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ['true', 'on', '1']
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+app.config['COMPRESS_GZIP_LEVEL'] = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+app.config['API_BATCH_MAX_IDS'] = int(os.environ.get('API_BATCH_MAX_IDS', 200))
+app.config['API_BATCH_MAX_REQUESTS'] = int(os.environ.get('API_BATCH_MAX_REQUESTS', 20))
 
 db = SQLAlchemy(app)
+hasher = PasswordHasher.from_config(app.config)
+slow_query_log = SlowQueryLogger(app, db)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+profiler = RequestProfiler(app)
+compression = ResponseCompressor(app)
+serializers.init_app(app)
+cache = create_cache(app)
+events = create_event_bus(app)
+limiter.init_app(app)
+login_throttle.init_app(app)
+task_queue = create_task_queue(app)
+notifier = Notifier(app, task_queue)
+thumbnails = ThumbnailPool(app.config['THUMBNAIL_WORKERS'])
+assets.init_app(app)
 
 # Models (4+ Entitas sesuai requirement)
 
@@ -34,12 +111,12 @@ class User(UserMixin, db.Model):
     reports = db.relationship('Report', backref='reporter', lazy=True)
     
     def check_password(self, password):
-        """Check if provided password matches the hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check if provided password matches the hash (di pool hashing, lihat hashing.py)"""
+        return hasher.verify(self.password_hash, password)
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -68,6 +145,8 @@ class Report(db.Model):
     
     # Relationship
     comments = db.relationship('Comment', backref='report', lazy=True, cascade='all, delete-orphan')
+    attachments = db.relationship('Attachment', backref='report', lazy=True, cascade='all, delete-orphan',
+                                  order_by='Attachment.id')
 
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -82,9 +161,493 @@ class Comment(db.Model):
     # Relationship
     author = db.relationship('User', backref='comments')
 
+class Blob(db.Model):
+    """Isi file lampiran, disimpan sekali per SHA-256 (lihat attachments.py)"""
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class Attachment(db.Model):
+    """Foto atau dokumen bukti yang dilampirkan pada laporan"""
+    id = db.Column(db.Integer, primary_key=True)
+    original_name = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100))
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Foreign Keys
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blob.sha256'), nullable=False, index=True)
+    report_id = db.Column(db.Integer, db.ForeignKey('report.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    # Relationship
+    blob = db.relationship('Blob')
+    
+    @property
+    def filename(self):
+        """Path relatif terhadap UPLOAD_FOLDER"""
+        return blob_path(self.blob_sha256)
+    
+    @property
+    def is_image(self):
+        return is_image(self.original_name)
+    
+    @property
+    def thumbnail(self):
+        return self.filename + THUMBNAIL_SUFFIX if self.is_image else None
+    
+    @property
+    def has_thumbnail(self):
+        """Thumbnail dibuat di process pool, bisa belum tersedia"""
+        return self.thumbnail is not None and os.path.exists(upload_path(self.thumbnail))
+
+def _adjust_refcount(connection, sha256, delta):
+    blob = Blob.__table__
+    connection.execute(blob.update().where(blob.c.sha256 == sha256)
+                       .values(refcount=blob.c.refcount + delta, updated_at=datetime.utcnow()))
+
+@event.listens_for(Attachment, 'after_insert')
+def _attachment_inserted(mapper, connection, target):
+    _adjust_refcount(connection, target.blob_sha256, 1)
+
+@event.listens_for(Attachment, 'after_delete')
+def _attachment_deleted(mapper, connection, target):
+    _adjust_refcount(connection, target.blob_sha256, -1)
+
+class Notification(db.Model):
+    """Notifikasi untuk pelapor, dikirim berkala sebagai digest email"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # status, comment
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, index=True)
+    
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    report_id = db.Column(db.Integer, db.ForeignKey('report.id'))
+
+# Identity cache: user_loader dan token_required tanpa query per request (lihat identity.py)
+
+def _load_identity(user_id):
+    user = db.session.get(User, user_id)
+    return snapshot(user) if user is not None else None
+
+identities = IdentityCache(_load_identity, ttl=app.config['IDENTITY_CACHE_TTL'],
+                           maxsize=app.config['IDENTITY_CACHE_SIZE'], bus=events)
+identities.watch(User)
+
+def get_identity(user_id):
+    """User dari identity cache, terpasang di session request ini"""
+    values = identities.get(user_id)
+    return attach(db.session, User, values) if values is not None else None
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return get_identity(int(user_id))
+
+def authenticate(username, password):
+    """User untuk kredensial ini atau None; hash dengan parameter lama di-upgrade"""
+    user = User.query.filter_by(username=username).first()
+    if user is None or not user.check_password(password):
+        return None
+    if hasher.needs_rehash(user.password_hash):
+        user.set_password(password)
+        db.session.commit()
+    return user
+
+# Cached read helpers
+# Tags: 'category', 'stats', 'reports' (lists) dan 'report:<id>' (detail)
+
+def categories_select():
+    return category_serializer().select().order_by(Category.id)
+
+def get_categories():
+    """Daftar kategori sebagai dict (cached)"""
+    return cache.get_or_set(
+        'categories',
+        lambda: category_serializer().rows(db.session.execute(categories_select())),
+        tags=('category',)
+    )
+
+def report_list_fields(fields=None):
+    """Serializer item daftar untuk ?fields= (None = semua field); ValueError untuk field yang tidak dikenal"""
+    return report_serializer() if fields is None else report_serializer().only(fields)
+
+def report_list_select(status=None, category_id=None, serializer=None):
+    """(SELECT item daftar laporan terbaru dulu, SELECT COUNT) dengan filter yang sama"""
+    filters = []
+    if status:
+        filters.append(Report.status == status)
+    if category_id:
+        filters.append(Report.category_id == category_id)
+    items = (serializer or report_serializer()).select().where(*filters).order_by(Report.created_at.desc())
+    return items, select(func.count(Report.id)).where(*filters)
+
+def page_window(page, per_page):
+    """(limit, offset) dengan clamping seperti paginate(error_out=False)"""
+    size = per_page if per_page >= 1 else 20
+    return size, (max(page, 1) - 1) * size
+
+def report_page_payload(items, total, page, per_page):
+    """Payload daftar laporan; pagination meng-echo page dan per_page dari request"""
+    size, offset = page_window(page, per_page)
+    current = offset // size + 1
+    pages = ceil(total / size) if total else 0
+    return {
+        'reports': items,
+        'pagination': {
+            'page': page,
+            'pages': pages,
+            'per_page': per_page,
+            'total': total,
+            'has_next': current < pages,
+            'has_prev': current > 1
+        }
+    }
+
+def get_report_page(page, per_page, status=None, category_id=None, serializer=None):
+    """Satu halaman daftar laporan langsung dari kolom, tanpa objek ORM"""
+    serializer = serializer or report_serializer()
+    items, count = report_list_select(status, category_id, serializer)
+    limit, offset = page_window(page, per_page)
+    rows = db.session.execute(items.limit(limit).offset(offset))
+    return report_page_payload(serializer.rows(rows), db.session.scalar(count), page, per_page)
+
+def _compute_report_stats():
+    by_status = dict(db.session.query(Report.status, func.count(Report.id)).group_by(Report.status).all())
+    by_priority = dict(db.session.query(Report.priority, func.count(Report.id)).group_by(Report.priority).all())
+    by_category = dict(db.session.query(Report.category_id, func.count(Report.id)).group_by(Report.category_id).all())
+    return report_stats_from_counts(by_status, by_priority, by_category, User.query.count(), get_categories())
+
+def report_stats_from_counts(by_status, by_priority, by_category, total_users, categories):
+    """Payload statistik dari hasil GROUP BY (dipakai juga oleh asgi.py)"""
+    return {
+        'total_reports': sum(by_status.values()),
+        'total_users': total_users,
+        'by_status': {status: by_status.get(status, 0) for status in ('pending', 'investigating', 'resolved')},
+        'by_priority': {priority: by_priority.get(priority, 0) for priority in ('low', 'medium', 'high', 'critical')},
+        'by_category': [{
+            'id': c['id'],
+            'name': c['name'],
+            'icon': c['icon'],
+            'count': by_category.get(c['id'], 0)
+        } for c in categories]
+    }
+
+def get_report_stats():
+    """Statistik laporan dengan GROUP BY, bukan satu COUNT per nilai (cached)"""
+    return cache.get_or_set('stats:summary', _compute_report_stats, tags=('stats', 'category'))
+
+def invalidate_cache(*tags):
+    """Hapus cache entries dengan tag tertentu setelah write"""
+    cache.invalidate_tags(*tags)
+    if 'stats' in tags:
+        schedule_stats_rebuild()
+
+@task_queue.task('stats.rebuild', priority=PRIORITY_LOW)
+def rebuild_stats():
+    """Hitung ulang statistik ke cache di worker, bukan di request berikutnya"""
+    stats = _compute_report_stats()
+    cache.set('stats:summary', stats, tags=('stats', 'category'))
+    return {'total_reports': stats['total_reports']}
+
+def schedule_stats_rebuild():
+    # Hanya berguna jika worker berbagi cache dengan web (sqlite/redis)
+    if app.config['CACHE_BACKEND'] not in ('sqlite', 'redis'):
+        return
+    try:
+        rebuild_stats.delay(unique_key='stats.rebuild')
+    except Exception as e:
+        app.logger.warning('Could not schedule stats rebuild: %s', e)
+
+# Lampiran laporan (lihat attachments.py)
+
+def upload_path(relative_path):
+    return os.path.join(app.config['UPLOAD_FOLDER'], relative_path)
+
+def attachment_to_dict(attachment):
+    return {
+        'id': attachment.id,
+        'original_name': attachment.original_name,
+        'content_type': attachment.content_type,
+        'size': attachment.size,
+        'created_at': isoformat(attachment.created_at),
+        'url': url_for('download_attachment', id=attachment.id),
+        'thumbnail_url': url_for('attachment_thumbnail', id=attachment.id) if attachment.is_image else None
+    }
+
+REPORT_DETAIL_COLLECTIONS = ('comments', 'attachments')
+
+def report_detail_fields(fields=None):
+    """(serializer, koleksi) detail laporan untuk ?fields=; ValueError untuk field yang tidak dikenal"""
+    if fields is None:
+        return report_detail_serializer(), REPORT_DETAIL_COLLECTIONS
+    collections = tuple(name for name in REPORT_DETAIL_COLLECTIONS if name in fields)
+    return report_detail_serializer().only(set(fields) - set(collections)), collections
+
+def parse_report_ids(value):
+    """Id unik dari '3,1,2' (urutan dipertahankan); ValueError jika tidak valid atau terlalu banyak"""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ValueError('ids must be a comma-separated list of report ids')
+    limit = app.config['API_BATCH_MAX_IDS']
+    if not ids:
+        raise ValueError('ids must be a comma-separated list of report ids')
+    if len(ids) > limit:
+        raise ValueError(f'At most {limit} ids per request')
+    return ids
+
+def report_detail_selects(report_ids, detail=None):
+    """(SELECT laporan, SELECT komentar terbaru dulu, SELECT lampiran) untuk sekumpulan id;
+    None untuk koleksi yang tidak diminta. Baris komentar diakhiri report_id."""
+    serializer, collections = detail or report_detail_fields()
+    return (
+        serializer.select().where(Report.id.in_(report_ids)),
+        comment_serializer().select().add_columns(Comment.report_id).where(Comment.report_id.in_(report_ids))
+        .order_by(Comment.created_at.desc()) if 'comments' in collections else None,
+        select(Attachment).where(Attachment.report_id.in_(report_ids)).order_by(Attachment.id)
+        if 'attachments' in collections else None
+    )
+
+def report_detail_payloads(report_rows, comment_rows=None, attachments=None, detail=None):
+    """{id: detail laporan}, komentar dan lampiran (jika dimuat) dibagi per laporan"""
+    serializer, _ = detail or report_detail_fields()
+    payloads = {}
+    for row in report_rows:
+        payload = serializer(row)
+        payloads[payload['id']] = payload
+    if comment_rows is not None:
+        serialize = comment_serializer()
+        for payload in payloads.values():
+            payload['comments'] = []
+        for row in comment_rows:
+            payloads[row[-1]]['comments'].append(serialize(row))
+    if attachments is not None:
+        for payload in payloads.values():
+            payload['attachments'] = []
+        for attachment in attachments:
+            payloads[attachment.report_id]['attachments'].append(attachment_to_dict(attachment))
+    return payloads
+
+def get_report_details(report_ids, detail=None):
+    """{id: detail laporan} dengan satu query per tabel; id yang tidak ada dilewati"""
+    report_query, comments_query, attachments_query = report_detail_selects(report_ids, detail)
+    report_rows = db.session.execute(report_query).all()
+    if not report_rows:
+        return {}
+    return report_detail_payloads(
+        report_rows,
+        db.session.execute(comments_query) if comments_query is not None else None,
+        db.session.scalars(attachments_query) if attachments_query is not None else None,
+        detail
+    )
+
+def get_report_detail(report_id, detail=None):
+    """Detail laporan, None jika tidak ada; detail dari report_detail_fields()"""
+    return get_report_details([report_id], detail).get(report_id)
+
+def save_attachments(report, files, user):
+    """Simpan file upload sebagai lampiran laporan, return (saved, rejected filenames)"""
+    saved, rejected, blobs = [], [], {}
+    for file in files:
+        if not file or not file.filename:
+            continue
+        if not allowed_file(file.filename) or len(saved) >= app.config['MAX_ATTACHMENTS_PER_UPLOAD']:
+            rejected.append(file.filename)
+            continue
+        
+        sha256, _, size = store_blob(file, app.config['UPLOAD_FOLDER'])
+        saved.append(_add_attachment(report, user, sha256, size, file.filename, file.mimetype, blobs))
+    
+    if saved:
+        _attachments_committed(report, saved)
+    return saved, rejected
+
+def attach_file(report, path, original_name, content_type, user, sha256=None):
+    """Lampirkan file yang sudah ada di disk (mis. hasil resumable upload)"""
+    sha256, _, size = link_blob(path, app.config['UPLOAD_FOLDER'], sha256)
+    attachment = _add_attachment(report, user, sha256, size, original_name, content_type, {})
+    _attachments_committed(report, [attachment])
+    return attachment
+
+def _add_attachment(report, user, sha256, size, original_name, content_type, blobs):
+    if sha256 not in blobs:
+        # Konten yang sama sudah tersimpan: cukup tambah referensi
+        blobs[sha256] = db.session.get(Blob, sha256) or Blob(sha256=sha256, size=size)
+    attachment = Attachment(
+        blob=blobs[sha256],
+        original_name=original_name[:255],
+        content_type=content_type,
+        size=size,
+        report_id=report.id,
+        user_id=user.id
+    )
+    db.session.add(attachment)
+    return attachment
+
+def _attachments_committed(report, attachments):
+    db.session.commit()
+    invalidate_cache(f'report:{report.id}')
+    pending = {attachment.filename: attachment.thumbnail for attachment in attachments
+               if attachment.is_image and not attachment.has_thumbnail}
+    for filename, thumbnail in pending.items():
+        thumbnails.submit(upload_path(filename), upload_path(thumbnail))
+
+# Recent feed (ring buffer per worker, lihat feed.py)
+
+def report_summary(report):
+    return report_summary_serializer().dump(report)
+
+def _load_recent_reports(limit):
+    serializer = report_summary_serializer()
+    return serializer.rows(db.session.execute(serializer.select().order_by(Report.id.desc()).limit(limit)))
+
+recent_feed = RecentFeed(_load_recent_reports, size=app.config['RECENT_FEED_SIZE'], bus=events)
+
+@app.template_filter('format_date')
+def format_date(value, fmt='%d/%m/%Y'):
+    """Format datetime atau string ISO untuk template"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.strftime(fmt) if value else ''
+
+# Deskripsi dan komentar: tag dari ALLOWED_TAGS dirender, sisanya di-escape
+app.add_template_filter(user_markup, 'user_markup')
+
+# Event publishing untuk /api/v1/stream (dipanggil setelah commit)
+
+def publish_event(type, data):
+    """Publish event ke stream; kegagalan tidak membatalkan write yang sudah commit"""
+    try:
+        events.publish(type, data)
+    except Exception as e:
+        app.logger.warning('Could not publish %s event: %s', type, e)
+
+def publish_report_created(report):
+    summary = report_summary(report)
+    recent_feed.add(summary)
+    publish_event('report.created', dict(summary, category_id=report.category_id))
+    publish_event('stats', {
+        'total_reports': 1,
+        'by_status': {report.status: 1},
+        'by_priority': {report.priority: 1},
+        'by_category': {str(report.category_id): 1}
+    })
+
+def publish_status_changed(report, old_status):
+    if old_status == report.status:
+        return
+    recent_feed.update(report.id, status=report.status)
+    publish_event('report.status', {
+        'id': report.id,
+        'title': report.title,
+        'old_status': old_status,
+        'status': report.status
+    })
+    publish_event('stats', {'by_status': {old_status: -1, report.status: 1}})
+
+def publish_user_registered():
+    publish_event('stats', {'total_users': 1})
+
+# Notifikasi email ke pelapor (digest, lihat notifications.py)
+
+def notify_reporter(report, kind, message, actor=None):
+    """Antrekan notifikasi untuk pelapor; perubahan oleh pelapor sendiri dilewati"""
+    if actor is not None and actor.id == report.user_id:
+        return
+    try:
+        notifier.queue(report.user_id, kind, message, report_id=report.id)
+    except Exception as e:
+        app.logger.warning('Could not queue notification for report %s: %s', report.id, e)
+
+def notify_status_changed(report, old_status, actor=None):
+    if old_status != report.status:
+        notify_reporter(report, 'status', f'Status laporan "{report.title}" berubah dari {old_status} menjadi {report.status}.', actor)
+
+def notify_official_comment(report, comment, actor=None):
+    if comment.is_official and report is not None:
+        content = comment.content if len(comment.content) <= 200 else comment.content[:200] + '...'
+        notify_reporter(report, 'comment', f'Tanggapan resmi pada laporan "{report.title}": {content}', actor)
+
+# Version stamps untuk ETag / conditional GET (aggregate murah, ikut cache tags)
+
+@version_stamp('categories')
+def categories_version():
+    def compute():
+        count, max_id = db.session.query(func.count(Category.id), func.max(Category.id)).one()
+        return {'token': f'c{count}-{max_id}', 'last_modified': None}
+    return cache.get_or_set('version:categories', compute, tags=('category',))
+
+def reports_version():
+    def compute():
+        count, max_id, updated = db.session.query(
+            func.count(Report.id), func.max(Report.id), func.max(Report.updated_at)
+        ).one()
+        return {
+            'token': f"r{count}-{max_id}-{isoformat(updated)}|{categories_version()['token']}",
+            'last_modified': isoformat(updated)
+        }
+    return cache.get_or_set('version:reports', compute, tags=('reports', 'stats', 'category'))
+
+@version_stamp('reports')
+def report_list_version():
+    """Stamp daftar laporan; untuk ?ids= stamp laporan-laporan itu beserta komentarnya"""
+    if 'ids' in request.args:
+        return report_batch_version(request.args['ids'])
+    return reports_version()
+
+def report_batch_version(value):
+    try:
+        ids = parse_report_ids(value)
+    except ValueError:
+        return None
+    count, updated = db.session.query(func.count(Report.id), func.max(Report.updated_at)).filter(
+        Report.id.in_(ids)).one()
+    comments, max_comment, last_comment = db.session.query(
+        func.count(Comment.id), func.max(Comment.id), func.max(Comment.created_at)
+    ).filter(Comment.report_id.in_(ids)).one()
+    attachments, max_attachment, last_attachment = db.session.query(
+        func.count(Attachment.id), func.max(Attachment.id), func.max(Attachment.created_at)
+    ).filter(Attachment.report_id.in_(ids)).one()
+    return {
+        'token': f"b{count}-{isoformat(updated)}-{comments}-{max_comment}-a{attachments}-{max_attachment}"
+                 f"|{categories_version()['token']}",
+        'last_modified': max(filter(None, [isoformat(updated), isoformat(last_comment), isoformat(last_attachment)]),
+                             default=None)
+    }
+
+@version_stamp('stats')
+def stats_version():
+    def compute():
+        users, last_user = db.session.query(func.count(User.id), func.max(User.created_at)).one()
+        reports = reports_version()
+        last_modified = max(filter(None, [reports['last_modified'], isoformat(last_user)]), default=None)
+        return {'token': f"{reports['token']}|u{users}", 'last_modified': last_modified}
+    return cache.get_or_set('version:stats', compute, tags=('stats', 'reports', 'category'))
+
+@version_stamp('report')
+def report_version(report_id):
+    def compute():
+        updated = db.session.query(Report.updated_at).filter_by(id=report_id).first()
+        if updated is None:
+            return None
+        count, max_id, last_comment = db.session.query(
+            func.count(Comment.id), func.max(Comment.id), func.max(Comment.created_at)
+        ).filter_by(report_id=report_id).one()
+        attachments, max_attachment, last_attachment = db.session.query(
+            func.count(Attachment.id), func.max(Attachment.id), func.max(Attachment.created_at)
+        ).filter_by(report_id=report_id).one()
+        return {
+            'token': f"{isoformat(updated[0])}-{count}-{max_id}-a{attachments}-{max_attachment}"
+                     f"|{categories_version()['token']}",
+            'last_modified': max(filter(None, [isoformat(updated[0]), isoformat(last_comment),
+                                               isoformat(last_attachment)]), default=None)
+        }
+    return cache.get_or_set(f'version:report:{report_id}', compute,
+                            tags=(f'report:{report_id}', 'reports', 'category'))
 
 # Web Routes
 
@@ -92,23 +655,17 @@ def load_user(user_id):
 def index():
     """Dashboard utama dengan statistik"""
     try:
-        total_reports = Report.query.count()
-        pending_reports = Report.query.filter_by(status='pending').count()
-        resolved_reports = Report.query.filter_by(status='resolved').count()
+        stats = get_report_stats()
         
-        recent_reports = Report.query.order_by(Report.created_at.desc()).limit(5).all()
-        categories = Category.query.all()
+        recent_reports = recent_feed.recent(limit=5)
         
         # Statistik per kategori
-        category_stats = []
-        for cat in categories:
-            count = Report.query.filter_by(category_id=cat.id).count()
-            category_stats.append({'name': cat.name, 'count': count})
+        category_stats = [{'name': c['name'], 'count': c['count']} for c in stats['by_category']]
         
         return render_template('dashboard.html', 
-                             total_reports=total_reports,
-                             pending_reports=pending_reports,
-                             resolved_reports=resolved_reports,
+                             total_reports=stats['total_reports'],
+                             pending_reports=stats['by_status']['pending'],
+                             resolved_reports=stats['by_status']['resolved'],
                              recent_reports=recent_reports,
                              category_stats=category_stats)
     except Exception as e:
@@ -120,6 +677,14 @@ def index():
                              recent_reports=[],
                              category_stats=[])
 
+@app.route('/sw.js')
+def service_worker():
+    """Service worker dari root agar scope-nya mencakup seluruh aplikasi"""
+    response = send_from_directory(app.static_folder, 'sw.js', mimetype='application/javascript', max_age=0)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Service-Worker-Allowed'] = '/'
+    return response
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -150,9 +715,13 @@ def register():
             
             db.session.add(user)
             db.session.commit()
+            invalidate_cache('stats')
+            publish_user_registered()
             
             flash('Registrasi berhasil! Silakan login.', 'success')
             return redirect(url_for('login'))
+        except HashingBusy:
+            raise
         except Exception as e:
             flash(f'Error during registration: {str(e)}', 'error')
             return redirect(url_for('register'))
@@ -166,14 +735,28 @@ def login():
             username = request.form['username']
             password = request.form['password']
             
-            user = User.query.filter_by(username=username).first()
+            # Ditolak sebelum hashing password
+            client_ip = limiter.client_ip()
+            wait = login_throttle.retry_after(username, client_ip)
+            if wait:
+                flash(f'Terlalu banyak percobaan login. Coba lagi dalam {max(1, wait // 60)} menit.', 'error')
+                response = app.make_response(render_template('login.html'))
+                response.status_code = 429
+                response.headers['Retry-After'] = str(wait)
+                return response
+            
+            user = authenticate(username, password)
             
-            if user and user.check_password(password):
+            if user:
+                login_throttle.succeeded(username)
                 login_user(user)
                 flash(f'Selamat datang, {user.full_name}!', 'success')
                 return redirect(url_for('index'))
             else:
+                login_throttle.failed(username, client_ip)
                 flash('Username atau password salah!', 'error')
+        except HashingBusy:
+            raise
         except Exception as e:
             flash(f'Error during login: {str(e)}', 'error')
     
@@ -191,9 +774,9 @@ def logout():
 def new_report():
     if request.method == 'POST':
         try:
-            title = request.form['title']
-            description = request.form['description']
-            location = request.form['location']
+            title = sanitize_input(request.form['title'])
+            description = sanitize_input(request.form['description'])
+            location = sanitize_input(request.form['location'])
             category_id = request.form['category_id']
             priority = request.form['priority']
             latitude = request.form.get('latitude')
@@ -217,6 +800,12 @@ def new_report():
             
             db.session.add(report)
             db.session.commit()
+            invalidate_cache('stats', 'reports')
+            publish_report_created(report)
+            
+            _, rejected = save_attachments(report, request.files.getlist('photos'), current_user)
+            if rejected:
+                flash(f'File tidak didukung dan dilewati: {", ".join(rejected)}', 'warning')
             
             flash('Laporan berhasil dikirim!', 'success')
             return redirect(url_for('view_report', id=report.id))
@@ -224,8 +813,7 @@ def new_report():
             flash(f'Error creating report: {str(e)}', 'error')
             return redirect(url_for('new_report'))
     
-    categories = Category.query.all()
-    return render_template('new_report.html', categories=categories)
+    return render_template('new_report.html', categories=get_categories())
 
 @app.route('/reports')
 def reports():
@@ -247,11 +835,10 @@ def reports():
                 pass  # Invalid category_id, ignore filter
         
         reports = query.order_by(Report.created_at.desc()).all()
-        categories = Category.query.all()
         
         return render_template('reports.html', 
                              reports=reports, 
-                             categories=categories,
+                             categories=get_categories(),
                              current_status=status_filter,
                              current_category=category_filter)
     except Exception as e:
@@ -273,12 +860,29 @@ def view_report(id):
         flash(f'Error loading report: {str(e)}', 'error')
         return redirect(url_for('reports'))
 
+@app.route('/attachments/<int:id>')
+def download_attachment(id):
+    """File lampiran asli"""
+    attachment = Attachment.query.get_or_404(id)
+    # Tipe dari ekstensi yang diizinkan, bukan Content-Type kiriman klien
+    content_type = mimetypes.guess_type(attachment.original_name)[0] or 'application/octet-stream'
+    return send_blob(attachment.filename, content_type, attachment.blob_sha256,
+                     download_name=attachment.original_name)
+
+@app.route('/attachments/<int:id>/thumbnail')
+def attachment_thumbnail(id):
+    """Thumbnail JPEG; 404 sampai selesai dibuat"""
+    attachment = Attachment.query.get_or_404(id)
+    if not attachment.has_thumbnail:
+        abort(404)
+    return send_blob(attachment.thumbnail, 'image/jpeg', f'{attachment.blob_sha256}-thumb')
+
 @app.route('/report/<int:id>/comment', methods=['POST'])
 @login_required
 def add_comment(id):
     try:
         report = Report.query.get_or_404(id)
-        content = request.form.get('content', '').strip()
+        content = sanitize_input(request.form.get('content'))
         
         if not content:
             flash('Komentar tidak boleh kosong!', 'error')
@@ -293,6 +897,8 @@ def add_comment(id):
         
         db.session.add(comment)
         db.session.commit()
+        invalidate_cache(f'report:{id}')
+        notify_official_comment(report, comment, actor=current_user)
         
         flash('Komentar berhasil ditambahkan!', 'success')
     except Exception as e:
@@ -315,6 +921,29 @@ def admin_reports():
         flash(f'Error loading admin panel: {str(e)}', 'error')
         return render_template('admin_reports.html', reports=[])
 
+@app.route('/admin/profiles')
+@login_required
+def admin_profiles():
+    """Daftar profil request terbaru (admin only)"""
+    if not current_user.is_admin:
+        flash('Akses ditolak! Admin only.', 'error')
+        return redirect(url_for('index'))
+    
+    profiles = profiler.list_profiles()
+    return render_template('admin_profiles.html', profiles=profiles)
+
+@app.route('/admin/profiles/<name>.prof')
+@login_required
+def download_profile(name):
+    """Download file pstats untuk snakeviz/flameprof (admin only)"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    path = profiler.profile_path(name)
+    if path is None:
+        abort(404)
+    return send_file(path, as_attachment=True, download_name=f'{name}.prof')
+
 @app.route('/admin/report/<int:id>/update_status', methods=['POST'])
 @login_required
 def update_report_status(id):
@@ -332,6 +961,9 @@ def update_report_status(id):
             report.status = new_status
             report.updated_at = datetime.utcnow()
             db.session.commit()
+            invalidate_cache(f'report:{id}', 'stats', 'reports')
+            publish_status_changed(report, old_status)
+            notify_status_changed(report, old_status, actor=current_user)
             
             flash(f'Status laporan berhasil diubah dari "{old_status}" ke "{new_status}"!', 'success')
         else:
@@ -344,23 +976,18 @@ def update_report_status(id):
 # API Endpoints
 
 @app.route('/api/categories')
+@rate_limit(*parse_limit(app.config['RATELIMIT_API']), scope='api')
+@conditional('categories')
 def api_get_categories():
     """API endpoint untuk mendapatkan daftar kategori"""
     try:
-        categories = Category.query.all()
-        result = []
-        for c in categories:
-            result.append({
-                'id': c.id,
-                'name': c.name,
-                'description': c.description,
-                'icon': c.icon
-            })
-        return jsonify(result)
+        return jsonify(get_categories())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/reports')
+@rate_limit(*parse_limit(app.config['RATELIMIT_API']), scope='api')
+@conditional('reports')
 def api_get_reports():
     """API endpoint untuk mendapatkan daftar laporan dengan pagination"""
     try:
@@ -369,125 +996,75 @@ def api_get_reports():
         status = request.args.get('status')
         category_id = request.args.get('category_id', type=int)
         
-        query = Report.query
-        
-        if status:
-            query = query.filter_by(status=status)
-        if category_id:
-            query = query.filter_by(category_id=category_id)
-        
-        reports = query.order_by(Report.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        return jsonify({
-            'reports': [{
-                'id': r.id,
-                'title': r.title,
-                'description': r.description,
-                'location': r.location,
-                'latitude': r.latitude,
-                'longitude': r.longitude,
-                'status': r.status,
-                'priority': r.priority,
-                'created_at': r.created_at.isoformat(),
-                'updated_at': r.updated_at.isoformat(),
-                'category': {
-                    'id': r.category.id,
-                    'name': r.category.name,
-                    'icon': r.category.icon
-                },
-                'reporter': {
-                    'id': r.reporter.id,
-                    'username': r.reporter.username,
-                    'full_name': r.reporter.full_name
-                }
-            } for r in reports.items],
-            'pagination': {
-                'page': page,
-                'pages': reports.pages,
-                'per_page': per_page,
-                'total': reports.total,
-                'has_next': reports.has_next,
-                'has_prev': reports.has_prev
-            }
-        })
+        key = f'reports:web:{page}:{per_page}:{status}:{category_id}'
+        return jsonify(cache.get_or_set(key, lambda: get_report_page(page, per_page, status, category_id),
+                                        tags=('reports', 'category')))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/reports/recent')
+@rate_limit(*parse_limit(app.config['RATELIMIT_API']), scope='api')
+def api_recent_reports():
+    """Laporan terbaru dari ring buffer, tanpa query DB (since=<id> untuk incremental)"""
+    since = request.args.get('since', type=int)
+    limit = min(request.args.get('limit', 10, type=int), recent_feed.size)
+    response = jsonify(recent_feed.recent(limit=limit, since=since))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/stats/summary')
+@rate_limit(*parse_limit(app.config['RATELIMIT_STATS']), scope='stats')
+@conditional('stats')
 def api_reports_stats():
     """API endpoint untuk statistik laporan"""
     try:
-        total_reports = Report.query.count()
-        total_users = User.query.count()
-        
-        stats_by_status = {
-            'pending': Report.query.filter_by(status='pending').count(),
-            'investigating': Report.query.filter_by(status='investigating').count(),
-            'resolved': Report.query.filter_by(status='resolved').count()
-        }
-        
-        stats_by_priority = {
-            'low': Report.query.filter_by(priority='low').count(),
-            'medium': Report.query.filter_by(priority='medium').count(),
-            'high': Report.query.filter_by(priority='high').count(),
-            'critical': Report.query.filter_by(priority='critical').count()
-        }
-        
-        categories_with_counts = []
-        for category in Category.query.all():
-            count = Report.query.filter_by(category_id=category.id).count()
-            categories_with_counts.append({
-                'id': category.id,
-                'name': category.name,
-                'icon': category.icon,
-                'count': count
-            })
-        
-        return jsonify({
-            'total_reports': total_reports,
-            'total_users': total_users,
-            'by_status': stats_by_status,
-            'by_priority': stats_by_priority,
-            'by_category': categories_with_counts
-        })
+        return jsonify(get_report_stats())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/reports/stats')
+@rate_limit(*parse_limit(app.config['RATELIMIT_STATS']), scope='stats')
+@conditional('stats')
 def api_reports_stats_alt():
     """Alternative stats endpoint for frontend compatibility"""
     try:
-        by_status = {
-            'pending': Report.query.filter_by(status='pending').count(),
-            'investigating': Report.query.filter_by(status='investigating').count(),
-            'resolved': Report.query.filter_by(status='resolved').count()
-        }
-        
-        by_category = []
-        for category in Category.query.all():
-            count = Report.query.filter_by(category_id=category.id).count()
-            by_category.append({
-                'name': category.name,
-                'count': count,
-                'icon': category.icon
-            })
+        stats = get_report_stats()
         
         return jsonify({
-            'by_status': by_status,
-            'by_category': by_category,
-            'total': Report.query.count()
+            'by_status': stats['by_status'],
+            'by_category': [{
+                'name': c['name'],
+                'count': c['count'],
+                'icon': c['icon']
+            } for c in stats['by_category']],
+            'total': stats['total_reports']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Register API Blueprint
+from api import api_bp
+app.register_blueprint(api_bp)
+
 # Error Handlers
 
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
+@app.errorhandler(HashingBusy)
+def hashing_busy_error(error):
+    """Pool hashing penuh: tolak cepat daripada mengantre"""
+    if request.path.startswith('/api/'):
+        response = jsonify({'message': 'Server busy, retry shortly'})
+    else:
+        flash('Server sedang sibuk, silakan coba lagi sebentar lagi.', 'error')
+        response = app.make_response(render_template('register.html' if request.endpoint == 'register'
+                                                     else 'login.html'))
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
 @app.errorhandler(500)
 def internal_error(error):
     db.session.rollback()
@@ -703,8 +1280,11 @@ def init_db():
         print("Database already initialized.")
 
 if __name__ == '__main__':
+    # api.py imports from 'app'; reuse this module instead of loading a second copy
+    sys.modules.setdefault('app', sys.modules[__name__])
     with app.app_context():
         init_db()
     print("\n🚀 Starting EcoReport Application...")
     print("📍 Access the application at: http://localhost:5000")
-    app.run(debug=True)
\ No newline at end of file
+    # Development server only, production runs serve.py (gunicorn)
+    app.run(debug=os.environ.get('FLASK_DEBUG', '0') == '1')
\ No newline at end of file
@@ -0,0 +1,372 @@
+"""
+ASGI server untuk EcoReport Application
+
+The read API mostly waits: on the database, and on clients reading the
+response or holding an SSE stream open. Under an ASGI server these
+endpoints run as coroutines with async database access, so one worker
+keeps serving other requests while queries and sends are in flight:
+
+    GET /api/v1/reports (also ?ids=), /api/v1/reports/<id>,
+        /api/v1/stats/summary, /api/v1/categories, /api/v1/stream
+
+    uvicorn asgi:application --workers 4
+
+Everything else, writes included, is passed to the Flask app through
+asgiref's WsgiToAsgi. The database is created by the WSGI side
+(python serve.py or python app.py).
+
+The async views run the same SELECTs as app.py and build their payloads
+with the same serializers, under the same cache keys and tags, so writes on
+either side invalidate what the other serves. Each request runs in a Flask
+request context built from the ASGI scope: before_request hooks (rate
+limiting), conditional GET, after_request hooks and error handlers behave
+as in the WSGI app. Blocking calls run in a thread: version stamps (they
+query through db.session), cache calls when the backend does I/O (sqlite,
+redis) and the API rate limit hook when its store is shared.
+
+The async engine opens the database behind db.engine with the async
+driver for its dialect (sqlite -> aiosqlite, postgresql -> asyncpg).
+"""
+
+import io
+import os
+import sys
+import asyncio
+from flask import request, jsonify, abort
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app import (app, db, cache, events, Report, User, categories_select, report_list_fields, report_list_select,
+                 page_window, report_page_payload, parse_report_ids, report_detail_fields, report_detail_selects,
+                 report_detail_payloads, report_stats_from_counts)
+from api import (api_rate_limit, report_list_args, report_fields_arg, report_list_key, report_detail_key, cached_report_details,
+                 cache_report_details, reports_by_id_payload, stream_last_event_id, stream_response)
+from http_cache import VERSION_STAMPS, validators, apply_validators, is_not_modified
+from serializers import category_serializer
+from cache import LocalCache, NullCache
+from security import limiter, MemoryRateLimitStore
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+def async_database_url(url):
+    """The same database with the async driver of its dialect"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver for {backend} databases')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncDatabase:
+    """Async engine for the app's database, created lazily per process"""
+
+    def __init__(self, app):
+        self.app = app
+        self._engine = None
+        self._sessionmaker = None
+        self._pid = None
+
+    def session(self):
+        if self._engine is None or self._pid != os.getpid():
+            with self.app.app_context():
+                url = async_database_url(db.engine.url)
+            self._engine = create_async_engine(url)
+            self._sessionmaker = async_sessionmaker(self._engine, expire_on_commit=False)
+            self._pid = os.getpid()
+        return self._sessionmaker()
+
+    async def dispose(self):
+        if self._engine is not None and self._pid == os.getpid():
+            await self._engine.dispose()
+        self._engine = None
+
+
+database = AsyncDatabase(app)
+
+
+async def _cache(method, *args, **kwargs):
+    """A cache call; backends doing I/O (sqlite, redis) run in a thread"""
+    if isinstance(cache, (LocalCache, NullCache)):
+        return method(*args, **kwargs)
+    return await asyncio.to_thread(method, *args, **kwargs)
+
+
+# Views (same payloads as the api.py views of the same endpoint)
+
+async def get_reports():
+    page, per_page, status, category_id = report_list_args()
+    fields = report_fields_arg()
+    if 'ids' in request.args:
+        return await _get_reports_by_id(fields)
+    try:
+        serializer = report_list_fields(fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    key = report_list_key(page, per_page, status, category_id, fields)
+    payload = await _cache(cache.get, key)
+    if payload is None:
+        items, count = report_list_select(status, category_id, serializer)
+        limit, offset = page_window(page, per_page)
+        async with database.session() as session:
+            rows = await session.execute(items.limit(limit).offset(offset))
+            payload = report_page_payload(serializer.rows(rows), await session.scalar(count), page, per_page)
+        await _cache(cache.set, key, payload, tags=('reports', 'category'))
+    return jsonify(payload)
+
+
+async def _report_details(report_ids, detail):
+    report_query, comments_query, attachments_query = report_detail_selects(report_ids, detail)
+    async with database.session() as session:
+        report_rows = (await session.execute(report_query)).all()
+        if not report_rows:
+            return {}
+        return report_detail_payloads(
+            report_rows,
+            await session.execute(comments_query) if comments_query is not None else None,
+            await session.scalars(attachments_query) if attachments_query is not None else None,
+            detail
+        )
+
+
+async def _get_reports_by_id(fields):
+    try:
+        report_ids = parse_report_ids(request.args['ids'])
+        detail = report_detail_fields(fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    payloads, missing = await _cache(cached_report_details, report_ids, fields)
+    if missing:
+        fetched = await _report_details(missing, detail)
+        await _cache(cache_report_details, fetched, fields)
+        payloads.update(fetched)
+    return jsonify(reports_by_id_payload(report_ids, payloads))
+
+
+async def get_report(report_id):
+    fields = report_fields_arg()
+    try:
+        detail = report_detail_fields(fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    key = report_detail_key(report_id, fields)
+    payload = await _cache(cache.get, key)
+    if payload is None:
+        payload = (await _report_details([report_id], detail)).get(report_id)
+        if payload is None:
+            abort(404)
+        await _cache(cache.set, key, payload, tags=(f'report:{report_id}', 'category'))
+    return jsonify(payload)
+
+
+async def _categories(session):
+    payload = await _cache(cache.get, 'categories')
+    if payload is None:
+        payload = category_serializer().rows(await session.execute(categories_select()))
+        await _cache(cache.set, 'categories', payload, tags=('category',))
+    return payload
+
+
+async def get_categories():
+    async with database.session() as session:
+        return jsonify(await _categories(session))
+
+
+async def get_stats():
+    payload = await _cache(cache.get, 'stats:summary')
+    if payload is None:
+        async with database.session() as session:
+            counts = [dict((await session.execute(select(column, func.count(Report.id)).group_by(column))).all())
+                      for column in (Report.status, Report.priority, Report.category_id)]
+            total_users = await session.scalar(select(func.count(User.id)))
+            payload = report_stats_from_counts(*counts, total_users, await _categories(session))
+        await _cache(cache.set, 'stats:summary', payload, tags=('stats', 'category'))
+    return jsonify(payload)
+
+
+# endpoint -> (version stamp, view)
+ASYNC_VIEWS = {
+    'api.api_get_reports': ('reports', get_reports),
+    'api.api_get_report': ('report', get_report),
+    'api.api_get_categories': ('categories', get_categories),
+    'api.api_get_stats': ('stats', get_stats),
+}
+STREAM_ENDPOINT = 'api.api_stream'
+
+
+# Request handling
+
+async def _conditional(stamp_name, view, kwargs):
+    """http_cache.conditional for an async view"""
+    if not app.config.get('CONDITIONAL_GET_ENABLED', True):
+        return await view(**kwargs)
+
+    version = await asyncio.to_thread(VERSION_STAMPS[stamp_name], **kwargs)
+    if version is None:
+        return await view(**kwargs)
+
+    etag, last_modified = validators(version)
+    if is_not_modified(etag, last_modified):
+        return apply_validators(app.make_response(('', 304)), etag, last_modified)
+
+    response = app.make_response(await view(**kwargs))
+    if response.status_code == 200:
+        apply_validators(response, etag, last_modified)
+    return response
+
+
+# before_request hooks that wait on the rate limit store
+BLOCKING_HOOKS = (api_rate_limit,)
+
+
+async def _preprocess_request():
+    """app.preprocess_request(), with BLOCKING_HOOKS in a thread when the store is shared"""
+    offload = not isinstance(limiter.store, MemoryRateLimitStore)
+    names = (None, *reversed(request.blueprints))
+    for name in names:
+        for url_func in app.url_value_preprocessors.get(name, ()):
+            url_func(request.endpoint, request.view_args)
+    for name in names:
+        for before_func in app.before_request_funcs.get(name, ()):
+            if offload and before_func in BLOCKING_HOOKS:
+                rv = await asyncio.to_thread(before_func)
+            else:
+                rv = app.ensure_sync(before_func)()
+            if rv is not None:
+                return rv
+    return None
+
+
+async def _dispatch(stamp_name, view):
+    """Flask's full_dispatch_request() with an async view"""
+    try:
+        try:
+            rv = await _preprocess_request()
+            if rv is None:
+                rv = await _conditional(stamp_name, view, request.view_args)
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        return app.finalize_request(rv)
+    except Exception as e:
+        return app.handle_exception(e)
+
+
+async def _start(send, response):
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in response.headers.items()],
+    })
+
+
+async def _send(send, response):
+    await _start(send, response)
+    body = b'' if request.method == 'HEAD' else response.get_data()
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _stream(receive, send):
+    """/api/v1/stream from events.astream(), without a thread per client"""
+    rv = await _preprocess_request()
+    if rv is not None:
+        return await _send(send, app.finalize_request(rv))
+
+    response = app.process_response(stream_response())
+    await _start(send, response)
+    if request.method == 'HEAD':
+        return await send({'type': 'http.response.body', 'body': b''})
+
+    body = events.astream(stream_last_event_id(), timeout=app.config.get('EVENTS_STREAM_TIMEOUT', 300))
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        while True:
+            chunk = asyncio.ensure_future(body.__anext__())
+            await asyncio.wait((chunk, disconnected), return_when=asyncio.FIRST_COMPLETED)
+            if not chunk.done():
+                # Client went away while waiting for the next event
+                chunk.cancel()
+                await asyncio.gather(chunk, return_exceptions=True)
+                break
+            try:
+                data = chunk.result()
+            except StopAsyncIteration:
+                await send({'type': 'http.response.body', 'body': b''})
+                break
+            await send({'type': 'http.response.body', 'body': data.encode(), 'more_body': True})
+    finally:
+        disconnected.cancel()
+        await body.aclose()
+
+
+def _environ(scope):
+    """WSGI environ of an ASGI request without a body, for a Flask request context"""
+    script_name = scope.get('root_path', '').encode('utf-8').decode('latin-1')
+    path_info = scope['path'].encode('utf-8').decode('latin-1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('',))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        if name in ('content-type', 'content-length'):
+            key = name.upper().replace('-', '_')
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await database.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+wsgi = WsgiToAsgi(app)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') and scope['path'].startswith('/api/v1/'):
+        with app.request_context(_environ(scope)):
+            if request.endpoint in ASYNC_VIEWS:
+                return await _send(send, await _dispatch(*ASYNC_VIEWS[request.endpoint]))
+            if request.endpoint == STREAM_ENDPOINT:
+                return await _stream(receive, send)
+
+    await wsgi(scope, receive, send)
@@ -0,0 +1,305 @@
+"""
+Static asset pipeline untuk EcoReport Application
+
+The build step vendors the CDN bundles, minifies CSS/JS (when rcssmin and
+rjsmin are installed), renames every file with a content hash, writes
+.gz/.br variants next to it and records the mapping in
+static/dist/manifest.json:
+
+    python assets.py build [static_dir]
+
+Templates call ``asset_url('css/style.css')``. With a manifest the URL
+points at /assets/<fingerprinted file>, served with immutable caching
+and the best precompressed variant. Without a build it falls back to
+/static/ (or the CDN for vendor bundles) so development needs no build.
+"""
+
+import os
+import re
+import sys
+import json
+import gzip
+import shutil
+import hashlib
+import mimetypes
+import urllib.request
+from urllib.parse import urljoin
+from flask import Blueprint, current_app, request, send_from_directory, url_for, abort
+
+try:
+    import brotli
+except ImportError:  # optional, only .gz variants are written without it
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # optional, CSS is copied unminified without it
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # optional, JS is copied unminified without it
+    rjsmin = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Logical name (relative to static/) -> CDN URL used by base.html and sw.js
+VENDOR_BUNDLES = {
+    'vendor/bootstrap/css/bootstrap.min.css':
+        'https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/css/bootstrap.min.css',
+    'vendor/bootstrap/js/bootstrap.bundle.min.js':
+        'https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/js/bootstrap.bundle.min.js',
+    'vendor/font-awesome/css/all.min.css':
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+    'vendor/chart.js/chart.min.js':
+        'https://cdnjs.cloudflare.com/ajax/libs/Chart.js/3.9.1/chart.min.js',
+}
+
+# First-party sources that get minified
+SOURCE_ASSETS = ['css/style.css', 'js/main.js']
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.ttf', '.eot', '.map'}
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+assets_bp = Blueprint('assets', __name__, url_prefix='/assets')
+
+
+def minify_css(source):
+    """Minify CSS with rcssmin; without it the source is returned unchanged"""
+    if rcssmin is None:
+        return source
+    return rcssmin.cssmin(source)
+
+
+def minify_js(source):
+    """Minify JS with rjsmin; without it the source is returned unchanged"""
+    if rjsmin is None:
+        return source
+    return rjsmin.jsmin(source)
+
+
+def _fingerprint(relative_path, content):
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    root, ext = os.path.splitext(relative_path)
+    return f'{root}.{digest}{ext}'
+
+
+class AssetBuilder:
+    """Build fingerprinted, minified and precompressed assets into static/dist"""
+
+    def __init__(self, static_dir=STATIC_DIR, log=print):
+        self.static_dir = str(static_dir)
+        self.dist_dir = os.path.join(self.static_dir, DIST_DIRNAME)
+        self.log = log
+
+    def vendor(self, refresh=False):
+        """Download CDN bundles (and the fonts their CSS references) into static/vendor"""
+        for name, url in VENDOR_BUNDLES.items():
+            target = os.path.join(self.static_dir, name)
+            if not refresh and os.path.exists(target):
+                continue
+            try:
+                content = self._download(url, target)
+                if name.endswith('.css'):
+                    self._vendor_css_dependencies(url, target, content.decode('utf-8'))
+                self.log(f"✓ Vendored {name}")
+            except OSError as e:
+                self.log(f"⚠ Could not vendor {name} ({e}), templates will use the CDN")
+
+    def _download(self, url, target):
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = response.read()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+        return content
+
+    def _vendor_css_dependencies(self, css_url, css_target, css):
+        for _, ref in CSS_URL.findall(css):
+            ref = ref.split('#')[0].split('?')[0]
+            if not ref or ref.startswith(('data:', 'http:', 'https:', '/')):
+                continue
+            target = os.path.normpath(os.path.join(os.path.dirname(css_target), ref))
+            if not os.path.exists(target):
+                self._download(urljoin(css_url, ref), target)
+
+    def collect(self):
+        """Relative paths of every file that goes into the build"""
+        names = [name for name in SOURCE_ASSETS if os.path.exists(os.path.join(self.static_dir, name))]
+        vendor_dir = os.path.join(self.static_dir, 'vendor')
+        for root, _, files in os.walk(vendor_dir):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                names.append(os.path.relpath(path, self.static_dir).replace(os.sep, '/'))
+        return names
+
+    def build(self, vendor=True):
+        """Run the full pipeline and return the manifest"""
+        if vendor:
+            self.vendor()
+        if rcssmin is None or rjsmin is None:
+            # A regex minifier would mangle strings and template literals; ship the sources as they are
+            self.log("⚠ rcssmin/rjsmin not installed, CSS/JS is copied without minifying")
+
+        if os.path.exists(self.dist_dir):
+            shutil.rmtree(self.dist_dir)
+        os.makedirs(self.dist_dir)
+
+        names = self.collect()
+        # Non-CSS first so stylesheets can point at fingerprinted fonts/images
+        names.sort(key=lambda name: name.endswith('.css'))
+
+        assets = {}
+        for name in names:
+            content = self._load(name, assets)
+            fingerprinted = _fingerprint(name, content)
+            self._write(fingerprinted, content)
+            assets[name] = fingerprinted
+
+        build_id = hashlib.sha256(json.dumps(assets, sort_keys=True).encode()).hexdigest()[:12]
+        manifest = {'build_id': build_id, 'assets': assets}
+        with open(os.path.join(self.dist_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        self.log(f"✓ Built {len(assets)} assets (build {build_id})")
+        return manifest
+
+    def _load(self, name, built):
+        with open(os.path.join(self.static_dir, name), 'rb') as f:
+            content = f.read()
+
+        is_minified = '.min.' in os.path.basename(name)
+        if name.endswith('.css'):
+            css = content.decode('utf-8')
+            if not is_minified:
+                css = minify_css(css)
+            css = self._rewrite_css_urls(name, css, built)
+            return css.encode('utf-8')
+        if name.endswith('.js') and not is_minified:
+            return minify_js(content.decode('utf-8')).encode('utf-8')
+        return content
+
+    def _rewrite_css_urls(self, name, css, built):
+        base = os.path.dirname(name)
+
+        def replace(match):
+            quote, ref = match.groups()
+            split = re.search(r'[?#]', ref)
+            path, suffix = (ref[:split.start()], ref[split.start():]) if split else (ref, '')
+            if not path or path.startswith(('data:', 'http:', 'https:', '/')):
+                return match.group(0)
+            target = os.path.normpath(os.path.join(base, path)).replace(os.sep, '/')
+            if target not in built:
+                return match.group(0)
+            new_path = os.path.relpath(built[target], base or '.').replace(os.sep, '/')
+            return f'url({quote}{new_path}{suffix}{quote})'
+
+        return CSS_URL.sub(replace, css)
+
+    def _write(self, relative_path, content):
+        target = os.path.join(self.dist_dir, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+
+        if os.path.splitext(relative_path)[1] not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with open(target + '.gz', 'wb') as f:
+            # mtime=0 keeps the output reproducible between builds
+            with gzip.GzipFile(filename='', mode='wb', fileobj=f, compresslevel=9, mtime=0) as gz:
+                gz.write(content)
+        if brotli is not None:
+            with open(target + '.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+
+
+class AssetManifest:
+    """Lazily loaded manifest, reloaded when the file changes in debug mode"""
+
+    def __init__(self, static_dir=STATIC_DIR):
+        self.path = os.path.join(static_dir, DIST_DIRNAME, MANIFEST_NAME)
+        self._mtime = None
+        self._data = None
+
+    def load(self, check=False):
+        if self._data is None or check:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                self._data, self._mtime = {'build_id': None, 'assets': {}}, None
+                return self._data
+            if mtime != self._mtime:
+                with open(self.path) as f:
+                    self._data = json.load(f)
+                self._mtime = mtime
+        return self._data
+
+    @property
+    def build_id(self):
+        return self.load().get('build_id')
+
+
+manifest = AssetManifest()
+
+
+def asset_url(name):
+    """URL for a static asset, fingerprinted when a build exists"""
+    data = manifest.load(check=current_app.debug)
+    fingerprinted = data['assets'].get(name)
+    if fingerprinted:
+        return url_for('assets.serve_asset', filename=fingerprinted)
+    if name in VENDOR_BUNDLES and not os.path.exists(os.path.join(current_app.static_folder, name)):
+        return VENDOR_BUNDLES[name]
+    return url_for('static', filename=name)
+
+
+def asset_build_id():
+    """Id of the current build, used to version service worker caches"""
+    return manifest.load(check=current_app.debug).get('build_id') or 'dev'
+
+
+@assets_bp.route('/<path:filename>')
+def serve_asset(filename):
+    """Serve a built asset, preferring a precompressed variant"""
+    dist_dir = os.path.join(current_app.static_folder, DIST_DIRNAME)
+
+    if filename == MANIFEST_NAME:
+        response = send_from_directory(dist_dir, filename, max_age=0)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    if not os.path.isfile(os.path.join(dist_dir, filename)):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encodings = request.accept_encodings
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encodings[encoding] and os.path.isfile(os.path.join(dist_dir, filename + suffix)):
+            response = send_from_directory(dist_dir, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(dist_dir, filename, mimetype=mimetype)
+
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def init_app(app):
+    """Register the /assets route and the asset template helpers"""
+    app.register_blueprint(assets_bp)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.jinja_env.globals['asset_build_id'] = asset_build_id
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        print("Usage: python assets.py build [static_dir]")
+        sys.exit(1)
+
+    AssetBuilder(sys.argv[2] if len(sys.argv) > 2 else STATIC_DIR).build()
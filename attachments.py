@@ -0,0 +1,356 @@
+"""
+Attachment uploads untuk EcoReport Application
+
+Multipart file parts are streamed by UploadRequest straight into
+temporary files inside UPLOAD_FOLDER, so large photos never sit in
+worker memory and storing them is a hard link rather than a copy.
+
+Files are stored once per content: the path is derived from the SHA-256
+(blobs/ab/cd/abcd...), so the same photo attached to several reports
+shares one file and one thumbnail. The Blob table counts references;
+`python attachments.py gc` removes blobs nothing points to any more.
+
+Thumbnails are rendered by a process pool after the upload is committed;
+pages show a placeholder until the thumbnail file appears.
+
+send_blob serves stored files with ETag, Last-Modified and single byte
+ranges. With ATTACHMENT_SENDFILE='x-accel' (nginx) or 'x-sendfile'
+(Apache/lighttpd) the body is left to the front proxy, e.g. for nginx:
+
+    location /_uploads/ { internal; alias /app/static/uploads/; }
+
+Served directly, the file goes out through wsgi.file_wrapper, which
+gunicorn turns into sendfile(2) for ranges as well as whole files.
+"""
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import unicodedata
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+from flask import Request, Response, current_app, request, abort
+from werkzeug.http import parse_range_header, is_resource_modified
+from werkzeug.wsgi import wrap_file
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional, attachments are stored without thumbnails
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_SUFFIX = '.thumb.jpg'
+TMP_DIRNAME = '.tmp'
+BLOB_DIRNAME = 'blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+# Spools are created 0600; the proxy serving X-Sendfile/X-Accel-Redirect must read blobs
+BLOB_MODE = 0o644
+
+
+def is_image(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+class UploadRequest(Request):
+    """Request that spools uploaded files to disk next to their destination"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Deleted when the request closes its files; store_blob links it into place first
+        return tempfile.NamedTemporaryFile('wb+', dir=tmp_dir(current_app.config['UPLOAD_FOLDER']),
+                                           prefix='upload-')
+
+
+def tmp_dir(upload_folder):
+    path = os.path.join(upload_folder, TMP_DIRNAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def blob_path(sha256):
+    """Relative path of a blob, sharded by the first two hash bytes"""
+    return f'{BLOB_DIRNAME}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_blob(file_storage, upload_folder):
+    """Store an upload by content hash, return (sha256, relative path, size)"""
+    stream = file_storage.stream
+    source = getattr(stream, 'name', None)
+    if isinstance(source, str) and os.path.isfile(source):
+        stream.flush()
+        return link_blob(source, upload_folder)
+
+    # Not spooled by UploadRequest (e.g. an in-memory FileStorage)
+    with tempfile.NamedTemporaryFile('wb+', dir=tmp_dir(upload_folder), prefix='upload-') as spooled:
+        file_storage.save(spooled)
+        spooled.flush()
+        return link_blob(spooled.name, upload_folder)
+
+
+def link_blob(source, upload_folder, sha256=None):
+    """Hard link a file into the blob store unless that content is already there"""
+    sha256 = sha256 or file_sha256(source)
+    relative_path = blob_path(sha256)
+    target = os.path.join(upload_folder, relative_path)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(source, BLOB_MODE)
+        try:
+            os.link(source, target)
+        except FileExistsError:
+            pass  # same content stored concurrently
+        except OSError:
+            # Different filesystem or no hard link support
+            partial = f'{target}.{os.getpid()}.part'
+            shutil.copyfile(source, partial)
+            os.chmod(partial, BLOB_MODE)
+            os.replace(partial, target)
+    return sha256, relative_path, os.path.getsize(target)
+
+
+def render_thumbnail(source, target, size=THUMBNAIL_SIZE):
+    """Write a JPEG thumbnail (runs in a pool process)"""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        partial = target + '.part'
+        image.save(partial, 'JPEG', quality=80, optimize=True)
+    # Atomic, so pages never show a half-written thumbnail
+    os.replace(partial, target)
+    return target
+
+
+class ThumbnailPool:
+    """Process pool for thumbnail rendering, created lazily per worker process"""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # spawn: forking a threaded web worker is not safe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, source, target):
+        """Queue a thumbnail; returns a Future, or None without Pillow"""
+        if Image is None:
+            return None
+        future = self._get_executor().submit(render_thumbnail, source, target)
+        future.add_done_callback(_log_failure)
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.warning('Thumbnail rendering failed: %s', error)
+
+
+class FileRange:
+    """File object limited to length bytes from its current position
+
+    Keeps fileno() so gunicorn can still sendfile() it; the Content-Length
+    of the response tells it where to stop.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _content_disposition(headers, download_name):
+    # Same encoding as werkzeug's send_file: ASCII fallback plus RFC 5987 filename*
+    try:
+        download_name.encode('ascii')
+        names = {'filename': download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='!#$&+^`|~')}"}
+    headers.set('Content-Disposition', 'inline', **names)
+
+
+def send_blob(relative_path, content_type, etag, download_name=None):
+    """Serve a file from UPLOAD_FOLDER (conditional, single range, offloaded or sendfile)"""
+    config = current_app.config
+    response = Response(mimetype=content_type, direct_passthrough=True)
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = config.get('ATTACHMENT_CACHE_MAX_AGE', 86400)
+    if download_name:
+        _content_disposition(response.headers, download_name)
+
+    mode = config.get('ATTACHMENT_SENDFILE')
+    if mode == 'x-accel':
+        # nginx answers Range and conditional requests from the internal location
+        response.headers['X-Accel-Redirect'] = f"{config['ATTACHMENT_ACCEL_PREFIX'].rstrip('/')}/{relative_path}"
+        return response
+    path = os.path.join(config['UPLOAD_FOLDER'], relative_path)
+    if mode == 'x-sendfile':
+        response.headers['X-Sendfile'] = path
+        return response
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        abort(404)
+    response.last_modified = int(stat.st_mtime)
+    response.accept_ranges = 'bytes'
+    environ = request.environ
+    if not is_resource_modified(environ, etag=etag, last_modified=response.last_modified):
+        response.status_code = 304
+        return response
+
+    start, stop = 0, stat.st_size
+    if_range_matches = 'HTTP_IF_RANGE' not in environ or not is_resource_modified(
+        environ, etag=etag, last_modified=response.last_modified, ignore_if_range=False)
+    if 'HTTP_RANGE' in environ and stat.st_size and if_range_matches:
+        requested = parse_range_header(environ['HTTP_RANGE'])
+        byte_range = requested.range_for_length(stat.st_size) if requested else None
+        if byte_range is None:
+            if requested is None or len(requested.ranges) == 1:
+                response.status_code = 416
+                response.content_range = f'bytes */{stat.st_size}'
+                return response
+            # Multiple ranges: answer with the whole file (allowed by RFC 9110)
+        else:
+            start, stop = byte_range
+            response.status_code = 206
+            response.content_range = requested.to_content_range_header(stat.st_size)
+
+    file = open(path, 'rb')
+    file.seek(start)
+    response.response = wrap_file(environ, FileRange(file, stop - start))
+    response.content_length = stop - start
+    return response
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def collect_garbage(upload_folder, grace_period=3600, recount=False, dry_run=False):
+    """Delete unreferenced blobs and stale temp files, return the removed blob hashes
+
+    Blobs stay for grace_period seconds after their last reference change, so an
+    upload that is storing the same content right now does not lose its file.
+    """
+    from app import db, Blob, Attachment
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_period)
+
+    if recount:
+        # Repair counts drifted by deletes that bypassed the ORM
+        counts = dict(db.session.query(Attachment.blob_sha256, db.func.count(Attachment.id))
+                      .group_by(Attachment.blob_sha256).all())
+        for blob in Blob.query.all():
+            blob.refcount = counts.get(blob.sha256, 0)
+        if not dry_run:
+            db.session.commit()
+
+    removed = []
+    unreferenced = db.session.query(Blob.sha256).filter(Blob.refcount <= 0, Blob.updated_at < cutoff).all()
+    for (sha256,) in unreferenced:
+        if dry_run:
+            removed.append(sha256)
+            continue
+        # Only when still unreferenced, a concurrent upload may have claimed it
+        deleted = db.session.execute(
+            Blob.__table__.delete().where(Blob.sha256 == sha256, Blob.refcount <= 0)
+        ).rowcount
+        db.session.commit()
+        if deleted:
+            removed.append(sha256)
+            path = os.path.join(upload_folder, blob_path(sha256))
+            _remove(path)
+            _remove(path + THUMBNAIL_SUFFIX)
+    db.session.expire_all()
+
+    # Files without a row: uploads whose transaction failed, interrupted temp files
+    known = {sha256 for (sha256,) in db.session.query(Blob.sha256)}
+    expired = time.time() - grace_period
+    for root, _, files in os.walk(os.path.join(upload_folder, BLOB_DIRNAME)):
+        for name in files:
+            path = os.path.join(root, name)
+            sha256 = name.split('.', 1)[0]
+            if sha256 not in known and os.path.getmtime(path) < expired:
+                if sha256 not in removed:
+                    removed.append(sha256)
+                if not dry_run:
+                    _remove(path)
+    temp = os.path.join(upload_folder, TMP_DIRNAME)
+    if os.path.isdir(temp) and not dry_run:
+        for name in os.listdir(temp):
+            path = os.path.join(temp, name)
+            if os.path.getmtime(path) < expired:
+                _remove(path)
+    return removed
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'gc':
+        print("Usage: python attachments.py gc [--dry-run] [--recount] [--grace SECONDS]")
+        sys.exit(1)
+
+    sys.modules.setdefault('attachments', sys.modules[__name__])
+    from app import app, db
+    from resumable import purge_uploads
+    grace = int(sys.argv[sys.argv.index('--grace') + 1]) if '--grace' in sys.argv else 3600
+    with app.app_context():
+        db.create_all()
+        removed = collect_garbage(app.config['UPLOAD_FOLDER'], grace_period=grace,
+                                  recount='--recount' in sys.argv, dry_run='--dry-run' in sys.argv)
+        if '--dry-run' not in sys.argv:
+            expired = purge_uploads(app.config['UPLOAD_FOLDER'], app.config['RESUMABLE_EXPIRY'])
+            print(f"Removed {expired} expired resumable upload(s)")
+    verb = 'Would remove' if '--dry-run' in sys.argv else 'Removed'
+    print(f"{verb} {len(removed)} unreferenced blob(s)")
@@ -0,0 +1,115 @@
+"""
+Benchmark ASGI read API untuk EcoReport Application
+
+Starts the app twice, each as a single worker process: once under gunicorn
+with serve.py's gthread settings, once under uvicorn with asgi.py. Keep-alive
+clients then fetch /api/v1/reports as fast as they can, first alone and then
+while browsers hold SSE streams open on /api/v1/stream. The response cache is
+off (CACHE_BACKEND=null), so every request queries the database.
+
+    python benchmarks/bench_asgi.py [seconds] [clients] [streams] [threads]
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH = '/api/v1/reports?per_page=20'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start(command, port):
+    env = dict(os.environ, CACHE_BACKEND='null', RATELIMIT_ENABLED='false', PYTHONPATH=ROOT)
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{command[0]} did not start')
+
+
+async def client(port, stop, counts):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = f'GET {PATH} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode()
+    try:
+        while not stop.is_set():
+            writer.write(request)
+            headers = await reader.readuntil(b'\r\n\r\n')
+            length = int(next(line.split(b':')[1] for line in headers.split(b'\r\n')
+                              if line.lower().startswith(b'content-length')))
+            await reader.readexactly(length)
+            counts[0] += 1
+    finally:
+        writer.close()
+
+
+async def stream(port, stop):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'GET /api/v1/stream HTTP/1.1\r\nHost: localhost\r\n\r\n')
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(reader.read(4096), 0.5)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        writer.close()
+
+
+async def measure(port, seconds, clients, streams):
+    stop = asyncio.Event()
+    counts = [0]
+    holders = [asyncio.create_task(stream(port, stop)) for _ in range(streams)]
+    await asyncio.sleep(0.5 if streams else 0)
+    workers = [asyncio.create_task(client(port, stop, counts)) for _ in range(clients)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    # Clients blocked behind busy threads may never get an answer
+    await asyncio.wait(workers + holders, timeout=5)
+    for task in workers + holders:
+        task.cancel()
+    return counts[0] / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    streams = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    threads = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+
+    servers = {
+        f'gunicorn gthread ({threads} threads)': lambda port: [
+            sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}', '--workers', '1', '--threads', str(threads)],
+        'uvicorn asgi.py': lambda port: [
+            sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port), '--workers', '1',
+            '--log-level', 'warning', '--no-access-log'],
+    }
+    print(f"GET {PATH}, {clients} keep-alive clients, {seconds:g}s per run\n")
+    print(f"{'server':<28} {'req/s':>9} {f'req/s with {streams} SSE streams':>30}")
+    for label, command in servers.items():
+        port = free_port()
+        process = start(command(port), port)
+        try:
+            alone = asyncio.run(measure(port, seconds, clients, 0))
+            with_streams = asyncio.run(measure(port, seconds, clients, streams))
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{label:<28} {alone:9.0f} {with_streams:30.0f}")
+
+
+if __name__ == '__main__':
+    main()
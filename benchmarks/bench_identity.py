@@ -0,0 +1,91 @@
+"""
+Benchmark identity cache untuk EcoReport Application
+
+Times the authentication step of a request (Flask-Login's user_loader and
+the API's token_required) with the identity cache and token memo enabled
+and disabled, and counts the SQL statements each one issues.
+
+    python benchmarks/bench_identity.py [iterations]
+"""
+
+import os
+import sys
+import time
+import secrets
+import warnings
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from app import app, db, User, identities, load_user
+from api import token_required, tokens
+
+
+def measure(label, fn, iterations, statements):
+    with app.app_context():
+        fn()  # warm up (fills the caches)
+    del statements[:]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        # Fresh app context per call, like a request
+        with app.app_context():
+            fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed / iterations * 1e6:8.1f} us/request  "
+          f"{len(statements) / iterations:4.1f} queries/request")
+    return elapsed
+
+
+def main():
+    warnings.simplefilter('ignore')  # short dev SECRET_KEY
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    name = f'bench-{secrets.token_hex(4)}'
+
+    with app.app_context():
+        db.create_all()
+        user = User(username=name, email=f'{name}@example.com', full_name='Benchmark',
+                    password_hash=generate_password_hash('bench'))
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    token = jwt.encode({'user_id': user_id, 'exp': datetime.utcnow() + timedelta(hours=1)}, app.config['SECRET_KEY'])
+
+    @token_required
+    def api_view(current_user):
+        return current_user.id
+
+    def session_auth():
+        assert load_user(str(user_id)).id == user_id
+
+    def token_auth():
+        with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+            assert api_view() == user_id
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    try:
+        print(f"{iterations} iterations\n")
+        ttl, memo_size = identities.ttl, tokens.maxsize
+        identities.ttl, tokens.maxsize = 0, 0
+        tokens.clear()
+        baseline = (measure('user_loader, no cache', session_auth, iterations, statements),
+                    measure('token_required, no cache', token_auth, iterations, statements))
+        identities.ttl, tokens.maxsize = ttl, memo_size
+        cached = (measure('user_loader, identity cache', session_auth, iterations, statements),
+                  measure('token_required, cache + memo', token_auth, iterations, statements))
+        print()
+        for label, before, after in zip(('user_loader', 'token_required'), baseline, cached):
+            print(f"{label:<34} {before / after:8.1f}x faster")
+    finally:
+        with app.app_context():
+            User.query.filter_by(username=name).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
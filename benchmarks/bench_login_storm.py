@@ -0,0 +1,123 @@
+"""
+Benchmark login storm untuk EcoReport Application
+
+Serves the app from a worker with a fixed number of request threads (like
+gunicorn's gthread worker), fires a storm of API logins at it and times
+the dashboard meanwhile. Once with password hashing inline on the request
+threads, once on the bounded pool from hashing.py; logins rejected with
+503 are counted.
+
+    python benchmarks/bench_login_storm.py [seconds] [login clients] [request threads]
+"""
+
+import os
+import sys
+import json
+import time
+import secrets
+import threading
+import logging
+import statistics
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+from app import app, db, User, hasher
+from security import login_throttle
+
+
+def serve(request_threads):
+    """Werkzeug server handling requests on a fixed pool of threads"""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    pool = ThreadPoolExecutor(max_workers=request_threads)
+    server.process_request = lambda request, address: pool.submit(server.process_request_thread, request, address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, pool
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def run(label, port, seconds, clients, credentials):
+    stop = threading.Event()
+    statuses = {}
+    lock = threading.Lock()
+
+    def storm():
+        while not stop.is_set():
+            status = request(port, 'POST', '/api/v1/auth/login', credentials)
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    def dashboard():
+        start = time.perf_counter()
+        request(port, 'GET', '/')
+        return (time.perf_counter() - start) * 1000
+
+    idle = [dashboard() for _ in range(20)]
+    threads = [threading.Thread(target=storm) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    busy = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        busy.append(dashboard())
+        time.sleep(0.05)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    # A stalled dashboard may only get a handful of samples in
+    p95 = statistics.quantiles(busy, n=20)[18] if len(busy) > 1 else busy[0]
+    print(f"{label:<18} idle p50 {statistics.median(idle):7.1f} ms  storm p50 {statistics.median(busy):7.1f} ms  "
+          f"p95 {p95:7.1f} ms  ({len(busy)} samples)  logins 200: {statuses.get(200, 0)}  503: {statuses.get(503, 0)}")
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    request_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    name = f'bench-{secrets.token_hex(4)}'
+    credentials = {'username': name, 'password': 'bench'}
+
+    app.config['RATELIMIT_ENABLED'] = False
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username=name, email=f'{name}@example.com', full_name='Benchmark',
+                            password_hash=generate_password_hash('bench', hasher.method)))
+        db.session.commit()
+
+    server, pool = serve(request_threads)
+    port = server.server_port
+    print(f"{clients} login clients, {request_threads} request threads, {hasher.workers} hash workers, "
+          f"queue {hasher.max_pending}, {seconds:g}s per run\n")
+    try:
+        bounded = hasher._run
+        hasher._run = lambda fn, *args: fn(*args)
+        run('inline hashing', port, seconds, clients, credentials)
+        hasher._run = bounded
+        run('bounded hash pool', port, seconds, clients, credentials)
+    finally:
+        server.shutdown()
+        pool.shutdown()
+        login_throttle.reset()
+        with app.app_context():
+            User.query.filter_by(username=name).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark report serialization untuk EcoReport Application
+
+Builds a 1,000-row page of /api/v1/reports items and encodes it as a JSON
+response, the way the API did before serializers.py (ORM objects, a dict
+per row, Flask's stdlib JSON provider) and the way it does now (column
+tuples through the compiled RowSerializer, ORJSONProvider). The rows are
+added to the app database in a transaction that is rolled back at the end.
+
+    python benchmarks/bench_serializers.py [iterations] [rows]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+from app import app, db, init_db, User, Category, Report
+from serializers import ORJSONProvider, report_serializer
+
+
+def legacy_report_to_dict(r):
+    """The per-row dict built by the list views before serializers.py"""
+    return {
+        'id': r.id,
+        'title': r.title,
+        'description': r.description,
+        'location': r.location,
+        'latitude': r.latitude,
+        'longitude': r.longitude,
+        'status': r.status,
+        'priority': r.priority,
+        'created_at': r.created_at.isoformat(),
+        'updated_at': r.updated_at.isoformat(),
+        'category': {
+            'id': r.category.id,
+            'name': r.category.name,
+            'icon': r.category.icon
+        },
+        'reporter': {
+            'id': r.reporter.id,
+            'username': r.reporter.username,
+            'full_name': r.reporter.full_name
+        }
+    }
+
+
+def orm_lazy(limit):
+    reports = Report.query.order_by(Report.created_at.desc()).limit(limit).all()
+    return [legacy_report_to_dict(r) for r in reports]
+
+
+def orm_joined(limit):
+    reports = (Report.query.options(db.joinedload(Report.category), db.joinedload(Report.reporter))
+               .order_by(Report.created_at.desc()).limit(limit).all())
+    return [legacy_report_to_dict(r) for r in reports]
+
+
+def columns(limit):
+    serializer = report_serializer()
+    return serializer.rows(db.session.execute(serializer.select().order_by(Report.created_at.desc()).limit(limit)))
+
+
+def measure(build, provider, limit, iterations):
+    """(build ms, encode ms) per page, best of the iterations"""
+    build_times, encode_times = [], []
+    for _ in range(iterations):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        payload = build(limit)
+        built = time.perf_counter()
+        provider.response({'reports': payload}).get_data()
+        build_times.append(built - start)
+        encode_times.append(time.perf_counter() - built)
+    return min(build_times) * 1000, min(encode_times) * 1000
+
+
+def add_reports(count):
+    users = User.query.all()
+    categories = Category.query.all()
+    now = datetime.utcnow()
+    description = 'Tumpukan sampah di tepi sungai, mulai berbau dan menyumbat saluran air. ' * 4
+    db.session.add_all(Report(
+        title=f'Laporan benchmark {i}', description=description, location=f'Jl. Sungai No. {i}',
+        latitude=-6.2 + i / 1e4, longitude=106.8, status='pending', priority='medium',
+        created_at=now - timedelta(minutes=i), updated_at=now,
+        category_id=categories[i % len(categories)].id, user_id=users[i % len(users)].id
+    ) for i in range(count))
+    db.session.flush()
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with app.app_context(), app.test_request_context():
+        init_db()
+        add_reports(rows)
+        stdlib, fast = DefaultJSONProvider(app), ORJSONProvider(app)
+        variants = [
+            ('ORM, lazy relations, stdlib', orm_lazy, stdlib),
+            ('ORM, joinedload, stdlib', orm_joined, stdlib),
+            ('column tuples, stdlib', columns, stdlib),
+            ('column tuples, orjson', columns, fast),
+        ]
+        try:
+            print(f"{rows}-row page, best of {iterations}\n")
+            print(f"{'':<30} {'build':>9} {'encode':>9} {'total':>9}")
+            baseline = None
+            for label, build, provider in variants:
+                build_ms, encode_ms = measure(build, provider, rows, iterations)
+                total = build_ms + encode_ms
+                baseline = baseline or total
+                print(f"{label:<30} {build_ms:6.1f} ms {encode_ms:6.1f} ms {total:6.1f} ms  {baseline / total:4.1f}x")
+        finally:
+            db.session.rollback()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""
+Cache layer untuk EcoReport Application
+
+Backends share one interface and support tag-based invalidation:
+
+    local   in-process LRU with TTL (per process: a write invalidates only
+            the worker that made it, so use it with a single worker;
+            serve.py defaults to sqlite)
+    sqlite  SQLite file shared by every worker on the host
+    redis   Redis server shared by every host (requires the redis package)
+    null    caching disabled
+
+Values must be JSON-serializable so that every backend behaves the same.
+Cached values are shared between requests and must not be mutated.
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class BaseCache:
+    """Common cache interface"""
+
+    def __init__(self, default_ttl=300):
+        self.default_ttl = default_ttl
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None, tags=()):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def invalidate_tags(self, *tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_or_set(self, key, factory, ttl=None, tags=()):
+        """Return the cached value, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl=ttl, tags=tags)
+        return value
+
+    def _expires_at(self, ttl):
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+
+class NullCache(BaseCache):
+    """Cache that never stores anything"""
+
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value, ttl=None, tags=()):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def invalidate_tags(self, *tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LocalCache(BaseCache):
+    """Thread-safe in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        super().__init__(default_ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}                # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value, tags = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._expires_at(ttl), value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SQLiteCache(BaseCache):
+    """Cache stored in a SQLite file, shared by all workers on one host"""
+
+    def __init__(self, path, default_ttl=300):
+        super().__init__(default_ttl)
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            );
+            CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key);
+        ''')
+
+    def _connect(self):
+        # One connection per thread and per process (connections do not survive a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        row = self._connect().execute(
+            'SELECT value, expires_at FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        if row[1] is not None and row[1] <= time.time():
+            self.delete(key)
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None, tags=()):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, default=str), self._expires_at(ttl))
+            )
+            conn.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+            conn.executemany(
+                'INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)',
+                [(tag, key) for tag in tags]
+            )
+        if random.random() < 0.01:
+            self.purge_expired()
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+            conn.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+
+    def invalidate_tags(self, *tags):
+        if not tags:
+            return
+        marks = ','.join('?' * len(tags))
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                f'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag IN ({marks}))',
+                tags
+            )
+            conn.execute(
+                f'DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache_tags WHERE tag IN ({marks}))',
+                tags
+            )
+
+    def purge_expired(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'DELETE FROM cache_tags WHERE key IN '
+                '(SELECT key FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?)',
+                (time.time(),)
+            )
+            conn.execute(
+                'DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                (time.time(),)
+            )
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache_entries')
+            conn.execute('DELETE FROM cache_tags')
+
+
+class RedisCache(BaseCache):
+    """Cache stored in Redis, shared across hosts"""
+
+    # Add a key to a tag set; the set lives as long as its longest-lived entry (0: no expiry)
+    TAG_SCRIPT = """
+        local existed = redis.call('EXISTS', KEYS[1])
+        redis.call('SADD', KEYS[1], ARGV[1])
+        local ttl = tonumber(ARGV[2])
+        if ttl == 0 then
+            redis.call('PERSIST', KEYS[1])
+            return
+        end
+        local current = redis.call('TTL', KEYS[1])
+        if existed == 0 or (current >= 0 and current < ttl) then
+            redis.call('EXPIRE', KEYS[1], ttl)
+        end
+    """
+
+    def __init__(self, url, default_ttl=300, prefix='ecoreport:'):
+        super().__init__(default_ttl)
+        import redis  # optional dependency
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._tag = self.client.register_script(self.TAG_SCRIPT)
+
+    def _key(self, key):
+        return f'{self.prefix}{key}'
+
+    def _tag_key(self, tag):
+        return f'{self.prefix}tag:{tag}'
+
+    def get(self, key, default=None):
+        value = self.client.get(self._key(key))
+        return default if value is None else json.loads(value)
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = self.default_ttl if ttl is None else ttl
+        pipe = self.client.pipeline()
+        pipe.set(self._key(key), json.dumps(value, default=str), ex=ttl or None)
+        for tag in tags:
+            self._tag(keys=[self._tag_key(tag)], args=[key, ttl or 0], client=pipe)
+        pipe.execute()
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def invalidate_tags(self, *tags):
+        for tag in tags:
+            keys = self.client.smembers(self._tag_key(tag))
+            pipe = self.client.pipeline()
+            for key in keys:
+                pipe.delete(self._key(key.decode()))
+            pipe.delete(self._tag_key(tag))
+            pipe.execute()
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f'{self.prefix}*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_cache(app):
+    """Build the cache backend selected by CACHE_BACKEND"""
+    backend = app.config.get('CACHE_BACKEND', 'local')
+    ttl = int(app.config.get('CACHE_DEFAULT_TTL', 300))
+
+    if backend == 'null':
+        return NullCache(ttl)
+    if backend == 'sqlite':
+        path = app.config.get('CACHE_SQLITE_PATH') or os.path.join(app.instance_path, 'cache.db')
+        return SQLiteCache(path, default_ttl=ttl)
+    if backend == 'redis':
+        return RedisCache(app.config['CACHE_REDIS_URL'], default_ttl=ttl)
+    return LocalCache(max_entries=int(app.config.get('CACHE_MAX_ENTRIES', 1024)), default_ttl=ttl)
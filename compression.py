@@ -0,0 +1,152 @@
+"""
+Response compression untuk EcoReport Application
+
+Dynamic responses (HTML pages, API JSON, static CSS/JS) are compressed
+with brotli or gzip, whichever the client's Accept-Encoding prefers
+(brotli wins ties). It runs as the last after_request hook, so it covers
+the async views in asgi.py too. Responses are left alone when they are:
+
+- smaller than COMPRESS_MIN_SIZE bytes
+- not a compressible type (images, PDFs and archives are compressed already)
+- already encoded (the precompressed /assets/ files), partial (206),
+  bodiless (204, 304, HEAD) or handed to the proxy (X-Sendfile/X-Accel)
+- an SSE stream, which must reach the client event by event
+- marked Cache-Control: no-transform
+
+Streamed bodies are compressed chunk by chunk without buffering the whole
+response. A compressed response gets Vary: Accept-Encoding, loses
+Content-Length for streamed bodies and Accept-Ranges, and its ETag is
+weakened: the bytes differ from the identity representation, and
+http_cache matches If-None-Match with the weak comparison.
+"""
+
+import zlib
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+    'image/svg+xml',
+}
+SKIPPED_TYPES = {'text/event-stream'}
+PASSTHROUGH_HEADERS = ('Content-Encoding', 'X-Sendfile', 'X-Accel-Redirect')
+
+
+def is_compressible(mimetype):
+    if not mimetype or mimetype in SKIPPED_TYPES:
+        return False
+    return (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+            or mimetype.endswith(('+json', '+xml')))
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        # wbits 16+: gzip header and trailer instead of a raw zlib stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ResponseCompressor:
+    """Compress responses with the encoding negotiated from Accept-Encoding"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+        # after_request hooks run in reverse order: register first to run last
+        app.after_request_funcs.setdefault(None, []).insert(0, self._compress)
+
+    def encoding(self):
+        """Best supported encoding for the request, or None"""
+        accepted = request.accept_encodings
+        choices = [(accepted['br'], 1, 'br')] if brotli is not None else []
+        choices.append((accepted['gzip'], 0, 'gzip'))
+        quality, _, encoding = max(choices)
+        return encoding if quality > 0 else None
+
+    def encoder(self, encoding):
+        config = current_app.config
+        if encoding == 'br':
+            return BrotliEncoder(config['COMPRESS_BROTLI_QUALITY'])
+        return GzipEncoder(config['COMPRESS_GZIP_LEVEL'])
+
+    def _compress(self, response):
+        config = current_app.config
+        if not config.get('COMPRESS_ENABLED', True) or not is_compressible(response.mimetype):
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        if any(name in response.headers for name in PASSTHROUGH_HEADERS):
+            return response
+        if 'no-transform' in response.headers.get('Cache-Control', ''):
+            return response
+
+        min_size = config.get('COMPRESS_MIN_SIZE', 500)
+        if response.is_streamed:
+            # Sizes are only known for files; generators are always compressed
+            length = response.content_length
+            if length is not None and length < min_size:
+                return response
+        elif len(response.get_data()) < min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.encoding()
+        if encoding is None or request.method == 'HEAD':
+            return response
+
+        encoder = self.encoder(encoding)
+        if response.is_streamed:
+            response.response = self._stream(response.response, encoder)
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(encoder.compress(response.get_data()) + encoder.finish())
+
+        response.headers['Content-Encoding'] = encoding
+        response.headers.pop('Accept-Ranges', None)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _stream(self, body, encoder):
+        try:
+            for chunk in body:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                data = encoder.compress(chunk)
+                if data:
+                    yield data
+            yield encoder.finish()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
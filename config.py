@@ -10,13 +10,76 @@ class Config:
     # Upload configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'static/uploads'
+    MAX_ATTACHMENTS_PER_UPLOAD = int(os.environ.get('MAX_ATTACHMENTS_PER_UPLOAD') or 10)
+    # Thumbnail dibuat di process pool terpisah (lihat attachments.py)
+    THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS') or 2)
+    # Resumable upload (tus) untuk video/PDF besar; chunk tetap dibatasi MAX_CONTENT_LENGTH
+    RESUMABLE_MAX_SIZE = int(os.environ.get('RESUMABLE_MAX_SIZE') or 1024 * 1024 * 1024)
+    RESUMABLE_EXPIRY = int(os.environ.get('RESUMABLE_EXPIRY') or 24 * 3600)
+    # Serve lampiran lewat proxy: '' (langsung, sendfile), 'x-accel' (nginx) atau 'x-sendfile'
+    ATTACHMENT_SENDFILE = os.environ.get('ATTACHMENT_SENDFILE', '')
+    ATTACHMENT_ACCEL_PREFIX = os.environ.get('ATTACHMENT_ACCEL_PREFIX') or '/_uploads/'
+    ATTACHMENT_CACHE_MAX_AGE = int(os.environ.get('ATTACHMENT_CACHE_MAX_AGE') or 86400)
     
-    # Mail configuration (for future features)
+    # Mail configuration (notifikasi digest, lihat notifications.py)
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'localhost'
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@ecoreport.local'
+    
+    # Notifikasi dikumpulkan per penerima selama window ini lalu dikirim sebagai satu digest
+    NOTIFY_DIGEST_WINDOW = int(os.environ.get('NOTIFY_DIGEST_WINDOW') or 300)
+    
+    # Slow query log (seconds, written to logs/slow_queries.log)
+    SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD') or 0.5)
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'logs', 'slow_queries.log')
+    
+    # Cache (local, sqlite, redis atau null); local hanya untuk satu worker, serve.py memakai sqlite
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'local'
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL') or 300)
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    
+    # Event stream (/api/v1/stream), log dibagi semua worker di satu host
+    EVENTS_DB_PATH = os.environ.get('EVENTS_DB_PATH')
+    EVENTS_STREAM_TIMEOUT = int(os.environ.get('EVENTS_STREAM_TIMEOUT') or 300)
+    
+    # Jumlah laporan terbaru di ring buffer per worker
+    RECENT_FEED_SIZE = int(os.environ.get('RECENT_FEED_SIZE') or 20)
+    
+    # Rate limit per klien (token, user atau IP), format '<jumlah>/<second|minute|hour|day>'
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+    RATELIMIT_STORAGE = os.environ.get('RATELIMIT_STORAGE') or 'memory'  # memory, sqlite atau redis (juga login throttle)
+    RATELIMIT_REDIS_URL = os.environ.get('RATELIMIT_REDIS_URL') or os.environ.get('CACHE_REDIS_URL')
+    # Jumlah reverse proxy di depan app (serve.py default 1), 0 kalau klien langsung ke gunicorn
+    RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES') or 0)
+    RATELIMIT_API = os.environ.get('RATELIMIT_API') or '300/minute'
+    RATELIMIT_STATS = os.environ.get('RATELIMIT_STATS') or '60/minute'
+    
+    # User yang login di-cache per worker selama TTL ini (detik, 0 = nonaktif)
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL') or 30)
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE') or 10000)
+    
+    # Password hashing pool (hashing.py), penuh -> 503 dengan Retry-After
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = os.environ.get('PASSWORD_HASH_WORKERS')
+    PASSWORD_HASH_QUEUE = os.environ.get('PASSWORD_HASH_QUEUE')
+    
+    # Kompresi response (compression.py), body lebih kecil dari COMPRESS_MIN_SIZE tidak dikompres
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 500)
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL') or 6)
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY') or 4)
+    
+    # Batch API: ?ids= di /api/v1/reports dan sub-request di /api/v1/batch
+    API_BATCH_MAX_IDS = int(os.environ.get('API_BATCH_MAX_IDS') or 200)
+    API_BATCH_MAX_REQUESTS = int(os.environ.get('API_BATCH_MAX_REQUESTS') or 20)
+    
+    # Background jobs (python tasks.py worker), TASKS_EAGER menjalankan job langsung
+    TASKS_DB_PATH = os.environ.get('TASKS_DB_PATH')
+    TASKS_EAGER = os.environ.get('TASKS_EAGER', 'false').lower() in ['true', 'on', '1']
 
 class DevelopmentConfig(Config):
     """Development configuration"""
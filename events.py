@@ -0,0 +1,307 @@
+"""
+Event bus untuk EcoReport Application
+
+Writes publish small events (new report, status change, stat deltas)
+after their commit. Events are appended to a SQLite log shared by every
+worker on the host; each worker runs one dispatcher thread that tails the
+log and fans new rows out to its local subscribers (the open SSE streams
+of /api/v1/stream) and listeners (in-process state such as the recent
+feed). The row id doubles as the SSE event id, so a reconnecting browser
+resumes with Last-Event-ID instead of refetching.
+
+Every open stream holds a worker thread, so production should run a
+threaded worker class. Under asgi.py the stream is served by astream()
+and an open stream only costs a task on the event loop.
+"""
+
+import os
+import json
+import time
+import queue
+import asyncio
+import random
+import sqlite3
+import logging
+import threading
+
+# Browser reconnect delay sent with every stream (ms)
+RETRY_MS = 5000
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Bounded queue of events for one open stream"""
+
+    def __init__(self, bus, maxsize):
+        self.bus = bus
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Slow client: the stream ends and the browser resumes from Last-Event-ID
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """Subscription for a stream served from an asyncio event loop"""
+
+    def __init__(self, bus, maxsize):
+        self.bus = bus
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event):
+        # Called from the dispatcher thread
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # loop already closed, unsubscribe follows
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def format_sse(event):
+    """Serialize an event in text/event-stream format"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+class EventBus:
+    """SQLite-backed event log with in-process fan-out"""
+
+    def __init__(self, path, poll_interval=0.5, retention=3600, queue_size=100):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.queue_size = queue_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._subscribers = set()
+        self._listeners = []
+        self._cursor = 0
+        self._dispatcher_pid = None
+        self.open(path)
+
+    def open(self, path):
+        """Use the event log at path from now on, creating it if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._connect().executescript('''
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_events_created_at ON events (created_at);
+        ''')
+        # The dispatcher carries on from the end of this log
+        start = self.last_id()
+        with self._lock:
+            self._cursor = start
+
+    def _connect(self):
+        # One connection per thread and per process (connections do not survive a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def publish(self, type, data):
+        """Append an event to the log and return its id"""
+        cursor = self._connect().execute(
+            'INSERT INTO events (type, data, created_at) VALUES (?, ?, ?)',
+            (type, json.dumps(data, default=str), time.time())
+        )
+        if random.random() < 0.01:
+            self.prune()
+        return cursor.lastrowid
+
+    def events_since(self, last_id, limit=500):
+        rows = self._connect().execute(
+            'SELECT id, type, data FROM events WHERE id > ? ORDER BY id LIMIT ?', (last_id, limit)
+        ).fetchall()
+        return [{'id': row[0], 'type': row[1], 'data': json.loads(row[2])} for row in rows]
+
+    def last_id(self):
+        return self._connect().execute('SELECT MAX(id) FROM events').fetchone()[0] or 0
+
+    def first_id(self):
+        return self._connect().execute('SELECT MIN(id) FROM events').fetchone()[0]
+
+    def prune(self):
+        """Drop events older than the retention window"""
+        self._connect().execute('DELETE FROM events WHERE created_at < ?', (time.time() - self.retention,))
+
+    def add_listener(self, callback):
+        """Call callback(event) from the dispatcher thread for every event"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def start(self):
+        """Start dispatching in this process (listeners only see events from now on)"""
+        start = self.last_id()
+        with self._lock:
+            if self._dispatcher_pid != os.getpid():
+                self._cursor = start
+                self._ensure_dispatcher()
+            self._wakeup.notify()
+
+    def subscribe(self, subscription=None):
+        subscription = subscription or Subscription(self, self.queue_size)
+        start = self.last_id()
+        with self._lock:
+            if not self._active():
+                # The dispatcher was idle; deliver only what is published from now on
+                self._cursor = start
+            self._subscribers.add(subscription)
+            self._ensure_dispatcher()
+            self._wakeup.notify()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _active(self):
+        return bool(self._subscribers) or (bool(self._listeners) and self._dispatcher_pid == os.getpid())
+
+    def _ensure_dispatcher(self):
+        # Started lazily per process so it survives gunicorn's preload + fork
+        if self._dispatcher_pid == os.getpid():
+            return
+        self._dispatcher_pid = os.getpid()
+        threading.Thread(target=self._dispatch, name='event-dispatcher', daemon=True).start()
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                while not self._active():
+                    self._wakeup.wait()
+                cursor = self._cursor
+
+            try:
+                events = self.events_since(cursor)
+            except sqlite3.Error:
+                events = []
+
+            if events:
+                with self._lock:
+                    self._cursor = max(self._cursor, events[-1]['id'])
+                    subscribers = list(self._subscribers)
+                    listeners = list(self._listeners)
+                for event in events:
+                    for callback in listeners:
+                        try:
+                            callback(event)
+                        except Exception:
+                            logger.exception('Event listener failed for %s', event['type'])
+                    for subscription in subscribers:
+                        subscription.put(event)
+            else:
+                time.sleep(self.poll_interval)
+
+    def _replay(self, last_event_id):
+        """Opening chunks of a stream and the id of the last event in them"""
+        chunks = [f'retry: {RETRY_MS}\n\n']
+        sent_id = 0
+        if last_event_id is not None:
+            first_id = self.first_id()
+            if first_id is not None and last_event_id < first_id - 1:
+                # Missed events were pruned, the client has to reload its state
+                chunks.append(format_sse({'id': self.last_id(), 'type': 'reset', 'data': {}}))
+            else:
+                sent_id = last_event_id
+                while True:
+                    replay = self.events_since(sent_id)
+                    chunks.extend(format_sse(event) for event in replay)
+                    if not replay:
+                        break
+                    sent_id = replay[-1]['id']
+        return chunks, sent_id
+
+    def stream(self, last_event_id=None, timeout=300, heartbeat=15):
+        """Generate an SSE response body, replaying from last_event_id first"""
+        subscription = self.subscribe()
+        try:
+            chunks, sent_id = self._replay(last_event_id)
+            yield from chunks
+
+            deadline = time.monotonic() + timeout
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                event = subscription.get(min(heartbeat, remaining))
+                if event is None:
+                    yield ': ping\n\n'
+                elif event['id'] > sent_id:
+                    sent_id = event['id']
+                    yield format_sse(event)
+        finally:
+            subscription.close()
+
+    async def astream(self, last_event_id=None, timeout=300, heartbeat=15):
+        """stream() as an async generator, for the ASGI server"""
+        subscription = self.subscribe(AsyncSubscription(self, self.queue_size))
+        try:
+            # The replay reads the local SQLite log, short enough to run on the loop
+            chunks, sent_id = self._replay(last_event_id)
+            for chunk in chunks:
+                yield chunk
+
+            deadline = time.monotonic() + timeout
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                event = await subscription.get(min(heartbeat, remaining))
+                if event is None:
+                    yield ': ping\n\n'
+                elif event['id'] > sent_id:
+                    sent_id = event['id']
+                    yield format_sse(event)
+        finally:
+            subscription.close()
+
+
+def create_event_bus(app):
+    """Build the event bus from EVENTS_* settings"""
+    path = app.config.get('EVENTS_DB_PATH') or os.path.join(app.instance_path, 'events.db')
+    return EventBus(
+        path,
+        poll_interval=float(app.config.get('EVENTS_POLL_INTERVAL', 0.5)),
+        retention=int(app.config.get('EVENTS_RETENTION', 3600)),
+    )
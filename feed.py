@@ -0,0 +1,84 @@
+"""
+Recent reports feed untuk EcoReport Application
+
+Keeps the newest reports in a bounded in-memory ring buffer per worker.
+The buffer is filled from the database on first use, appended to when a
+report is created and kept in sync with the other workers through the
+event bus, so dashboard and /api/reports/recent reads never hit the DB.
+"""
+
+import os
+import threading
+from collections import deque
+
+
+class RecentFeed:
+    """Ring buffer of the newest report summaries (dicts), oldest first"""
+
+    def __init__(self, loader, size=20, bus=None):
+        self.loader = loader
+        self.size = size
+        self.bus = bus
+        self._items = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._primed_pid = None
+        if bus is not None:
+            bus.add_listener(self._on_event)
+
+    def _ensure_primed(self):
+        # Per process, so a worker forked from a preloaded master loads its own copy
+        if self._primed_pid == os.getpid():
+            return
+        if self.bus is not None:
+            # Start following the bus first so nothing published during the load is lost
+            self.bus.start()
+        items = self.loader(self.size)
+        with self._lock:
+            if self._primed_pid != os.getpid():
+                self._merge(items)
+                self._primed_pid = os.getpid()
+
+    def _merge(self, items):
+        known = {item['id'] for item in self._items}
+        new_items = [item for item in items if item['id'] not in known]
+        if not new_items:
+            return
+        if self._items and min(item['id'] for item in new_items) < self._items[-1]['id']:
+            # Out of order (e.g. a slower worker's event), rebuild sorted by id
+            merged = sorted(list(self._items) + new_items, key=lambda item: item['id'])
+            self._items.clear()
+            self._items.extend(merged)
+        else:
+            self._items.extend(sorted(new_items, key=lambda item: item['id']))
+
+    def add(self, item):
+        """Append a newly created report"""
+        with self._lock:
+            self._merge([item])
+
+    def update(self, report_id, **changes):
+        with self._lock:
+            for item in self._items:
+                if item['id'] == report_id:
+                    item.update(changes)
+                    break
+
+    def _on_event(self, event):
+        if event['type'] == 'report.created':
+            self.add(event['data'])
+        elif event['type'] == 'report.status':
+            self.update(event['data']['id'], status=event['data']['status'])
+
+    def recent(self, limit=None, since=None):
+        """Newest first; with since only reports with a larger id"""
+        self._ensure_primed()
+        with self._lock:
+            items = [dict(item) for item in reversed(self._items)
+                     if since is None or item['id'] > since]
+        return items[:limit] if limit else items
+
+    def reset(self):
+        """Drop the buffer; the next read reloads it"""
+        with self._lock:
+            self._items.clear()
+            self._primed_pid = None
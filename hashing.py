@@ -0,0 +1,86 @@
+"""
+Password hashing untuk EcoReport Application
+
+scrypt/pbkdf2 are slow on purpose. Run on request threads, a burst of
+logins occupies every thread and core of a worker and the dashboard
+stalls behind it. PasswordHasher runs them on a small dedicated thread
+pool instead (hashlib releases the GIL, so the other request threads keep
+running) and caps how many may wait: past PASSWORD_HASH_QUEUE pending
+hashes it raises HashingBusy at once, which the app answers with 503.
+
+Hashes made with other parameters than PASSWORD_HASH_METHOD are
+upgraded on the next successful login (see needs_rehash).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Too many password hashes pending, retry shortly"""
+
+
+class PasswordHasher:
+    """Bounded pool for password hashing and verification"""
+
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=16, timeout=30):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._prefix = None
+
+    @classmethod
+    def from_config(cls, config):
+        workers = int(config.get('PASSWORD_HASH_WORKERS') or max(1, (os.cpu_count() or 2) // 2))
+        return cls(
+            method=config.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1',
+            workers=workers,
+            max_pending=int(config.get('PASSWORD_HASH_QUEUE') or workers * 2),
+        )
+
+    def _get_executor(self):
+        with self._lock:
+            # Per process: pool threads do not survive a fork
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when pwhash was made with other parameters than self.method"""
+        if self._prefix is None:
+            # 'scrypt' or 'pbkdf2' expand to their default parameters, hash once to find out
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=wait)
+            self._executor = None
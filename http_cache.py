@@ -0,0 +1,91 @@
+"""
+Conditional GET support untuk EcoReport Application
+
+Read endpoints are wrapped with ``@conditional('<stamp>')``. A version
+stamp is a cheap function (an aggregate query, usually served from the
+cache) that changes whenever the data behind the endpoint changes. The
+ETag is derived from the stamp and the request URL, so a matching
+If-None-Match or If-Modified-Since is answered with 304 before the view
+builds its payload.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, make_response, current_app
+
+# name -> callable(**view_args) returning {'token': str, 'last_modified': iso str or None} or None
+VERSION_STAMPS = {}
+
+
+def version_stamp(name):
+    """Register a version stamp function under a name"""
+    def decorator(f):
+        VERSION_STAMPS[name] = f
+        return f
+    return decorator
+
+
+def _parse_last_modified(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # HTTP dates have one second resolution
+    return value.replace(microsecond=0)
+
+
+def make_etag(token):
+    """ETag for the current URL at a given data version"""
+    source = f'{request.path}?{request.query_string.decode()}|{token}'
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def is_not_modified(etag, last_modified):
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if request.if_none_match:
+        # Weak comparison: compression.py sends W/ ETags for compressed bodies
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def validators(version):
+    """(etag, last_modified) for the current URL from a version stamp result"""
+    return make_etag(version['token']), _parse_last_modified(version.get('last_modified'))
+
+
+def apply_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Clients may store the response but must revalidate before reuse
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def conditional(stamp_name):
+    """Answer conditional GETs for a view from a registered version stamp"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not current_app.config.get('CONDITIONAL_GET_ENABLED', True):
+                return f(*args, **kwargs)
+
+            version = VERSION_STAMPS[stamp_name](**kwargs)
+            if version is None:
+                return f(*args, **kwargs)
+
+            etag, last_modified = validators(version)
+            if is_not_modified(etag, last_modified):
+                return apply_validators(make_response('', 304), etag, last_modified)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                apply_validators(response, etag, last_modified)
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,171 @@
+"""
+Identity cache untuk EcoReport Application
+
+Flask-Login's user_loader and the API's token_required resolve the same
+few users on every request. IdentityCache keeps their column values per
+worker for a short TTL, so an authenticated request rebuilds the User
+without a SELECT. Changes to a user are picked up after commit: mapper
+events collect the ids, the local entry is dropped and a user.changed
+event tells the other workers to drop theirs. Bulk updates that bypass
+the ORM are only covered by the TTL.
+
+TokenMemo remembers decoded JWT payloads until they expire, so repeat
+calls with the same bearer token skip the signature check.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPE = 'user.changed'
+_PENDING_KEY = 'identity_changed'
+
+
+class IdentityCache:
+    """TTL + LRU cache of user column values, keyed by user id"""
+
+    def __init__(self, loader, ttl=30, maxsize=10000, bus=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.bus = bus
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._bus_pid = None
+        self._generation = 0
+        if bus is not None:
+            bus.add_listener(self._on_event)
+
+    def get(self, user_id):
+        """Column values for user_id (loaded on a miss), or None"""
+        if self.ttl <= 0:
+            return self.loader(user_id)
+        self._follow_bus()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._items.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            generation = self._generation
+        self.misses += 1
+
+        values = self.loader(user_id)
+        if values is not None:
+            with self._lock:
+                if generation != self._generation:
+                    # Invalidated while loading, the values may already be stale
+                    return values
+                self._items[user_id] = (now + self.ttl, values)
+                self._items.move_to_end(user_id)
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+        return values
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._generation += 1
+
+    def _follow_bus(self):
+        # Per process, like RecentFeed: the dispatcher does not survive a fork
+        if self.bus is not None and self._bus_pid != os.getpid():
+            self._bus_pid = os.getpid()
+            self.bus.start()
+
+    def _on_event(self, event):
+        if event['type'] == EVENT_TYPE:
+            for user_id in event['data']['ids']:
+                self.invalidate(user_id)
+
+    def watch(self, model):
+        """Invalidate entries of model instances updated or deleted in a committed session"""
+
+        def changed(mapper, connection, target):
+            Session.object_session(target).info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+        event.listen(model, 'after_update', changed)
+        event.listen(model, 'after_delete', changed)
+
+        @event.listens_for(Session, 'after_commit')
+        def committed(session):
+            ids = session.info.pop(_PENDING_KEY, None)
+            if ids:
+                for user_id in ids:
+                    self.invalidate(user_id)
+                if self.bus is not None:
+                    # The write is committed; other workers fall back to the TTL
+                    try:
+                        self.bus.publish(EVENT_TYPE, {'ids': sorted(ids)})
+                    except Exception as e:
+                        logger.warning('Could not publish %s event: %s', EVENT_TYPE, e)
+
+        @event.listens_for(Session, 'after_soft_rollback')
+        def rolled_back(session, previous_transaction):
+            session.info.pop(_PENDING_KEY, None)
+
+
+def snapshot(instance):
+    """Column values of a loaded instance"""
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(instance).mapper.column_attrs}
+
+
+def attach(session, model, values):
+    """Persistent instance in session built from cached values, without a query"""
+    mapper = inspect(model)
+    key = mapper.identity_key_from_primary_key([values[column.key] for column in mapper.primary_key])
+    existing = session.identity_map.get(key)
+    if existing is not None:
+        # Already loaded in this session (possibly with unflushed changes)
+        return existing
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return session.merge(instance, load=False)
+
+
+class TokenMemo:
+    """Decoded JWT payloads by token, dropped when they expire"""
+
+    def __init__(self, decode, maxsize=10000):
+        self.decode = decode
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token, key):
+        """Payload of token signed with key; raises like the decoder for invalid tokens"""
+        now = time.time()
+        with self._lock:
+            entry = self._items.get((key, token))
+            if entry is not None:
+                if entry[0] > now:
+                    self._items.move_to_end((key, token))
+                    return entry[1]
+                del self._items[(key, token)]
+
+        payload = self.decode(token, key)
+        expires = payload.get('exp')
+        if isinstance(expires, (int, float)):
+            with self._lock:
+                self._items[(key, token)] = (expires, payload)
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
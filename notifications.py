@@ -0,0 +1,148 @@
+"""
+Email notifications untuk EcoReport Application
+
+Events for a user (status changes, official comments) are stored as
+Notification rows and a digest job is scheduled NOTIFY_DIGEST_WINDOW
+seconds later. The job is unique per recipient, so everything that
+happens within the window goes out as one email. Task workers send
+through SMTPPool, which keeps one SMTP connection per thread open
+between jobs instead of connecting for every message.
+"""
+
+import os
+import time
+import smtplib
+import threading
+from datetime import datetime
+from email.message import EmailMessage
+
+
+class SMTPPool:
+    """Reusable SMTP connections, one per thread, reopened when idle or dropped"""
+
+    def __init__(self, host, port, use_tls=False, username=None, password=None,
+                 timeout=10, max_idle=30, factory=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.factory = factory
+        self.connections_opened = 0
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.get('MAIL_SERVER') or 'localhost',
+            int(config.get('MAIL_PORT') or 587),
+            use_tls=config.get('MAIL_USE_TLS', False),
+            username=config.get('MAIL_USERNAME'),
+            password=config.get('MAIL_PASSWORD'),
+        )
+
+    def _open(self):
+        conn = self.factory(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password)
+        self.connections_opened += 1
+        return conn
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and (self._local.pid != os.getpid() or
+                                 time.monotonic() - self._local.last_used > self.max_idle):
+            # Servers drop idle clients; do not wait for the send to find out
+            self.close()
+            conn = None
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.last_used = time.monotonic()
+        return conn
+
+    def send(self, message):
+        """Send an EmailMessage, reconnecting once if the connection was dropped"""
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.send_message(message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self.close()
+                if attempt == 2:
+                    raise
+            else:
+                self._local.last_used = time.monotonic()
+                return
+
+    def close(self):
+        """Close the current thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None and self._local.pid == os.getpid():
+            try:
+                conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+
+
+def build_digest(sender, user, notifications):
+    """One email listing every pending notification for a user"""
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = user.email
+    if len(notifications) == 1:
+        message['Subject'] = 'EcoReport: 1 pembaruan laporan Anda'
+    else:
+        message['Subject'] = f'EcoReport: {len(notifications)} pembaruan laporan Anda'
+
+    lines = [f'Halo {user.full_name},', '', 'Ada pembaruan untuk laporan Anda:', '']
+    for notification in notifications:
+        lines.append(f"- [{notification.created_at.strftime('%d/%m/%Y %H:%M')}] {notification.message}")
+    lines += ['', 'Terima kasih telah menjaga lingkungan bersama EcoReport.']
+    message.set_content('\n'.join(lines))
+    return message
+
+
+class Notifier:
+    """Queue notifications and send them as per-user digests"""
+
+    def __init__(self, app, task_queue, pool=None):
+        self.app = app
+        self.window = int(app.config.get('NOTIFY_DIGEST_WINDOW', 300))
+        self.sender = app.config.get('MAIL_DEFAULT_SENDER') or 'noreply@ecoreport.local'
+        self.pool = pool or SMTPPool.from_config(app.config)
+        self.task_queue = task_queue
+
+        @task_queue.task('notifications.digest', max_retries=5)
+        def send_digest(user_id):
+            return self.send_digest(user_id)
+        self._digest_task = send_digest
+
+    def queue(self, user_id, kind, message, report_id=None):
+        """Store a notification and schedule the recipient's digest"""
+        from app import db, Notification
+        db.session.add(Notification(user_id=user_id, report_id=report_id, kind=kind, message=message))
+        db.session.commit()
+        return self._digest_task.delay(user_id, delay=self.window, unique_key=f'digest:{user_id}')
+
+    def send_digest(self, user_id):
+        """Send everything pending for a user in one email (runs in the task worker)"""
+        from app import db, Notification, User
+        user = db.session.get(User, user_id)
+        pending = Notification.query.filter_by(user_id=user_id, sent_at=None).order_by(Notification.id).all()
+        if user is None or not pending:
+            return {'sent': 0}
+
+        self.pool.send(build_digest(self.sender, user, pending))
+
+        sent_at = datetime.utcnow()
+        for notification in pending:
+            notification.sent_at = sent_at
+        db.session.commit()
+        return {'sent': len(pending)}
@@ -0,0 +1,164 @@
+"""
+On-demand request profiling untuk EcoReport Application
+
+An admin can profile a single request by sending the ``X-Profile: 1``
+header or the ``?_profile=1`` query flag. Flagged requests are sampled
+with PROFILE_SAMPLE_RATE, run under cProfile and saved to logs/profiles/
+as .prof (pstats) files that snakeviz, flameprof or gprof2dot can turn
+into flamegraphs. A .json sidecar keeps the request metadata.
+"""
+
+import os
+import json
+import time
+import random
+import pstats
+import cProfile
+from datetime import datetime
+from flask import g, request
+from flask_login import current_user
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'profiles')
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_ARG = '_profile'
+
+
+class RequestProfiler:
+    """Profile admin-flagged requests with cProfile"""
+
+    def __init__(self, app=None):
+        self.profile_dir = DEFAULT_PROFILE_DIR
+        self.sample_rate = 1.0
+        self.max_files = 200
+        self.enabled = True
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.profile_dir = app.config.get('PROFILE_DIR', DEFAULT_PROFILE_DIR)
+        self.sample_rate = float(app.config.get('PROFILE_SAMPLE_RATE', 1.0))
+        self.max_files = int(app.config.get('PROFILE_MAX_FILES', 200))
+        self.enabled = app.config.get('PROFILER_ENABLED', True)
+
+        app.before_request(self._start)
+        app.after_request(self._stop)
+        app.teardown_request(self._teardown)
+
+    def _requested(self):
+        flag = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_ARG)
+        return flag is not None and flag.lower() in ('1', 'true', 'on', 'yes')
+
+    def _start(self):
+        if not self.enabled or not self._requested():
+            return
+        if not (current_user.is_authenticated and current_user.is_admin):
+            return
+        if random.random() >= self.sample_rate:
+            return
+
+        g._profiler = cProfile.Profile()
+        g._profile_started = time.perf_counter()
+        g._profiler.enable()
+
+    def _stop(self, response):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return response
+
+        profiler.disable()
+        duration_ms = (time.perf_counter() - g.pop('_profile_started')) * 1000
+
+        try:
+            name = self._save(profiler, response, duration_ms)
+            response.headers['X-Profile-Id'] = name
+        except OSError as e:
+            response.headers['X-Profile-Error'] = str(e)
+
+        return response
+
+    def _teardown(self, exc):
+        # after_request is skipped on unhandled errors
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+    def _save(self, profiler, response, duration_ms):
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        created_at = datetime.utcnow()
+        endpoint = request.endpoint or 'unknown'
+        name = f"{created_at.strftime('%Y%m%dT%H%M%S%f')}_{endpoint.replace('.', '-')}"
+
+        profiler.dump_stats(os.path.join(self.profile_dir, f'{name}.prof'))
+        with open(os.path.join(self.profile_dir, f'{name}.json'), 'w') as f:
+            json.dump({
+                'name': name,
+                'endpoint': endpoint,
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 3),
+                'created_at': created_at.isoformat(),
+            }, f)
+
+        self._prune()
+        return name
+
+    def _prune(self):
+        """Keep only the newest max_files profiles"""
+        names = sorted(f[:-5] for f in os.listdir(self.profile_dir) if f.endswith('.prof'))
+        for stale in names[:-self.max_files] if self.max_files else []:
+            for ext in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.join(self.profile_dir, stale + ext))
+                except FileNotFoundError:
+                    pass
+
+    def profile_path(self, name):
+        """Path of a stored .prof file, or None for unknown names"""
+        if not name or os.path.basename(name) != name:
+            return None
+        path = os.path.join(self.profile_dir, f'{name}.prof')
+        return path if os.path.exists(path) else None
+
+    def list_profiles(self, limit=20, top=5):
+        """Recent profiles, newest first, with their most expensive functions"""
+        if not os.path.isdir(self.profile_dir):
+            return []
+
+        names = sorted((f[:-5] for f in os.listdir(self.profile_dir) if f.endswith('.prof')), reverse=True)
+        profiles = []
+        for name in names[:limit]:
+            meta_path = os.path.join(self.profile_dir, f'{name}.json')
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {'name': name}
+
+            meta['top_functions'] = top_functions(os.path.join(self.profile_dir, f'{name}.prof'), top)
+            profiles.append(meta)
+
+        return profiles
+
+
+def top_functions(path, limit=5):
+    """Functions with the highest own time in a pstats file"""
+    try:
+        stats = pstats.Stats(path)
+    except (OSError, TypeError, ValueError):
+        return []
+
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+        location = func if filename == '~' else f'{func} ({os.path.basename(filename)}:{line})'
+        rows.append({
+            'function': location,
+            'calls': nc,
+            'tottime_ms': round(tt * 1000, 3),
+            'cumtime_ms': round(ct * 1000, 3),
+        })
+
+    rows.sort(key=lambda r: r['tottime_ms'], reverse=True)
+    return rows[:limit]
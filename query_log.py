@@ -0,0 +1,281 @@
+"""
+Slow query logging untuk EcoReport Application
+
+Statements slower than SLOW_QUERY_THRESHOLD (seconds) are written as JSON
+lines to logs/slow_queries.log together with their bound parameters, the
+calling route and the EXPLAIN QUERY PLAN output. EXPLAIN and the file
+write happen on a QueueListener thread, EXPLAIN on a connection of its
+own, so the request thread only pays for a queue put.
+
+Summary of the worst offenders:
+    python query_log.py summary [logfile] [top]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import logging
+import logging.handlers
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import event
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+DEFAULT_LOG_FILE = os.path.join(LOG_DIR, 'slow_queries.log')
+DEFAULT_THRESHOLD = 0.5  # seconds
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+_NAMED_PARAM = re.compile(r'%\(\w+\)s|:\w+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_statement(statement):
+    """Reduce a SQL statement to its shape so equivalent queries group together"""
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _NAMED_PARAM.sub('?', normalized)
+    normalized = _PLACEHOLDER_LIST.sub('(...)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+
+def _jsonable(parameters):
+    """Make bound parameters safe for json.dumps"""
+    if isinstance(parameters, dict):
+        return {key: _jsonable(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_jsonable(value) for value in parameters]
+    if parameters is None or isinstance(parameters, (str, int, float, bool)):
+        return parameters
+    return str(parameters)
+
+
+class _EntryFormatter(logging.Formatter):
+    """JSON line of a slow query record, with the plan filled in by explain"""
+
+    def __init__(self, explain):
+        super().__init__()
+        self.explain = explain
+
+    def format(self, record):
+        entry = getattr(record, 'entry', None)
+        if entry is None:
+            return super().format(record)
+        entry = dict(entry, plan=self.explain(record.query))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SlowQueryLogger:
+    """Log slow statements of a SQLAlchemy engine off the request thread"""
+
+    def __init__(self, app=None, db=None):
+        self.threshold = DEFAULT_THRESHOLD
+        self.log_file = DEFAULT_LOG_FILE
+        self.enabled = True
+        self.logger = logging.getLogger('ecoreport.slow_queries')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._handler = None
+        self._listener = None
+        self._listener_key = None
+        self.engine = None
+
+        if app is not None and db is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        """Attach the cursor execute hooks to the app's engine"""
+        self.threshold = float(app.config.get('SLOW_QUERY_THRESHOLD', DEFAULT_THRESHOLD))
+        self.log_file = app.config.get('SLOW_QUERY_LOG', DEFAULT_LOG_FILE)
+        self.enabled = app.config.get('SLOW_QUERY_LOG_ENABLED', True)
+
+        with app.app_context():
+            engine = db.engine
+        self.engine = engine
+
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('query_start_time')
+        if not start_times:
+            return
+        duration = time.perf_counter() - start_times.pop()
+
+        if not self.enabled or duration < self.threshold:
+            return
+
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'duration_ms': round(duration * 1000, 3),
+            'statement': statement,
+            'parameters': _jsonable(parameters),
+            'route': self._current_route(),
+            'plan': None,
+        }
+        # The plan is added on the listener thread (see _explain)
+        self._emit(entry, None if executemany else (statement, parameters))
+
+    def _current_route(self):
+        if not has_request_context():
+            return None
+        return {
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+        }
+
+    def _explain(self, query):
+        """Plan of a (statement, parameters) pair, run on the listener thread
+
+        Uses a raw DBAPI connection of its own from the engine's pool, so the
+        request's connection is not held up and the cursor hooks do not recurse.
+        """
+        if query is None or self.engine is None:
+            return None
+        statement, parameters = query
+        if not statement.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+            return None
+
+        prefix = 'EXPLAIN QUERY PLAN ' if self.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+        try:
+            connection = self.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(prefix + statement, parameters or ())
+                    return [str(row[-1]) for row in cursor.fetchall()]
+                finally:
+                    cursor.close()
+            finally:
+                connection.close()
+        except Exception as e:
+            return [f'EXPLAIN failed: {e}']
+
+    def _emit(self, entry, query):
+        self._ensure_listener()
+        self.logger.info('slow query', extra={'entry': entry, 'query': query})
+
+    def _ensure_listener(self):
+        """Start the writer thread lazily, once per process and log file
+
+        Gunicorn forks workers after the app is imported, and threads do not
+        survive a fork, so the listener is keyed on the current pid.
+        """
+        key = (os.getpid(), self.log_file)
+        if self._listener_key == key:
+            return
+
+        if self._listener is not None and self._listener_key[0] == key[0]:
+            self._listener.stop()
+        if self._handler is not None:
+            self.logger.removeHandler(self._handler)
+
+        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            self.log_file, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8'
+        )
+        file_handler.setFormatter(_EntryFormatter(self._explain))
+
+        log_queue = queue.Queue(-1)
+        self._handler = logging.handlers.QueueHandler(log_queue)
+        self.logger.addHandler(self._handler)
+        self._listener = logging.handlers.QueueListener(log_queue, file_handler)
+        self._listener.start()
+        self._listener_key = key
+
+    def flush(self):
+        """Stop the writer thread after draining pending entries"""
+        if self._listener is not None and self._listener_key[0] == os.getpid():
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+        if self._handler is not None:
+            self.logger.removeHandler(self._handler)
+        self._handler = None
+        self._listener = None
+        self._listener_key = None
+
+
+def read_entries(log_file):
+    """Yield entries from a slow query log, skipping malformed lines"""
+    with open(log_file, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def summarize(entries):
+    """Group entries by normalized statement, worst total time first"""
+    groups = {}
+    for entry in entries:
+        key = normalize_statement(entry.get('statement', ''))
+        group = groups.setdefault(key, {
+            'statement': key,
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'routes': set(),
+            'plan': entry.get('plan'),
+        })
+        duration = float(entry.get('duration_ms', 0))
+        group['count'] += 1
+        group['total_ms'] += duration
+        if duration >= group['max_ms']:
+            group['max_ms'] = duration
+            group['plan'] = entry.get('plan')
+        route = entry.get('route')
+        if route:
+            group['routes'].add(route.get('endpoint') or route.get('path'))
+
+    summary = []
+    for group in groups.values():
+        group['avg_ms'] = group['total_ms'] / group['count']
+        group['routes'] = sorted(r for r in group['routes'] if r)
+        summary.append(group)
+
+    summary.sort(key=lambda g: g['total_ms'], reverse=True)
+    return summary
+
+
+def print_summary(log_file=DEFAULT_LOG_FILE, top=10):
+    """Print the worst offenders from a slow query log"""
+    if not os.path.exists(log_file):
+        print(f"No slow query log found at {log_file}")
+        return
+
+    summary = summarize(read_entries(log_file))
+    if not summary:
+        print("Slow query log is empty.")
+        return
+
+    print(f"{'count':>7} {'total ms':>11} {'avg ms':>9} {'max ms':>9}  statement")
+    for group in summary[:top]:
+        print(f"{group['count']:>7} {group['total_ms']:>11.1f} {group['avg_ms']:>9.1f} "
+              f"{group['max_ms']:>9.1f}  {group['statement'][:120]}")
+        if group['routes']:
+            print(f"{'':>40}routes: {', '.join(group['routes'])}")
+        for line in group['plan'] or []:
+            print(f"{'':>40}plan: {line}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'summary':
+        print("Usage: python query_log.py summary [logfile] [top]")
+        sys.exit(1)
+
+    log_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_LOG_FILE
+    top = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    print_summary(log_file, top)
@@ -0,0 +1,226 @@
+"""
+Resumable uploads untuk EcoReport Application
+
+A small subset of the tus 1.0 protocol (core, creation, checksum and
+termination) for large evidence files sent over unreliable connections:
+
+    POST   /api/v1/reports/<id>/uploads   Upload-Length, Upload-Metadata
+    HEAD   /api/v1/uploads/<upload_id>     -> Upload-Offset
+    PATCH  /api/v1/uploads/<upload_id>     Upload-Offset, optional Upload-Checksum
+    DELETE /api/v1/uploads/<upload_id>
+
+Every upload is a .part file plus a .json sidecar under
+UPLOAD_FOLDER/.resumable. The bytes on disk are the offset, so whatever
+arrived before a dropped connection is kept and the client resumes from
+there. Chunks are streamed to the file, never buffered whole.
+
+A completed upload keeps only its sidecar, with the attachment id, until
+it expires: a client whose final PATCH response was lost learns from HEAD
+(or a repeated PATCH) that the file was attached.
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import secrets
+import binascii
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines; concurrent PATCHes are not locked
+    fcntl = None
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,checksum,termination'
+CHECKSUM_ALGORITHMS = ('sha1', 'sha256', 'md5')
+RESUMABLE_DIRNAME = '.resumable'
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Protocol error with the HTTP status to answer"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _upload_dir():
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], RESUMABLE_DIRNAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _paths(upload_id):
+    try:
+        bytes.fromhex(upload_id)
+    except ValueError:
+        raise UploadError('Upload not found', 404)
+    base = os.path.join(_upload_dir(), upload_id)
+    return base + '.part', base + '.json'
+
+
+def parse_metadata(header):
+    """Upload-Metadata: comma separated 'key base64value' pairs"""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode('utf-8') if value else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f'Invalid Upload-Metadata value for {key}', 400)
+    return metadata
+
+
+def parse_checksum(header):
+    """Upload-Checksum: '<algorithm> <base64 digest>', returns (algorithm, digest bytes)"""
+    algorithm, _, value = (header or '').strip().partition(' ')
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError('Unsupported checksum algorithm', 400)
+    try:
+        return algorithm, base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise UploadError('Invalid Upload-Checksum', 400)
+
+
+def create_upload(length, metadata, report_id, user_id):
+    """Start an upload and return its info dict"""
+    max_size = current_app.config['RESUMABLE_MAX_SIZE']
+    if length <= 0:
+        raise UploadError('Invalid Upload-Length', 400)
+    if length > max_size:
+        raise UploadError(f'Upload larger than {max_size} bytes', 413)
+
+    upload_id = secrets.token_hex(16)
+    part_path, info_path = _paths(upload_id)
+    info = {
+        'id': upload_id,
+        'length': length,
+        'metadata': metadata,
+        'report_id': report_id,
+        'user_id': user_id,
+        'created_at': time.time()
+    }
+    open(part_path, 'xb').close()
+    with open(info_path, 'w') as f:
+        json.dump(info, f)
+    info['offset'] = 0
+    return info
+
+
+def get_upload(upload_id):
+    """Info dict with the current offset, or None
+
+    Completed uploads have an attachment_id and their full length as offset.
+    """
+    part_path, info_path = _paths(upload_id)
+    try:
+        with open(info_path) as f:
+            info = json.load(f)
+        info['offset'] = info['length'] if 'attachment_id' in info else os.path.getsize(part_path)
+    except (FileNotFoundError, ValueError):
+        return None
+    return info
+
+
+def upload_path(upload_id):
+    return _paths(upload_id)[0]
+
+
+def append_chunk(upload_id, offset, stream, checksum=None):
+    """Append a PATCH body at offset and return the new offset
+
+    With a checksum the chunk is all or nothing; without one, bytes received
+    before a disconnect are kept so the client can resume after them.
+    """
+    info = get_upload(upload_id)
+    if info is None:
+        raise UploadError('Upload not found', 404)
+    part_path, _ = _paths(upload_id)
+
+    with open(part_path, 'r+b') as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError('Upload is locked by another request', 423)
+
+        current = os.fstat(f.fileno()).st_size
+        if offset != current:
+            raise UploadError('Upload-Offset does not match', 409)
+
+        digest = hashlib.new(checksum[0]) if checksum else None
+        remaining = info['length'] - current
+        f.seek(current)
+        try:
+            while True:
+                chunk = stream.read(min(CHUNK_SIZE, remaining + 1))
+                if not chunk:
+                    break
+                if len(chunk) > remaining:
+                    raise UploadError('Chunk exceeds Upload-Length', 413)
+                f.write(chunk)
+                remaining -= len(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+            if digest is not None and digest.digest() != checksum[1]:
+                raise UploadError('Checksum Mismatch', 460)
+        except Exception:
+            if digest is not None:
+                f.truncate(current)
+            raise
+        f.flush()
+        return f.tell()
+
+
+def complete_upload(upload_id, attachment_id):
+    """Drop the attached bytes, keep the sidecar as a completed marker"""
+    part_path, info_path = _paths(upload_id)
+    with open(info_path) as f:
+        info = json.load(f)
+    info['attachment_id'] = attachment_id
+    partial = f'{info_path}.{os.getpid()}.tmp'
+    with open(partial, 'w') as f:
+        json.dump(info, f)
+    os.replace(partial, info_path)
+    try:
+        os.remove(part_path)
+    except FileNotFoundError:
+        pass
+
+
+def discard_upload(upload_id):
+    for path in _paths(upload_id):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def purge_uploads(upload_folder, max_age):
+    """Remove uploads (and completed markers) untouched for max_age seconds, return how many"""
+    directory = os.path.join(upload_folder, RESUMABLE_DIRNAME)
+    if not os.path.isdir(directory):
+        return 0
+    expired = time.time() - max_age
+    removed = 0
+    uploads = {name.rsplit('.', 1)[0] for name in os.listdir(directory) if name.endswith(('.part', '.json'))}
+    for upload_id in uploads:
+        base = os.path.join(directory, upload_id)
+        try:
+            # In progress: the last chunk; completed: when it was attached
+            touched = os.path.getmtime(base + '.part' if os.path.exists(base + '.part') else base + '.json')
+        except FileNotFoundError:
+            continue
+        if touched < expired:
+            for stale in (base + '.part', base + '.json'):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            removed += 1
+    return removed
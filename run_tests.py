@@ -7,6 +7,21 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from test_app import EcoReportTestCase
 from test_models import ModelsTestCase
+from test_query_log import QueryLogTestCase
+from test_cache import LocalCacheTestCase, SQLiteCacheTestCase, NullCacheTestCase
+from test_assets import AssetsTestCase
+from test_events import EventBusTestCase
+from test_feed import RecentFeedTestCase
+from test_tasks import TaskQueueTestCase
+from test_notifications import NotificationsTestCase
+from test_attachments import AttachmentsTestCase
+from test_identity import IdentityCacheTestCase
+from test_security import RateLimitTestCase, LoginThrottleTestCase, SanitizeInputTestCase
+from test_hashing import PasswordHasherTestCase
+from test_serve import ServeTestCase
+from test_asgi import AsgiTestCase
+from test_compression import ResponseCompressorTestCase, ApiCompressionTestCase
+from test_serializers import SerializersTestCase, ORJSONProviderTestCase
 
 def run_tests():
     """Run all tests"""
@@ -17,6 +32,27 @@ def run_tests():
     # Add test cases
     suite.addTests(loader.loadTestsFromTestCase(EcoReportTestCase))
     suite.addTests(loader.loadTestsFromTestCase(ModelsTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(QueryLogTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(LocalCacheTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(SQLiteCacheTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(NullCacheTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(AssetsTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(EventBusTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(RecentFeedTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(TaskQueueTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(NotificationsTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(AttachmentsTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(IdentityCacheTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(RateLimitTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(LoginThrottleTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(SanitizeInputTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(PasswordHasherTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(ServeTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(AsgiTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(ResponseCompressorTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(ApiCompressionTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(SerializersTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(ORJSONProviderTestCase))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
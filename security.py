@@ -3,11 +3,17 @@ Security utilities untuk EcoReport Application
 """
 
 import os
+import math
+import time
+import random
 import secrets
-import hashlib
-from functools import wraps
-from flask import request, abort, current_app
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import wraps, lru_cache
+from flask import request, abort, current_app, g, jsonify, session
 import re
+from markupsafe import Markup, escape
 
 class SecurityConfig:
     """Security configuration class"""
@@ -21,12 +27,20 @@ class SecurityConfig:
     
     # Rate limiting
     MAX_LOGIN_ATTEMPTS = 5
+    MAX_LOGIN_ATTEMPTS_PER_IP = 20  # lebih longgar: banyak user bisa berbagi satu IP (NAT)
     LOGIN_ATTEMPT_WINDOW = 900  # 15 minutes
+    LOGIN_THROTTLE_MAX_KEYS = 100000
     
     # File upload security
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx'}
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx', 'mp4', 'mov', 'webm'}
     MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
     
+    # User input: tags kept by sanitize_input (tanpa atribut), the rest is stripped
+    ALLOWED_TAGS = frozenset({'b', 'strong', 'i', 'em', 'u', 'br', 'p', 'ul', 'ol', 'li'})
+    # Stripped together with their content
+    STRIPPED_CONTENT_TAGS = frozenset({'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript',
+                                       'textarea', 'title', 'xmp', 'noembed', 'noframes', 'svg', 'math'})
+    
     # Content Security Policy
     CSP_POLICY = {
         'default-src': "'self'",
@@ -79,31 +93,439 @@ def secure_filename(filename):
     
     return f"{name}_{timestamp}{ext}"
 
-def rate_limit(max_requests=100, window=3600):
-    """Rate limiting decorator"""
+# Rate limiting (GCRA)
+#
+# Every key stores one number, its theoretical arrival time (TAT). A request
+# at `now` pushes the TAT forward by window / limit and is allowed while the
+# TAT stays within `window` of now, so a client gets `limit` requests per
+# window with bursts up to `limit`, at O(1) cost per request.
+
+_RATE_UNITS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+@lru_cache(maxsize=64)
+def parse_limit(value):
+    """'300/minute' or '100/3600' -> (max_requests, window in seconds)"""
+    count, _, per = value.partition('/')
+    per = per.strip().rstrip('s') or 'minute'
+    window = _RATE_UNITS[per] if per in _RATE_UNITS else int(per)
+    return int(count), window
+
+def gcra(tat, now, limit, window):
+    """Apply one request to a TAT, return (allowed, new TAT)"""
+    interval = window / limit
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    if new_tat - now > window:
+        return False, tat
+    return True, new_tat
+
+class MemoryRateLimitStore:
+    """Per-process TATs in an LRU dict (limits are per worker)"""
+    
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def hit(self, key, now, limit, window):
+        with self._lock:
+            allowed, tat = gcra(self._tats.get(key), now, limit, window)
+            self._tats[key] = tat
+            self._tats.move_to_end(key)
+            if len(self._tats) > self.maxsize:
+                # Least recently seen client; its TAT has most likely expired anyway
+                self._tats.popitem(last=False)
+        return allowed, tat
+    
+    def reset(self):
+        with self._lock:
+            self._tats.clear()
+
+class SQLiteRateLimitStore:
+    """TATs in a SQLite file shared by every worker on the host"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)'
+        )
+    
+    def _connect(self):
+        # One connection per thread and per process (connections do not survive a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')  # losing a few TATs on a crash is harmless
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def hit(self, key, now, limit, window):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT tat FROM rate_limits WHERE key = ?', (key,)).fetchone()
+            allowed, tat = gcra(row[0] if row else None, now, limit, window)
+            if allowed:
+                conn.execute('INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)', (key, tat))
+            if random.random() < 0.001:
+                conn.execute('DELETE FROM rate_limits WHERE tat < ?', (now,))
+        return allowed, tat
+    
+    def reset(self):
+        self._connect().execute('DELETE FROM rate_limits')
+
+class RedisRateLimitStore:
+    """TATs in Redis, shared by every host (requires the redis package)"""
+    
+    SCRIPT = """
+        local now, limit, window = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local interval = window / limit
+        local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+        local new_tat = tat + interval
+        if new_tat - now > window then
+            return {0, tostring(tat)}
+        end
+        redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+        return {1, tostring(new_tat)}
+    """
+    
+    def __init__(self, url, prefix='ecoreport:ratelimit:'):
+        import redis  # optional dependency
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self.SCRIPT)
+    
+    def hit(self, key, now, limit, window):
+        allowed, tat = self._script(keys=[self.prefix + key], args=[now, limit, window])
+        return bool(allowed), float(tat)
+    
+    def reset(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+class RateLimiter:
+    """Checks requests against GCRA limits and adds RateLimit-* headers"""
+    
+    def __init__(self):
+        self.store = MemoryRateLimitStore()
+        self.enabled = True
+        self.trusted_proxies = 0
+        # token -> user id, or None when the token does not verify (set by api.py)
+        self.token_user = None
+    
+    def init_app(self, app):
+        backend = app.config.get('RATELIMIT_STORAGE', 'memory')
+        if backend == 'sqlite':
+            self.store = SQLiteRateLimitStore(
+                app.config.get('RATELIMIT_DB_PATH') or os.path.join(app.instance_path, 'ratelimit.db')
+            )
+        elif backend == 'redis':
+            self.store = RedisRateLimitStore(app.config['RATELIMIT_REDIS_URL'])
+        else:
+            self.store = MemoryRateLimitStore()
+        self.trusted_proxies = int(app.config.get('RATELIMIT_TRUSTED_PROXIES', 0))
+        app.after_request(self._add_headers)
+    
+    def client_ip(self):
+        # access_route is the X-Forwarded-For list (without remote_addr),
+        # each trusted proxy appended the address it received from
+        route = request.access_route
+        if self.trusted_proxies and len(route) >= self.trusted_proxies:
+            # The address appended by the outermost trusted proxy
+            return route[-self.trusted_proxies]
+        return request.remote_addr
+    
+    def client_key(self):
+        """User of a valid bearer token, logged-in user or client IP"""
+        auth = request.headers.get('Authorization', '')
+        user_id = None
+        if auth.startswith('Bearer ') and self.token_user is not None:
+            # Unverified tokens get no bucket of their own
+            user_id = self.token_user(auth[7:])
+        user_id = user_id or session.get('_user_id')
+        if user_id:
+            return f'user:{user_id}'
+        return f'ip:{self.client_ip()}'
+    
+    def check(self, max_requests, window, scope=None, key=None):
+        """None when allowed, otherwise a 429 response"""
+        if not current_app.config.get('RATELIMIT_ENABLED', True):
+            return None
+        scope = scope or request.endpoint
+        now = time.time()
+        allowed, tat = self.store.hit(f'{scope}:{key or self.client_key()}', now, max_requests, window)
+        
+        interval = window / max_requests
+        remaining = max(0, int((window - (tat - now)) / interval))
+        headers = {
+            'RateLimit-Limit': str(max_requests),
+            'RateLimit-Remaining': str(remaining),
+            'RateLimit-Reset': str(max(0, math.ceil(tat - now))),
+            'RateLimit-Policy': f'{max_requests};w={window}',
+        }
+        if allowed:
+            g.rate_limit_headers = headers
+            return None
+        
+        response = jsonify({'message': 'Terlalu banyak permintaan, coba lagi nanti'})
+        response.status_code = 429
+        response.headers.update(headers)
+        response.headers['Retry-After'] = str(max(1, math.ceil(tat + interval - window - now)))
+        return response
+    
+    def _add_headers(self, response):
+        headers = g.pop('rate_limit_headers', None)
+        if headers:
+            response.headers.update(headers)
+        return response
+    
+    def reset(self):
+        self.store.reset()
+
+limiter = RateLimiter()
+
+def rate_limit(max_requests=100, window=3600, scope=None):
+    """Rate limiting decorator (per client, see RateLimiter.client_key)"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Simple in-memory rate limiting
-            # In production, use Redis or database
-            client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-            
-            # For development, skip rate limiting
-            if current_app.config.get('TESTING') or current_app.config.get('DEBUG'):
-                return f(*args, **kwargs)
-            
+            limited = limiter.check(max_requests, window, scope=scope)
+            if limited is not None:
+                return limited
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+class MemoryLoginStore:
+    """Per-process failure timestamps in an LRU dict (counts are per worker)"""
+    
+    def __init__(self, max_keys=SecurityConfig.LOGIN_THROTTLE_MAX_KEYS):
+        self.max_keys = max_keys
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def recent(self, key, now, window):
+        """Failure timestamps of key within the window, oldest first"""
+        with self._lock:
+            attempts = self._failures.get(key)
+            if attempts and attempts[-1] <= now - window:
+                del self._failures[key]
+                return ()
+            return attempts or ()
+    
+    def add(self, key, now, window, keep):
+        """Record a failure, keeping the newest `keep` timestamps within the window"""
+        with self._lock:
+            recent = [t for t in self._failures.pop(key, ()) if t > now - window]
+            self._failures[key] = tuple(recent[max(0, len(recent) - keep + 1):]) + (now,)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+    
+    def reset(self):
+        with self._lock:
+            self._failures.clear()
+
+class SQLiteLoginStore:
+    """Failure timestamps in a SQLite file shared by every worker on the host"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute('CREATE TABLE IF NOT EXISTS login_failures (key TEXT NOT NULL, at REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS login_failures_key ON login_failures (key, at)')
+    
+    def _connect(self):
+        # One connection per thread and per process (connections do not survive a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def recent(self, key, now, window):
+        rows = self._connect().execute('SELECT at FROM login_failures WHERE key = ? AND at > ? ORDER BY at',
+                                       (key, now - window)).fetchall()
+        return tuple(row[0] for row in rows)
+    
+    def add(self, key, now, window, keep):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO login_failures (key, at) VALUES (?, ?)', (key, now))
+            conn.execute(
+                'DELETE FROM login_failures WHERE key = ? AND rowid NOT IN '
+                '(SELECT rowid FROM login_failures WHERE key = ? AND at > ? ORDER BY at DESC LIMIT ?)',
+                (key, key, now - window, keep)
+            )
+            if random.random() < 0.001:
+                conn.execute('DELETE FROM login_failures WHERE at <= ?', (now - window,))
+    
+    def delete(self, key):
+        self._connect().execute('DELETE FROM login_failures WHERE key = ?', (key,))
+    
+    def reset(self):
+        self._connect().execute('DELETE FROM login_failures')
+
+class RedisLoginStore:
+    """Failure timestamps in Redis sorted sets, shared by every host (requires the redis package)"""
+    
+    def __init__(self, url, prefix='ecoreport:login:'):
+        import redis  # optional dependency
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+    
+    def recent(self, key, now, window):
+        members = self.client.zrangebyscore(self.prefix + key, f'({now - window}', '+inf', withscores=True)
+        return tuple(at for _, at in members)
+    
+    def add(self, key, now, window, keep):
+        key = self.prefix + key
+        with self.client.pipeline() as pipe:
+            pipe.zadd(key, {f'{now}:{secrets.token_hex(4)}': now})
+            pipe.zremrangebyscore(key, '-inf', now - window)
+            pipe.zremrangebyrank(key, 0, -keep - 1)
+            pipe.expire(key, math.ceil(window))
+            pipe.execute()
+    
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+    
+    def reset(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+class LoginThrottle:
+    """Failed logins per username and per IP over a sliding window
+
+    Each key keeps at most max_attempts timestamps. The store follows
+    RATELIMIT_STORAGE, so with several workers the limits hold across
+    them; the memory store drops the least recently used keys beyond
+    max_keys, so memory stays bounded however many usernames an attacker
+    tries. Checked before the password hash.
+    """
+    
+    def __init__(self, max_attempts=SecurityConfig.MAX_LOGIN_ATTEMPTS,
+                 max_attempts_per_ip=SecurityConfig.MAX_LOGIN_ATTEMPTS_PER_IP,
+                 window=SecurityConfig.LOGIN_ATTEMPT_WINDOW,
+                 max_keys=SecurityConfig.LOGIN_THROTTLE_MAX_KEYS):
+        self.max_attempts = max_attempts
+        self.max_attempts_per_ip = max_attempts_per_ip
+        self.window = window
+        self.store = MemoryLoginStore(max_keys)
+    
+    def init_app(self, app):
+        backend = app.config.get('RATELIMIT_STORAGE', 'memory')
+        if backend == 'sqlite':
+            self.store = SQLiteLoginStore(
+                app.config.get('RATELIMIT_DB_PATH') or os.path.join(app.instance_path, 'ratelimit.db')
+            )
+        elif backend == 'redis':
+            self.store = RedisLoginStore(app.config['RATELIMIT_REDIS_URL'])
+    
+    def _keys(self, username, ip):
+        return ((f'user:{username.strip().lower()}', self.max_attempts),
+                (f'ip:{ip}', self.max_attempts_per_ip))
+    
+    def retry_after(self, username, ip):
+        """Seconds until another attempt is allowed, 0 when allowed now"""
+        now = time.time()
+        wait = 0
+        for key, limit in self._keys(username, ip):
+            attempts = self.store.recent(key, now, self.window)
+            if len(attempts) >= limit:
+                wait = max(wait, attempts[-limit] + self.window - now)
+        return math.ceil(wait)
+    
+    def failed(self, username, ip):
+        now = time.time()
+        for key, limit in self._keys(username, ip):
+            # Only the newest `limit` attempts matter for retry_after
+            self.store.add(key, now, self.window, limit)
+    
+    def succeeded(self, username):
+        """Forget the username's failures (the IP's stay)"""
+        self.store.delete(self._keys(username, None)[0][0])
+    
+    def reset(self):
+        self.store.reset()
+
+login_throttle = LoginThrottle()
+
+# Input sanitizing
+#
+# One re.sub over the text with a single precompiled pattern: tags,
+# comments and declarations are replaced, text in between is copied by the
+# regex engine. Allow-listed tags come back without attributes, which
+# covers on*= handlers and javascript:/data: URLs in any spelling;
+# STRIPPED_CONTENT_TAGS lose their content up to the closing tag (or the
+# end of the input). Only constructs closed by a '>' are markup: a '<' that
+# is not, like "kadar PM2.5 <PM10", stays as text and Jinja escapes it on
+# output. A tag cannot contain '<' and a comment cannot contain '<!--', so
+# a failed match stops at the next '<' and the scan stays linear.
+
+_MARKUP = re.compile(
+    r'<(?:!--(?:(?!-->|<!--).)*-->'                           # comment
+    r'|[!?][^<>]*>'                                           # doctype, CDATA, processing instruction
+    r'|(?i:(?P<strip>%s))\b[^<>]*>[^<]*(?:<(?!/(?i:(?P=strip))\b)[^<]*)*(?:</(?i:(?P=strip))\b[^<>]*>?)?'
+                                                               # tag, its content and closing tag
+    r'|(?P<tag>/?[a-zA-Z][a-zA-Z0-9]*)[^<>]*>)'                # any other tag
+    % '|'.join(sorted(SecurityConfig.STRIPPED_CONTENT_TAGS, key=len, reverse=True)),
+    re.DOTALL)
+
+_VOID_TAGS = frozenset({'br'})
+_ESCAPED_KEPT_TAGS = re.compile(r'&lt;(/?(?:%s))&gt;' % '|'.join(sorted(SecurityConfig.ALLOWED_TAGS)))
+
+def _replace_markup(tag, stack):
+    """Allow-listed tag without attributes, balanced against the open tags on stack
+
+    A closing tag closes the tags opened inside it first; one that closes
+    nothing is dropped. Whatever is still open at the end is closed by
+    _close_markup, so user text cannot leak formatting into the page.
+    """
+    name = tag.lower().lstrip('/')
+    if name not in SecurityConfig.ALLOWED_TAGS:
+        return ''
+    if name in _VOID_TAGS:
+        return '' if tag.startswith('/') else f'<{name}>'
+    if not tag.startswith('/'):
+        stack.append(name)
+        return f'<{name}>'
+    if name not in stack:
+        return ''
+    closing = ''
+    while True:
+        opened = stack.pop()
+        closing += f'</{opened}>'
+        if opened == name:
+            return closing
+
+def _close_markup(stack):
+    return ''.join(f'</{name}>' for name in reversed(stack))
+
 def sanitize_input(text):
-    """Sanitize user input"""
+    """Sanitize user input: allow-listed tags without attributes, other markup stripped, text kept"""
     if not text:
         return ""
-    
-    # Remove potential XSS
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    text = re.sub(r'javascript:', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'on\w+\s*=', '', text, flags=re.IGNORECASE)
-    
-    return text.strip()
\ No newline at end of file
+    if '<' not in text:
+        return text.strip()
+    stack = []
+    text = _MARKUP.sub(lambda match: _replace_markup(match['tag'], stack) if match['tag'] else '', text)
+    return text.strip() + _close_markup(stack)
+
+def user_markup(text):
+    """HTML for sanitized user text: escaped, except the allow-listed tags sanitize_input kept, balanced"""
+    stack = []
+    html = _ESCAPED_KEPT_TAGS.sub(lambda match: _replace_markup(match[1], stack), str(escape(text or '')))
+    return Markup(html + _close_markup(stack))
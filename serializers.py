@@ -0,0 +1,254 @@
+"""
+JSON serialization untuk EcoReport Application
+
+jsonify() and the JSON responses go through ORJSONProvider when orjson is
+installed, and through Flask's stdlib provider otherwise. Both produce the
+same documents: keys sorted, dates left to the provider's default (HTTP
+dates), compact unless in debug mode.
+
+Report, comment and category payloads are declared once, as a mapping of
+dotted payload keys to columns. A RowSerializer selects exactly those
+columns (with the joins they need) and compiles a function that builds
+the nested dict from a result row by position, so list endpoints never
+load ORM objects:
+
+    serializer = report_serializer()
+    rows = db.session.execute(serializer.select().where(...).limit(20))
+    payload = serializer.rows(rows)
+
+serializer.only(['title', 'category']) is the serializer for a sparse
+fieldset (?fields=): a name selects a key or a whole nested object, id is
+always kept, and only the joins its columns need remain.
+
+The dotted keys are also attribute paths, so serializer.dump(obj) gives
+the same payload for an object that is already loaded. Datetimes become
+ISO strings in the payload itself, since payloads are cached as JSON.
+"""
+
+from functools import cache
+from operator import attrgetter
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib provider is used without it
+    orjson = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    def _options(self, sort_keys, indent=False):
+        # Dates go to self.default, like the stdlib provider
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        if kwargs:
+            # json.dumps arguments orjson has no equivalent for
+            return super().dumps(obj, sort_keys=sort_keys, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options(sort_keys)).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(self.sort_keys, indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Use orjson for JSON responses when it is installed"""
+    if orjson is not None:
+        app.json = ORJSONProvider(app)
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _compile(keys, converters):
+    """Function building the nested payload dict from a row, by position"""
+    tree = {}
+    for index, key in enumerate(keys):
+        *parents, name = key.split('.')
+        node = tree
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[name] = index
+
+    def render(node):
+        items = []
+        for name, value in node.items():
+            if isinstance(value, dict):
+                expr = render(value)
+            elif value in converters:
+                expr = f'convert_{value}(row[{value}])'
+            else:
+                expr = f'row[{value}]'
+            items.append(f'{name!r}: {expr}')
+        return '{' + ', '.join(items) + '}'
+
+    namespace = {f'convert_{index}': convert for index, convert in converters.items()}
+    exec(compile(f'def serialize(row):\n    return {render(tree)}\n', '<serializer>', 'exec'), namespace)
+    return namespace['serialize']
+
+
+# Compiled sparse fieldsets kept per serializer
+MAX_SUBSETS = 128
+
+
+class RowSerializer:
+    """Payload dicts from column tuples, for a fixed set of dotted keys"""
+
+    def __init__(self, fields, source, joins=()):
+        # fields: {'dotted.key': column or (column, convert)}; joins: (target, onclause)
+        self.fields = dict(fields)
+        self.source = source
+        self.joins = tuple(joins)
+        self.keys = list(self.fields)
+        self.columns = []
+        converters = {}
+        for index, spec in enumerate(self.fields.values()):
+            column, convert = spec if isinstance(spec, tuple) else (spec, None)
+            self.columns.append(column)
+            if convert is not None:
+                converters[index] = convert
+        self._serialize = _compile(self.keys, converters)
+        self._getters = [attrgetter(key) for key in self.keys]
+        self._subsets = {}
+
+    def select(self):
+        """SELECT of the serializer's columns, joined from its source table"""
+        query = select(*self.columns).select_from(self.source)
+        for target, onclause in self.joins:
+            query = query.join(target, onclause)
+        return query
+
+    def only(self, names):
+        """Serializer for a subset of the fields; ValueError for unknown names"""
+        names = set(names)
+        known = set(self.keys) | {key.split('.', 1)[0] for key in self.keys}
+        unknown = names - known
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        keys = tuple(key for key in self.keys
+                     if key == 'id' or key in names or key.split('.', 1)[0] in names)
+        subset = self._subsets.get(keys)
+        if subset is None:
+            if len(self._subsets) >= MAX_SUBSETS:
+                self._subsets.clear()
+            fields = {key: self.fields[key] for key in keys}
+            tables = {column.class_ for column, key in zip(self.columns, self.keys) if key in fields}
+            joins = [(target, onclause) for target, onclause in self.joins if target in tables]
+            # Returned from the local: another thread may clear the dict in between
+            subset = self._subsets[keys] = RowSerializer(fields, self.source, joins)
+        return subset
+
+    def __call__(self, row):
+        return self._serialize(row)
+
+    def rows(self, rows):
+        return list(map(self._serialize, rows))
+
+    def dump(self, obj):
+        """Payload of a loaded object, following the keys as attribute paths"""
+        return self._serialize([getter(obj) for getter in self._getters])
+
+
+# Payloads (models are imported lazily, app.py imports this module)
+
+@cache
+def category_serializer():
+    from app import Category
+    return RowSerializer({
+        'id': Category.id,
+        'name': Category.name,
+        'description': Category.description,
+        'icon': Category.icon,
+    }, Category)
+
+
+def _report_fields(Report, Category, User):
+    return {
+        'id': Report.id,
+        'title': Report.title,
+        'description': Report.description,
+        'location': Report.location,
+        'latitude': Report.latitude,
+        'longitude': Report.longitude,
+        'status': Report.status,
+        'priority': Report.priority,
+        'created_at': (Report.created_at, isoformat),
+        'updated_at': (Report.updated_at, isoformat),
+        'category.id': Category.id,
+        'category.name': Category.name,
+        'category.icon': Category.icon,
+        'reporter.id': User.id,
+        'reporter.username': User.username,
+        'reporter.full_name': User.full_name,
+    }
+
+
+@cache
+def report_serializer():
+    """Report list item"""
+    from app import Report, Category, User
+    return RowSerializer(_report_fields(Report, Category, User), Report, joins=(
+        (Category, Report.category_id == Category.id),
+        (User, Report.user_id == User.id),
+    ))
+
+
+@cache
+def report_detail_serializer():
+    """Report detail, without comments and attachments"""
+    from app import Report, Category, User
+    fields = _report_fields(Report, Category, User)
+    fields['category.description'] = Category.description
+    fields['reporter.email'] = User.email
+    return RowSerializer(fields, Report, joins=(
+        (Category, Report.category_id == Category.id),
+        (User, Report.user_id == User.id),
+    ))
+
+
+@cache
+def report_summary_serializer():
+    """Recent feed and report.created event"""
+    from app import Report, Category
+    return RowSerializer({
+        'id': Report.id,
+        'title': Report.title,
+        'location': Report.location,
+        'status': Report.status,
+        'priority': Report.priority,
+        'created_at': (Report.created_at, isoformat),
+        'category.id': Category.id,
+        'category.name': Category.name,
+        'category.icon': Category.icon,
+    }, Report, joins=((Category, Report.category_id == Category.id),))
+
+
+@cache
+def comment_serializer():
+    from app import Comment, User
+    return RowSerializer({
+        'id': Comment.id,
+        'content': Comment.content,
+        'created_at': (Comment.created_at, isoformat),
+        'is_official': Comment.is_official,
+        'author.id': User.id,
+        'author.full_name': User.full_name,
+    }, Comment, joins=((User, Comment.user_id == User.id),))
@@ -0,0 +1,140 @@
+"""
+Production server untuk EcoReport Application
+
+Runs the app under gunicorn instead of the Flask development server:
+
+    python serve.py
+
+Defaults derive from the machine and can be overridden from the
+environment (PORT, WEB_CONCURRENCY, GUNICORN_THREADS, GUNICORN_TIMEOUT,
+GUNICORN_KEEPALIVE, GUNICORN_MAX_REQUESTS) or with extra gunicorn command
+line options, e.g. `python serve.py --log-level debug`.
+
+Workers are gthread workers: /api/v1/stream keeps a connection open for
+minutes, which would take a whole sync worker but only takes one thread
+here. The app is preloaded in the master, so workers share its memory
+copy-on-write and a broken import fails at startup, not in every worker.
+Everything that holds threads or connections (event bus, caches, hash and
+thumbnail pools, slow query log) starts lazily per process; post_fork
+drops the database connections inherited from the master.
+
+Background jobs (notification digests, stats rebuilds) are run by a
+separate `python tasks.py worker` process, see the Procfile; startup warns
+when overdue jobs are waiting and no worker has claimed any.
+
+State that has to agree across workers defaults to a store they share
+(SHARED_STATE_DEFAULTS: RATELIMIT_STORAGE=sqlite for the rate limits and
+the login throttle, CACHE_BACKEND=sqlite so a write invalidates cached
+data in every worker) unless the environment chooses another one.
+It also assumes one reverse proxy in front (RATELIMIT_TRUSTED_PROXIES=1)
+so rate limits key on the client address the proxy forwards, not on the
+proxy's own; set it to 0 when gunicorn faces clients directly, or to the
+number of proxies in the chain.
+
+Signals (send to the master, see GUNICORN_PIDFILE):
+    HUP         graceful restart of the workers with the re-read config
+    USR2, QUIT  deploy new code: start a new master, then stop the old one
+    TTIN/TTOU   one worker more/less
+"""
+
+import os
+import sys
+from gunicorn.app.base import BaseApplication
+
+
+# Per-process stores in app.py that every worker must see instead
+SHARED_STATE_DEFAULTS = {
+    'RATELIMIT_STORAGE': 'sqlite',
+    'CACHE_BACKEND': 'sqlite',  # the local cache would only be invalidated in the worker that wrote
+    # Behind nginx/a load balancer remote_addr is the proxy, every anonymous client would share its bucket
+    'RATELIMIT_TRUSTED_PROXIES': '1',
+}
+
+
+def shared_state_defaults(environ=None):
+    """Default the stores in SHARED_STATE_DEFAULTS (before the app is imported)"""
+    environ = os.environ if environ is None else environ
+    for name, value in SHARED_STATE_DEFAULTS.items():
+        environ.setdefault(name, value)
+    return environ
+
+
+def default_options(environ=None, cpu_count=None):
+    """gunicorn settings for this machine, overridable from the environment"""
+    environ = os.environ if environ is None else environ
+    cpus = cpu_count or os.cpu_count() or 1
+
+    def setting(name, default):
+        return int(environ.get(name) or default)
+
+    options = {
+        'bind': f"0.0.0.0:{setting('PORT', 5000)}",
+        'worker_class': 'gthread',
+        'workers': setting('WEB_CONCURRENCY', 2 * cpus + 1),
+        # Threads cover I/O waits and SSE connections, the GIL runs one at a time per worker
+        'threads': setting('GUNICORN_THREADS', max(4, 2 * cpus)),
+        'preload_app': True,
+        # Recycle workers now and then to bound memory growth; jitter keeps them from restarting together
+        'max_requests': setting('GUNICORN_MAX_REQUESTS', 1000),
+        'max_requests_jitter': setting('GUNICORN_MAX_REQUESTS', 1000) // 10,
+        'timeout': setting('GUNICORN_TIMEOUT', 30),
+        'graceful_timeout': setting('GUNICORN_TIMEOUT', 30),
+        # Longer than the proxy's upstream idle timeout (nginx keepalive_timeout 60s, most load balancers
+        # 60s), so the proxy closes idle connections first instead of reusing one gunicorn just closed
+        'keepalive': setting('GUNICORN_KEEPALIVE', 65),
+        'accesslog': '-',
+        'errorlog': '-',
+        'post_fork': post_fork,
+    }
+    if environ.get('GUNICORN_PIDFILE'):
+        options['pidfile'] = environ['GUNICORN_PIDFILE']
+    if os.path.isdir('/dev/shm'):
+        # Worker heartbeat files on tmpfs; a slow disk (Docker overlay) makes workers look hung
+        options['worker_tmp_dir'] = '/dev/shm'
+    return options
+
+
+def post_fork(server, worker):
+    """Drop the master's pooled database connections, they must not be shared"""
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def load_app():
+    from app import app, init_db, task_queue
+    with app.app_context():
+        init_db()
+    stalled = task_queue.stalled()
+    if stalled:
+        # Notification digests and stats rebuilds only run in the worker process
+        print(f"⚠ {stalled} background jobs are waiting and no worker has claimed any, "
+              f"start one with: python tasks.py worker", file=sys.stderr)
+    return app
+
+
+class Server(BaseApplication):
+    """gunicorn application with settings from a dict and the command line"""
+
+    def __init__(self, options, argv=()):
+        self.options = options
+        self.argv = list(argv)
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        # Command line options win over the defaults
+        if self.argv:
+            parsed = self.cfg.parser().parse_args(self.argv)
+            for key, value in vars(parsed).items():
+                if value is not None and key in self.cfg.settings and key != 'args':
+                    self.cfg.set(key, value)
+
+    def load(self):
+        return load_app()
+
+
+if __name__ == '__main__':
+    shared_state_defaults()
+    Server(default_options(), sys.argv[1:]).run()
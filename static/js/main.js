@@ -84,8 +84,8 @@ class EcoReportApp {
             }
         }
 
-        // Password validation
-        if (type === 'password' && value) {
+        // Password validation (hanya untuk password baru, bukan form login)
+        if (type === 'password' && value && field.autocomplete !== 'current-password') {
             if (value.length < 6) {
                 isValid = false;
                 message = 'Password minimal 6 karakter';
@@ -197,14 +197,64 @@ class EcoReportApp {
     }
 
     setupAutoRefresh() {
-        // Auto-refresh dashboard stats every 30 seconds
-        if (window.location.pathname === '/') {
-            setInterval(() => {
-                this.refreshDashboardStats();
-            }, 30000);
+        // Dashboard menerima update lewat SSE, polling hanya sebagai fallback
+        if (window.location.pathname !== '/') return;
+
+        if (window.EventSource) {
+            this.openEventStream();
+        } else {
+            this.startPolling();
         }
     }
 
+    startPolling() {
+        if (this.pollTimer) return;
+        this.refreshDashboardStats();
+        this.pollTimer = setInterval(() => {
+            this.refreshDashboardStats();
+        }, 30000);
+    }
+
+    openEventStream() {
+        // EventSource reconnects by itself and resends Last-Event-ID
+        const source = new EventSource('/api/v1/stream');
+        let failures = 0;
+
+        source.addEventListener('open', () => {
+            failures = 0;
+        });
+
+        source.addEventListener('error', () => {
+            failures += 1;
+            if (source.readyState === EventSource.CLOSED || failures >= 3) {
+                source.close();
+                this.startPolling();
+            }
+        });
+
+        source.addEventListener('stats', event => {
+            this.applyStatsDelta(JSON.parse(event.data));
+        });
+
+        source.addEventListener('reset', () => {
+            this.refreshDashboardStats();
+        });
+
+        source.addEventListener('report.created', event => {
+            const report = JSON.parse(event.data);
+            this.loadRecentReports();
+            EcoReportApp.showNotification('Laporan Baru', `${report.title} - ${report.location}`, 'info');
+        });
+
+        source.addEventListener('report.status', event => {
+            const report = JSON.parse(event.data);
+            EcoReportApp.showNotification('Status Diperbarui', `${report.title}: ${report.old_status} → ${report.status}`, 'success');
+        });
+
+        // Baseline yang segar; delta dari stream diterapkan di atasnya
+        this.refreshDashboardStats();
+    }
+
     showLoadingState(button) {
         const originalText = button.innerHTML;
         button.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Processing...';
@@ -225,9 +275,9 @@ class EcoReportApp {
     }
 
     refreshDashboardStats() {
-        fetch('/api/reports/stats')
-            .then(response => response.json())
+        EcoReportApp.fetchJSON('/api/stats/summary', { fresh: true })
             .then(data => {
+                this.stats = data;
                 this.updateDashboardStats(data);
             })
             .catch(error => {
@@ -235,15 +285,41 @@ class EcoReportApp {
             });
     }
 
+    applyStatsDelta(delta) {
+        // Belum ada baseline: refreshDashboardStats yang sedang berjalan sudah memuat perubahan ini
+        if (!this.stats) return;
+
+        const stats = this.stats;
+        stats.total_reports += delta.total_reports || 0;
+        stats.total_users += delta.total_users || 0;
+        for (const [status, change] of Object.entries(delta.by_status || {})) {
+            stats.by_status[status] = (stats.by_status[status] || 0) + change;
+        }
+        for (const [priority, change] of Object.entries(delta.by_priority || {})) {
+            stats.by_priority[priority] = (stats.by_priority[priority] || 0) + change;
+        }
+        for (const [categoryId, change] of Object.entries(delta.by_category || {})) {
+            const category = stats.by_category.find(c => String(c.id) === categoryId);
+            if (category) category.count += change;
+        }
+
+        this.updateDashboardStats(stats);
+    }
+
     updateDashboardStats(data) {
         // Update statistics if elements exist
         const totalElement = document.querySelector('.stats-total');
         const pendingElement = document.querySelector('.stats-pending');
+        const investigatingElement = document.querySelector('.stats-investigating');
         const resolvedElement = document.querySelector('.stats-resolved');
 
-        if (totalElement) totalElement.textContent = data.total;
+        if (totalElement) totalElement.textContent = data.total_reports;
         if (pendingElement) pendingElement.textContent = data.by_status.pending;
+        if (investigatingElement) investigatingElement.textContent = data.by_status.investigating;
         if (resolvedElement) resolvedElement.textContent = data.by_status.resolved;
+
+        // Halaman (mis. chart dashboard) bisa ikut memperbarui tampilan
+        document.dispatchEvent(new CustomEvent('ecoreport:stats', { detail: data }));
     }
 
     loadData() {
@@ -256,10 +332,16 @@ class EcoReportApp {
         const recentContainer = document.querySelector('.recent-reports');
         if (!recentContainer) return;
 
-        fetch('/api/reports/recent')
+        // Incremental: hanya laporan dengan id lebih besar dari yang sudah tampil
+        const known = this.recentReports || [];
+        const url = known.length ? `/api/reports/recent?since=${known[0].id}` : '/api/reports/recent';
+
+        fetch(url)
             .then(response => response.json())
             .then(data => {
-                this.renderRecentReports(data);
+                if (!data.length && known.length) return;
+                this.recentReports = data.concat(known).slice(0, 10);
+                this.renderRecentReports(this.recentReports);
             })
             .catch(error => {
                 console.error('Error loading recent reports:', error);
@@ -347,6 +429,43 @@ class EcoReportApp {
         }, 5000);
     }
 
+    // Conditional GET: kirim ETag terakhir, pakai ulang body tersimpan saat 304.
+    // fresh: true melewati cache stale-while-revalidate di service worker.
+    static fetchJSON(url, { fresh = false } = {}) {
+        const storageKey = `ecoreport_etag:${url}`;
+        let cached = null;
+        try {
+            cached = JSON.parse(sessionStorage.getItem(storageKey));
+        } catch (e) {
+            cached = null;
+        }
+
+        const headers = { 'Accept': 'application/json' };
+        if (cached && cached.etag) {
+            headers['If-None-Match'] = cached.etag;
+        }
+
+        return fetch(url, { headers, cache: fresh ? 'no-cache' : 'default' }).then(response => {
+            if (response.status === 304 && cached) {
+                return cached.data;
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json().then(data => {
+                const etag = response.headers.get('ETag');
+                if (etag) {
+                    try {
+                        sessionStorage.setItem(storageKey, JSON.stringify({ etag, data }));
+                    } catch (e) {
+                        // Storage penuh atau tidak tersedia, lewati cache
+                    }
+                }
+                return data;
+            });
+        });
+    }
+
     static formatNumber(number) {
         return new Intl.NumberFormat('id-ID').format(number);
     }
@@ -449,9 +568,13 @@ document.addEventListener('DOMContentLoaded', () => {
 });
 
 // Service Worker registration (for PWA)
+// Didaftarkan dari root dengan build id agar cache ikut berganti setiap deploy
 if ('serviceWorker' in navigator) {
     window.addEventListener('load', () => {
-        navigator.serviceWorker.register('/static/sw.js')
+        const buildMeta = document.querySelector('meta[name="ecoreport-build"]');
+        const buildId = buildMeta ? buildMeta.content : 'dev';
+
+        navigator.serviceWorker.register(`/sw.js?v=${encodeURIComponent(buildId)}`, { scope: '/' })
             .then(registration => {
                 console.log('SW registered: ', registration);
             })
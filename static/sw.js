@@ -1,48 +1,193 @@
-const CACHE_NAME = 'ecoreport-v1';
-const urlsToCache = [
-    '/',
-    '/static/css/custom.css',
-    '/static/js/app.js',
-    'https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/css/bootstrap.min.css',
-    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
-    'https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/js/bootstrap.bundle.min.js',
-    'https://cdnjs.cloudflare.com/ajax/libs/Chart.js/3.9.1/chart.min.js'
+/*
+ * EcoReport service worker
+ *
+ * Registered as /sw.js?v=<build id> so every deploy gets its own caches:
+ *   precache  fingerprinted files listed in /assets/manifest.json (cache-first)
+ *   pages     the anonymous offline page only; HTML navigations always go to
+ *             the network, since pages are rendered for the logged-in user
+ *   api       read-only JSON endpoints (stale-while-revalidate)
+ *   static    unfingerprinted /static files and CDN bundles (stale-while-revalidate)
+ */
+
+const BUILD_ID = new URL(self.location).searchParams.get('v') || 'dev';
+
+const CACHES = {
+    precache: `ecoreport-precache-${BUILD_ID}`,
+    pages: `ecoreport-pages-${BUILD_ID}`,
+    api: `ecoreport-api-${BUILD_ID}`,
+    static: `ecoreport-static-${BUILD_ID}`
+};
+
+// Maximum entries per runtime cache, oldest entries are evicted first
+const CACHE_LIMITS = {
+    api: 50,
+    static: 60
+};
+
+// GET endpoints that are safe to answer from cache while revalidating
+const API_ROUTES = [
+    /^\/api\/categories$/,
+    /^\/api\/stats\/summary$/,
+    /^\/api\/reports\/stats$/,
+    /^\/api\/v1\/categories$/,
+    /^\/api\/v1\/stats\/summary$/,
+    /^\/api\/v1\/reports(\/\d+)?$/
 ];
 
-// Install event
+const CDN_ORIGIN = 'https://cdnjs.cloudflare.com';
+const OFFLINE_PAGE = '/';
+const LOGOUT_PAGE = '/logout';
+
+// Install: precache the current build from the asset manifest
 self.addEventListener('install', event => {
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then(cache => {
-                console.log('Opened cache');
-                return cache.addAll(urlsToCache);
-            })
+        precacheBuild().then(() => self.skipWaiting())
     );
 });
 
-// Fetch event
-self.addEventListener('fetch', event => {
-    event.respondWith(
-        caches.match(event.request)
-            .then(response => {
-                // Return cached version or fetch from network
-                return response || fetch(event.request);
-            })
-    );
-});
+async function precacheBuild() {
+    const cache = await caches.open(CACHES.precache);
+    let manifest;
+    try {
+        const response = await fetch('/assets/manifest.json', { cache: 'no-store' });
+        if (!response.ok) {
+            return;  // no build (development), nothing to precache
+        }
+        manifest = await response.json();
+    } catch (error) {
+        return;
+    }
+
+    const urls = Object.values(manifest.assets || {})
+        .filter(path => /\.(css|js|woff2)$/.test(path))
+        .map(path => `/assets/${path}`);
+    await cache.addAll(urls);
+
+    await cacheOfflinePage();
+}
 
-// Activate event
+// The offline fallback is fetched without cookies, so it never shows a user's
+// data. It is optional, a failure must not abort install.
+async function cacheOfflinePage() {
+    try {
+        const response = await fetch(OFFLINE_PAGE, { credentials: 'omit' });
+        if (isCacheable(response)) {
+            const pages = await caches.open(CACHES.pages);
+            await pages.put(OFFLINE_PAGE, response);
+        }
+    } catch (error) {
+        console.log('Offline page not cached:', error);
+    }
+}
+
+// Logout: forget every page cached for the previous user
+async function logout(request) {
+    await caches.delete(CACHES.pages);
+    const response = await fetch(request);
+    await cacheOfflinePage();
+    return response;
+}
+
+// Activate: drop caches from previous deploys
 self.addEventListener('activate', event => {
+    const current = new Set(Object.values(CACHES));
     event.waitUntil(
-        caches.keys().then(cacheNames => {
-            return Promise.all(
-                cacheNames.map(cacheName => {
-                    if (cacheName !== CACHE_NAME) {
-                        console.log('Deleting old cache:', cacheName);
-                        return caches.delete(cacheName);
-                    }
-                })
-            );
-        })
+        caches.keys()
+            .then(names => Promise.all(
+                names.filter(name => !current.has(name)).map(name => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
     );
-});
\ No newline at end of file
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    const url = new URL(request.url);
+
+    if (url.origin === self.location.origin) {
+        if (request.mode === 'navigate' && url.pathname === LOGOUT_PAGE) {
+            event.respondWith(logout(request));
+        } else if (request.mode === 'navigate') {
+            event.respondWith(networkOrOfflinePage(request));
+        } else if (url.pathname.startsWith('/assets/') && url.pathname !== '/assets/manifest.json') {
+            event.respondWith(cacheFirst(request));
+        } else if (API_ROUTES.some(route => route.test(url.pathname)) && request.cache !== 'no-cache') {
+            event.respondWith(staleWhileRevalidate(event, 'api'));
+        } else if (url.pathname.startsWith('/static/')) {
+            event.respondWith(staleWhileRevalidate(event, 'static'));
+        }
+        // Everything else (writes, streams, uploads, explicit no-cache reads)
+        // goes straight to the network
+    } else if (url.origin === CDN_ORIGIN) {
+        event.respondWith(staleWhileRevalidate(event, 'static'));
+    }
+});
+
+function isCacheable(response) {
+    // Opaque CDN responses cannot be inspected, they are kept as-is
+    return response && (response.ok || response.type === 'opaque') && !response.redirected;
+}
+
+async function putBounded(kind, request, response) {
+    const cache = await caches.open(CACHES[kind]);
+    await cache.put(request, response);
+
+    const keys = await cache.keys();
+    const excess = keys.length - CACHE_LIMITS[kind];
+    for (let i = 0; i < excess; i++) {
+        await cache.delete(keys[i]);
+    }
+}
+
+// Fingerprinted assets never change, so a cached copy is always valid
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (isCacheable(response)) {
+        const cache = await caches.open(CACHES.precache);
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
+
+// HTML is always fetched fresh and never stored (it may be a user's or an
+// admin's page); offline, the anonymous offline page is shown instead
+async function networkOrOfflinePage(request) {
+    try {
+        return await fetch(request);
+    } catch (error) {
+        const cached = await caches.match(OFFLINE_PAGE, { cacheName: CACHES.pages });
+        if (cached) {
+            return cached;
+        }
+        throw error;
+    }
+}
+
+// Answer from cache immediately and refresh the entry in the background.
+// Revalidation requests carry the server ETag, so unchanged data costs a 304.
+async function staleWhileRevalidate(event, kind) {
+    const request = event.request;
+    const cached = await caches.match(request, { cacheName: CACHES[kind] });
+
+    const update = fetch(request)
+        .then(async response => {
+            if (isCacheable(response)) {
+                await putBounded(kind, request, response.clone());
+            }
+            return response;
+        });
+
+    if (cached) {
+        event.waitUntil(update.catch(() => undefined));
+        return cached;
+    }
+    return update;
+}
@@ -0,0 +1,369 @@
+"""
+Background jobs untuk EcoReport Application
+
+Jobs are rows in a SQLite table (instance/tasks.db by default), so they
+survive restarts and every gunicorn worker can enqueue without a broker.
+A separate worker process claims and runs them:
+
+    python tasks.py worker [threads] [processes]
+    python tasks.py status
+
+Jobs run highest priority first, failed jobs are retried with
+exponential backoff, and a job left "running" by a crashed worker is
+picked up again once its lease expires. A unique_key coalesces repeated
+enqueues while a job with that key is still waiting.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import sqlite3
+import logging
+import threading
+import traceback
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Requeued jobs give up their unique_key when another job with it is already waiting
+_REQUEUE_UNIQUE_KEY = (
+    "unique_key = CASE WHEN EXISTS (SELECT 1 FROM jobs AS other WHERE other.unique_key = jobs.unique_key "
+    "AND other.status = 'queued') THEN NULL ELSE unique_key END"
+)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Priorities, higher runs first
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+
+class TaskQueue:
+    """Durable job queue stored in SQLite"""
+
+    def __init__(self, path, max_retries=3, backoff_base=5, backoff_max=600, lease=300, eager=False):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.eager = eager
+        self.tasks = {}
+        self._local = threading.local()
+        self.open(path)
+
+    def open(self, path):
+        """Use the queue database at path from now on, creating it if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._connect().executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                args TEXT NOT NULL,
+                kwargs TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_retries INTEGER NOT NULL,
+                unique_key TEXT,
+                owner_id INTEGER,
+                result TEXT,
+                error TEXT,
+                run_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                worker TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_jobs_ready ON jobs (status, priority DESC, run_at);
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_unique_key ON jobs (unique_key)
+                WHERE unique_key IS NOT NULL AND status = 'queued';
+        ''')
+
+    def _connect(self):
+        # One connection per thread and per process (connections do not survive a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def task(self, name, max_retries=None, priority=PRIORITY_NORMAL):
+        """Register a function as a task; call it with .delay(...) to enqueue"""
+        def decorator(f):
+            self.tasks[name] = f
+            f.max_retries = self.max_retries if max_retries is None else max_retries
+
+            @wraps(f)
+            def delay(*args, **kwargs):
+                kwargs.setdefault('priority', priority)
+                return self.enqueue(name, *args, **kwargs)
+            f.delay = delay
+            return f
+        return decorator
+
+    def enqueue(self, name, *args, priority=PRIORITY_NORMAL, delay=0, unique_key=None, owner_id=None, **kwargs):
+        """Add a job and return its id (the existing id when unique_key is already queued)"""
+        if name not in self.tasks:
+            raise KeyError(f'Unknown task: {name}')
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                job_id = conn.execute(
+                    'INSERT INTO jobs (name, args, kwargs, priority, status, max_retries, unique_key, '
+                    'owner_id, run_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (name, json.dumps(args), json.dumps(kwargs), priority, QUEUED,
+                     self.tasks[name].max_retries, unique_key, owner_id, now + delay, now)
+                ).lastrowid
+        except sqlite3.IntegrityError:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE unique_key = ? AND status = 'queued'", (unique_key,)
+            ).fetchone()
+            if row is None:
+                # The queued job was claimed in the meantime
+                return self.enqueue(name, *args, priority=priority, delay=delay,
+                                    unique_key=unique_key, owner_id=owner_id, **kwargs)
+            return row['id']
+
+        if self.eager:
+            self.run_job(self.claim('eager', job_id=job_id))
+        return job_id
+
+    def claim(self, worker, job_id=None):
+        """Atomically take the next runnable job (or a specific one)"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if job_id is not None:
+                row = conn.execute("SELECT * FROM jobs WHERE id = ? AND status = 'queued'", (job_id,)).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' AND run_at <= ? "
+                    "ORDER BY priority DESC, run_at, id LIMIT 1", (now,)
+                ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, worker = ? WHERE id = ?',
+                (RUNNING, now, worker, row['id'])
+            )
+        job = dict(row)
+        job['attempts'] += 1
+        return job
+
+    def run_job(self, job):
+        """Run a claimed job and record the outcome"""
+        if job is None:
+            return None
+        try:
+            f = self.tasks[job['name']]
+            result = f(*json.loads(job['args']), **json.loads(job['kwargs']))
+        except Exception as e:
+            logger.warning('Job %s (%s) failed: %s', job['id'], job['name'], e)
+            self._fail(job, ''.join(traceback.format_exception_only(type(e), e)).strip())
+            return False
+        self._finish(job['id'], DONE, result=json.dumps(result, default=str))
+        return True
+
+    def _fail(self, job, error):
+        if job['attempts'] <= job['max_retries']:
+            backoff = min(self.backoff_max, self.backoff_base * 2 ** (job['attempts'] - 1))
+            backoff *= random.uniform(0.8, 1.2)
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    f'UPDATE jobs SET status = ?, run_at = ?, error = ?, worker = NULL, {_REQUEUE_UNIQUE_KEY} '
+                    'WHERE id = ?',
+                    (QUEUED, time.time() + backoff, error, job['id'])
+                )
+        else:
+            self._finish(job['id'], FAILED, error=error)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?',
+                (status, result, error, time.time(), job_id)
+            )
+
+    def recover_stale(self):
+        """Requeue jobs whose worker died while running them"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                f'UPDATE jobs SET status = ?, worker = NULL, {_REQUEUE_UNIQUE_KEY} WHERE status = ? AND started_at < ?',
+                (QUEUED, RUNNING, time.time() - self.lease)
+            )
+        return cursor.rowcount
+
+    def purge(self, older_than=7 * 24 * 3600):
+        """Delete finished jobs older than the given age (seconds)"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - older_than,)
+            )
+
+    def get(self, job_id):
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return job_to_dict(row) if row else None
+
+    def counts(self):
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def stalled(self, grace=300):
+        """Jobs overdue by grace seconds while no job was claimed for as long (no worker running)"""
+        cutoff = time.time() - grace
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND run_at < ? "
+            "AND NOT EXISTS (SELECT 1 FROM jobs WHERE started_at >= ?)", (cutoff, cutoff)
+        ).fetchone()[0]
+
+
+def _timestamp(value):
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(value)) if value else None
+
+
+def job_to_dict(row):
+    """Public view of a job for the status endpoint"""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'status': row['status'],
+        'priority': row['priority'],
+        'owner_id': row['owner_id'],
+        'attempts': row['attempts'],
+        'max_retries': row['max_retries'],
+        'result': json.loads(row['result']) if row['result'] else None,
+        'error': row['error'],
+        'created_at': _timestamp(row['created_at']),
+        'run_at': _timestamp(row['run_at']),
+        'started_at': _timestamp(row['started_at']),
+        'finished_at': _timestamp(row['finished_at']),
+    }
+
+
+class Worker:
+    """Pool of threads that claim and run jobs inside the Flask app context"""
+
+    def __init__(self, queue, app=None, threads=2, poll_interval=1.0):
+        self.queue = queue
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.name = f'{os.uname().nodename}:{os.getpid()}'
+        self._stop = threading.Event()
+
+    def run_once(self, worker_name=None):
+        """Claim and run one job; False when the queue is empty"""
+        job = self.queue.claim(worker_name or self.name)
+        if job is None:
+            return False
+        if self.app is not None:
+            with self.app.app_context():
+                self.queue.run_job(job)
+        else:
+            self.queue.run_job(job)
+        return True
+
+    def _loop(self, index):
+        worker_name = f'{self.name}:{index}'
+        while not self._stop.is_set():
+            try:
+                if not self.run_once(worker_name):
+                    self._stop.wait(self.poll_interval)
+            except sqlite3.OperationalError as e:
+                # Database busy; back off and retry
+                logger.warning('Worker %s: %s', worker_name, e)
+                self._stop.wait(self.poll_interval)
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def run(self):
+        """Run until SIGTERM/SIGINT, finishing the jobs in progress"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        threads = [threading.Thread(target=self._loop, args=(i,), name=f'task-worker-{i}')
+                   for i in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        print(f"✓ Worker {self.name} running {self.threads} thread(s)")
+
+        while not self._stop.wait(60):
+            recovered = self.queue.recover_stale()
+            if recovered:
+                logger.warning('Requeued %d stale job(s)', recovered)
+            self.queue.purge()
+
+        for thread in threads:
+            thread.join()
+
+
+def create_task_queue(app):
+    """Build the task queue from TASKS_* settings"""
+    path = app.config.get('TASKS_DB_PATH') or os.path.join(app.instance_path, 'tasks.db')
+    return TaskQueue(
+        path,
+        max_retries=int(app.config.get('TASKS_MAX_RETRIES', 3)),
+        lease=int(app.config.get('TASKS_LEASE', 300)),
+        eager=bool(app.config.get('TASKS_EAGER', False)),
+    )
+
+
+def _run_worker_process(threads):
+    from app import app, task_queue
+    Worker(task_queue, app, threads=threads).run()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python tasks.py [worker [threads] [processes]|status]")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1]
+
+    if command == 'worker':
+        threads = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+        processes = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+        if processes == 1:
+            _run_worker_process(threads)
+        else:
+            import multiprocessing
+            children = [multiprocessing.Process(target=_run_worker_process, args=(threads,))
+                        for _ in range(processes)]
+            for child in children:
+                child.start()
+            signal.signal(signal.SIGTERM, lambda *args: [child.terminate() for child in children])
+            for child in children:
+                child.join()
+    elif command == 'status':
+        from app import task_queue
+        print(json.dumps(task_queue.counts(), indent=2))
+    else:
+        print("Unknown command. Use: worker or status")
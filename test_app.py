@@ -1,29 +1,23 @@
+import io
 import unittest
 import json
-from app import app, db, User, Report, Category, Comment
+import tempfile
+from sqlalchemy import event
+from testing import AppTestCase
+from app import (app, db, User, Report, Category, Comment, Notification, Attachment, profiler, events,
+                 task_queue, thumbnails, limiter)
 from werkzeug.security import generate_password_hash
+from api import subrequest_environ
 
-class EcoReportTestCase(unittest.TestCase):
+class EcoReportTestCase(AppTestCase):
     def setUp(self):
         """Set up test fixtures"""
-        app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        self.app = app.test_client()
-        self.app_context = app.app_context()
-        self.app_context.push()
-        
-        db.drop_all()    # 🧹 Bersihkan database terlebih dulu
-        db.create_all()  # 📦 Buat ulang semua tabel
+        super().setUp()
+        self.app = self.client
         
         # Create test data
         self.create_test_data()
     
-    def tearDown(self):
-        """Tear down test fixtures"""
-        db.session.remove()
-        db.drop_all()
-        self.app_context.pop()
-    
     def create_test_data(self):
         """Create test data"""
         # Create test user
@@ -121,6 +115,31 @@ class EcoReportTestCase(unittest.TestCase):
         report = Report.query.filter_by(title='New Test Report').first()
         self.assertIsNotNone(report)
     
+    def test_report_and_comment_input_is_sanitized(self):
+        """Test markup in new reports and comments is reduced to the allow-list"""
+        self.login_user('testuser', 'testpass')
+        
+        self.app.post('/report/new', data={
+            'title': 'Saluran <script>alert(1)</script>tersumbat',
+            'description': '<p onclick="steal()">Air <b>meluap</b></p><img src=x onerror=alert(1)>',
+            'location': '<a href="javascript:alert(1)">Jl. Merdeka</a>',
+            'category_id': self.test_category.id,
+            'priority': 'high'
+        })
+        report = Report.query.filter_by(title='Saluran tersumbat').first()
+        self.assertIsNotNone(report)
+        self.assertEqual(report.description, '<p>Air <b>meluap</b></p>')
+        self.assertEqual(report.location, 'Jl. Merdeka')
+        
+        self.app.post(f'/report/{report.id}/comment', data={'content': 'Segera <svg onload=alert(1)>'})
+        self.assertEqual(report.comments[0].content, 'Segera')
+        
+        self.app.post(f'/report/{report.id}/comment', data={'content': 'Air naik <dalam 2 jam, tolong cek jembatan'})
+        self.assertEqual(report.comments[1].content, 'Air naik <dalam 2 jam, tolong cek jembatan')
+        page = self.app.get(f'/report/{report.id}').data
+        self.assertIn(b'<p>Air <b>meluap</b></p>', page)
+        self.assertIn(b'Air naik &lt;dalam 2 jam', page)
+    
     def test_create_report_unauthenticated(self):
         """Test creating report when not authenticated"""
         response = self.app.post('/report/new', data={
@@ -176,6 +195,356 @@ class EcoReportTestCase(unittest.TestCase):
         updated_report = Report.query.get(self.test_report.id)
         self.assertEqual(updated_report.status, 'resolved')
     
+    def test_status_update_notifies_reporter(self):
+        """Test an admin status change queues a notification for the reporter"""
+        self.login_user('admin', 'adminpass')
+        self.app.post(f'/admin/report/{self.test_report.id}/update_status', data={
+            'status': 'investigating'
+        })
+        
+        notification = Notification.query.filter_by(user_id=self.test_user.id).one()
+        self.assertEqual(notification.kind, 'status')
+        self.assertIn('investigating', notification.message)
+        self.assertIsNone(notification.sent_at)
+    
+    def test_api_rate_limit(self):
+        """Test clients over the API limit get 429 with Retry-After"""
+        app.config.update(RATELIMIT_ENABLED=True, RATELIMIT_API='3/minute')
+        limiter.reset()
+        try:
+            for remaining in ('2', '1', '0'):
+                response = self.app.get('/api/v1/categories')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers['RateLimit-Limit'], '3')
+                self.assertEqual(response.headers['RateLimit-Remaining'], remaining)
+            
+            response = self.app.get('/api/v1/reports')
+            self.assertEqual(response.status_code, 429)
+            self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+            
+            # Unverified bearer tokens stay in the client's IP bucket
+            forged = self.app.get('/api/v1/reports', headers={'Authorization': 'Bearer random-1'})
+            self.assertEqual(forged.status_code, 429)
+            
+            # Other clients and the stats bucket are unaffected
+            other = self.app.get('/api/v1/categories', environ_base={'REMOTE_ADDR': '10.0.0.2'})
+            self.assertEqual(other.status_code, 200)
+            self.assertEqual(self.app.get('/api/stats/summary').status_code, 200)
+        finally:
+            app.config.update(RATELIMIT_ENABLED=False, RATELIMIT_API='300/minute')
+            limiter.reset()
+    
+    def test_rate_limit_client_ip_behind_proxy(self):
+        """Test the client IP is the address appended by the outermost trusted proxy"""
+        limiter.trusted_proxies = 1
+        try:
+            for forwarded, expected in (('203.0.113.7', '203.0.113.7'), ('spoofed, 203.0.113.7', '203.0.113.7'),
+                                        (None, '10.0.0.2')):
+                headers = {'X-Forwarded-For': forwarded} if forwarded else {}
+                with app.test_request_context(headers=headers, environ_base={'REMOTE_ADDR': '10.0.0.2'}):
+                    self.assertEqual(limiter.client_ip(), expected)
+        finally:
+            limiter.trusted_proxies = 0
+    
+    def test_login_throttled_before_password_check(self):
+        """Test repeated failures lock the username out without hashing"""
+        from unittest import mock
+        for _ in range(5):
+            self.assertEqual(self.app.post('/api/v1/auth/login', json={
+                'username': 'testuser', 'password': 'wrong'
+            }).status_code, 401)
+        
+        with mock.patch.object(User, 'check_password') as check_password:
+            response = self.app.post('/api/v1/auth/login', json={'username': 'TestUser', 'password': 'testpass'})
+            self.assertEqual(response.status_code, 429)
+            self.assertGreater(int(response.headers['Retry-After']), 0)
+            response = self.login_user('testuser', 'testpass')
+            self.assertIn('Terlalu banyak percobaan login'.encode(), response.data)
+            check_password.assert_not_called()
+        
+        # Other accounts are not locked out by one username's failures
+        response = self.app.post('/api/v1/auth/login', json={'username': 'admin', 'password': 'adminpass'})
+        self.assertEqual(response.status_code, 200)
+        
+        for body in ({'username': 12345, 'password': 'x'}, {'username': 'admin', 'password': ['x']}, ['admin']):
+            self.assertEqual(self.app.post('/api/v1/auth/login', json=body).status_code, 400, body)
+    
+    def _png(self, name='photo.png'):
+        from PIL import Image
+        data = io.BytesIO()
+        Image.new('RGB', (800, 600), 'green').save(data, 'PNG')
+        data.seek(0)
+        return data, name
+    
+    def test_report_photo_upload(self):
+        """Test photos are stored on disk and thumbnailed off-request"""
+        with tempfile.TemporaryDirectory() as upload_dir:
+            original_dir = app.config['UPLOAD_FOLDER']
+            app.config['UPLOAD_FOLDER'] = upload_dir
+            try:
+                self.login_user('testuser', 'testpass')
+                response = self.app.post('/report/new', data={
+                    'title': 'Sampah di Sungai',
+                    'description': 'Tumpukan sampah plastik',
+                    'location': 'Jakarta',
+                    'category_id': self.test_category.id,
+                    'priority': 'high',
+                    'photos': [self._png('a.png'), self._png('b.png'), (io.BytesIO(b'x'), 'run.exe')]
+                }, content_type='multipart/form-data', follow_redirects=True)
+                self.assertEqual(response.status_code, 200)
+                
+                report = Report.query.filter_by(title='Sampah di Sungai').one()
+                self.assertEqual([a.original_name for a in report.attachments], ['a.png', 'b.png'])
+                
+                thumbnails.shutdown()
+                attachment = report.attachments[0]
+                self.assertTrue(attachment.has_thumbnail)
+                response = self.app.get(f'/attachments/{attachment.id}/thumbnail')
+                self.assertEqual(response.mimetype, 'image/jpeg')
+                response.close()
+                
+                response = self.app.get(f'/report/{report.id}')
+                self.assertIn(f'/attachments/{attachment.id}/thumbnail'.encode(), response.data)
+            finally:
+                app.config['UPLOAD_FOLDER'] = original_dir
+    
+    def test_api_attachment_upload(self):
+        """Test attachment upload through the API is limited to the reporter and admins"""
+        with tempfile.TemporaryDirectory() as upload_dir:
+            original_dir = app.config['UPLOAD_FOLDER']
+            app.config['UPLOAD_FOLDER'] = upload_dir
+            try:
+                def upload(username, password):
+                    token = json.loads(self.app.post('/api/v1/auth/login', json={
+                        'username': username, 'password': password
+                    }).data)['token']
+                    return self.app.post(f'/api/v1/reports/{self.test_report.id}/attachments',
+                                         data={'files': [self._png()]}, content_type='multipart/form-data',
+                                         headers={'Authorization': f'Bearer {token}'})
+                
+                other = User(username='other', email='other@example.com', full_name='Other',
+                             password_hash=generate_password_hash('otherpass'))
+                db.session.add(other)
+                db.session.commit()
+                self.assertEqual(upload('other', 'otherpass').status_code, 403)
+                
+                urls = (f'/api/v1/reports/{self.test_report.id}', f'/api/v1/reports?ids={self.test_report.id}')
+                etags = [self.app.get(url).headers['ETag'] for url in urls]
+                response = upload('testuser', 'testpass')
+                self.assertEqual(response.status_code, 201)
+                data = json.loads(response.data)
+                self.assertEqual(data['attachments'][0]['original_name'], 'photo.png')
+                
+                detail = json.loads(self.app.get(f'/api/v1/reports/{self.test_report.id}').data)
+                self.assertEqual(len(detail['attachments']), 1)
+                self.assertEqual(Attachment.query.count(), 1)
+                for url, etag in zip(urls, etags):
+                    self.assertEqual(self.app.get(url, headers={'If-None-Match': etag}).status_code, 200, url)
+                thumbnails.shutdown()
+            finally:
+                app.config['UPLOAD_FOLDER'] = original_dir
+    
+    def test_resumable_upload(self):
+        """Test a tus-style upload resumes at the stored offset and is attached when complete"""
+        import base64
+        import hashlib
+        content = b'video-bytes-' * 1000
+        half = len(content) // 2
+        
+        def b64(value):
+            return base64.b64encode(value).decode()
+        
+        with tempfile.TemporaryDirectory() as upload_dir:
+            original_dir = app.config['UPLOAD_FOLDER']
+            app.config['UPLOAD_FOLDER'] = upload_dir
+            try:
+                token = json.loads(self.app.post('/api/v1/auth/login', json={
+                    'username': 'testuser', 'password': 'testpass'
+                }).data)['token']
+                auth = {'Authorization': f'Bearer {token}', 'Tus-Resumable': '1.0.0'}
+                
+                response = self.app.post(f'/api/v1/reports/{self.test_report.id}/uploads', headers={
+                    **auth,
+                    'Upload-Length': str(len(content)),
+                    'Upload-Metadata': f'filename {b64(b"bukti.mp4")},filetype {b64(b"video/mp4")},'
+                                       f'sha256 {b64(hashlib.sha256(content).hexdigest().encode())}'
+                })
+                self.assertEqual(response.status_code, 201)
+                location = response.headers['Location']
+                
+                def patch(offset, body, checksum=None):
+                    headers = {**auth, 'Upload-Offset': str(offset), 'Content-Type': 'application/offset+octet-stream'}
+                    if checksum:
+                        headers['Upload-Checksum'] = f'sha256 {b64(hashlib.sha256(checksum).digest())}'
+                    return self.app.patch(location, data=body, headers=headers)
+                
+                response = patch(0, content[:half])
+                self.assertEqual(response.status_code, 204)
+                self.assertEqual(self.app.head(location, headers=auth).headers['Upload-Offset'], str(half))
+                self.assertEqual(patch(0, content[:half]).status_code, 409)
+                self.assertEqual(patch(half, content[half:], checksum=b'x').status_code, 460)
+                self.assertEqual(self.app.head(location, headers=auth).headers['Upload-Offset'], str(half))
+                
+                response = patch(half, content[half:], checksum=content[half:])
+                self.assertEqual(response.status_code, 204)
+                attachment = db.session.get(Attachment, int(response.headers['Upload-Attachment-Id']))
+                self.assertEqual(attachment.original_name, 'bukti.mp4')
+                self.assertEqual(attachment.size, len(content))
+                
+                # A client that lost the final response learns the upload was attached
+                response = self.app.head(location, headers=auth)
+                self.assertEqual(response.headers['Upload-Offset'], str(len(content)))
+                self.assertEqual(response.headers['Upload-Attachment-Id'], str(attachment.id))
+                response = patch(half, content[half:])
+                self.assertEqual(response.status_code, 204)
+                self.assertEqual(response.headers['Upload-Attachment-Id'], str(attachment.id))
+                self.assertEqual(Attachment.query.count(), 1)
+                
+                # The marker expires like an unfinished upload
+                from resumable import purge_uploads
+                self.assertEqual(purge_uploads(upload_dir, app.config['RESUMABLE_EXPIRY']), 0)
+                self.assertEqual(purge_uploads(upload_dir, -1), 1)
+                self.assertEqual(self.app.head(location, headers=auth).status_code, 404)
+            finally:
+                app.config['UPLOAD_FOLDER'] = original_dir
+    
+    def test_profile_request_as_admin(self):
+        """Test admin-flagged requests are profiled and listed"""
+        with tempfile.TemporaryDirectory() as profile_dir:
+            original_dir = profiler.profile_dir
+            profiler.profile_dir = profile_dir
+            try:
+                self.login_user('admin', 'adminpass')
+                response = self.app.get('/api/categories', headers={'X-Profile': '1'})
+                self.assertEqual(response.status_code, 200)
+                name = response.headers.get('X-Profile-Id')
+                self.assertIsNotNone(name)
+                
+                response = self.app.get('/admin/profiles')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b'api_get_categories', response.data)
+                
+                response = self.app.get(f'/admin/profiles/{name}.prof')
+                self.assertEqual(response.status_code, 200)
+            finally:
+                profiler.profile_dir = original_dir
+    
+    def test_profile_flag_ignored_for_regular_user(self):
+        """Test the profile flag does nothing for non-admin users"""
+        self.login_user('testuser', 'testpass')
+        response = self.app.get('/api/categories?_profile=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response.headers)
+    
+    def test_stats_cache_invalidated_on_status_update(self):
+        """Test cached stats are refreshed after an admin status change"""
+        data = json.loads(self.app.get('/api/stats/summary').data)
+        self.assertEqual(data['by_status']['pending'], 1)
+        
+        self.login_user('admin', 'adminpass')
+        self.app.post(f'/admin/report/{self.test_report.id}/update_status', data={
+            'status': 'resolved'
+        })
+        
+        data = json.loads(self.app.get('/api/stats/summary').data)
+        self.assertEqual(data['by_status']['pending'], 0)
+        self.assertEqual(data['by_status']['resolved'], 1)
+    
+    def test_status_update_is_streamed(self):
+        """Test a status change reaches /api/v1/stream as events with a stats delta"""
+        last_event_id = events.last_id()
+        self.login_user('admin', 'adminpass')
+        self.app.post(f'/admin/report/{self.test_report.id}/update_status', data={
+            'status': 'resolved'
+        })
+        
+        app.config['EVENTS_STREAM_TIMEOUT'] = 0
+        try:
+            response = self.app.get('/api/v1/stream', headers={'Last-Event-ID': str(last_event_id)})
+        finally:
+            app.config['EVENTS_STREAM_TIMEOUT'] = 300
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        
+        body = response.get_data(as_text=True)
+        self.assertIn('event: report.status', body)
+        stats_data = [line[len('data: '):] for line in body.splitlines() if line.startswith('data: ')][-1]
+        self.assertEqual(json.loads(stats_data), {'by_status': {'pending': -1, 'resolved': 1}})
+    
+    def test_recent_reports_feed(self):
+        """Test the recent feed includes new reports and supports since=<id>"""
+        response = self.app.get('/api/reports/recent')
+        self.assertEqual([r['id'] for r in json.loads(response.data)], [self.test_report.id])
+        
+        self.login_user('testuser', 'testpass')
+        self.app.post('/report/new', data={
+            'title': 'Feed Report',
+            'description': 'Feed Description',
+            'location': 'Feed Location',
+            'category_id': self.test_category.id,
+            'priority': 'low'
+        })
+        new_report = Report.query.filter_by(title='Feed Report').first()
+        
+        response = self.app.get(f'/api/reports/recent?since={self.test_report.id}')
+        self.assertEqual([r['id'] for r in json.loads(response.data)], [new_report.id])
+    
+    def test_job_status_endpoint(self):
+        """Test job status is visible to its owner and admins only"""
+        job_id = task_queue.enqueue('stats.rebuild', owner_id=self.test_user.id)
+        
+        def get_job(username, password):
+            token = json.loads(self.app.post('/api/v1/auth/login', json={
+                'username': username, 'password': password
+            }).data)['token']
+            return self.app.get(f'/api/v1/jobs/{job_id}', headers={'Authorization': f'Bearer {token}'})
+        
+        response = get_job('testuser', 'testpass')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['name'], 'stats.rebuild')
+        self.assertEqual(data['status'], 'queued')
+        
+        self.assertEqual(get_job('admin', 'adminpass').status_code, 200)
+        self.assertEqual(self.app.get(f'/api/v1/jobs/{job_id}').status_code, 401)
+    
+    def test_stats_conditional_get(self):
+        """Test stats answer If-None-Match with 304 until data changes"""
+        response = self.app.get('/api/stats/summary')
+        etag = response.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        
+        response = self.app.get('/api/stats/summary', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        
+        self.login_user('admin', 'adminpass')
+        self.app.post(f'/admin/report/{self.test_report.id}/update_status', data={
+            'status': 'resolved'
+        })
+        
+        response = self.app.get('/api/stats/summary', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers.get('ETag'), etag)
+    
+    def test_report_detail_conditional_get(self):
+        """Test report detail ETag changes when a comment is added"""
+        url = f'/api/v1/reports/{self.test_report.id}'
+        etag = self.app.get(url).headers.get('ETag')
+        self.assertEqual(self.app.get(url, headers={'If-None-Match': etag}).status_code, 304)
+        
+        self.login_user('testuser', 'testpass')
+        self.app.post(f'/report/{self.test_report.id}/comment', data={'content': 'Update'})
+        
+        response = self.app.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)['comments']), 1)
+    
+    def test_report_list_etag_depends_on_query(self):
+        """Test paginated lists get distinct validators per query"""
+        first = self.app.get('/api/reports?page=1').headers.get('ETag')
+        second = self.app.get('/api/reports?page=2').headers.get('ETag')
+        self.assertNotEqual(first, second)
+    
     def test_api_get_reports(self):
         """Test API endpoint for getting reports"""
         response = self.app.get('/api/reports')
@@ -185,6 +554,119 @@ class EcoReportTestCase(unittest.TestCase):
         self.assertIn('reports', data)
         self.assertIn('pagination', data)
     
+    def test_api_sparse_fieldsets(self):
+        """Test ?fields= limits report payloads to the requested fields"""
+        data = json.loads(self.app.get('/api/v1/reports?fields=title,status,category').data)
+        self.assertEqual(data['reports'][0], {
+            'id': self.test_report.id,
+            'title': 'Test Report',
+            'status': 'pending',
+            'category': {'id': self.test_category.id, 'name': 'Test Category', 'icon': '🧪'}
+        })
+        self.assertEqual(data['pagination']['total'], 1)
+        
+        url = f'/api/v1/reports/{self.test_report.id}'
+        self.assertEqual(set(json.loads(self.app.get(url + '?fields=title,comments').data)),
+                         {'id', 'title', 'comments'})
+        self.assertIn('description', json.loads(self.app.get(url).data))
+        
+        response = self.app.get('/api/v1/reports?fields=title,password_hash')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password_hash', json.loads(response.data)['message'])
+    
+    def test_api_reports_by_ids(self):
+        """Test ?ids= returns report details in request order with batched queries"""
+        other = Report(title='Other Report', description='Other', location='Elsewhere',
+                       category_id=self.test_category.id, user_id=self.test_user.id)
+        db.session.add(other)
+        db.session.commit()
+        db.session.add_all([Comment(content='First', report_id=self.test_report.id, user_id=self.test_user.id),
+                            Comment(content='Second', report_id=other.id, user_id=self.admin_user.id)])
+        db.session.commit()
+        
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        url = f'/api/v1/reports?ids={other.id},999,{self.test_report.id}'
+        app.config['CONDITIONAL_GET_ENABLED'] = False
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            data = json.loads(self.app.get(url).data)
+            self.assertEqual(len(statements), 3)  # reports, comments, attachments
+            self.assertEqual(json.loads(self.app.get(url).data), data)
+            self.assertEqual(len(statements), 4)  # only the missing id is looked up again
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+            app.config['CONDITIONAL_GET_ENABLED'] = True
+        
+        self.assertEqual([r['id'] for r in data['reports']], [other.id, self.test_report.id])
+        self.assertEqual(data['missing'], [999])
+        self.assertEqual([c['content'] for c in data['reports'][0]['comments']], ['Second'])
+        self.assertEqual(data['reports'][1], json.loads(self.app.get(f'/api/v1/reports/{self.test_report.id}').data))
+        
+        etag = self.app.get(url).headers['ETag']
+        self.assertEqual(self.app.get(url, headers={'If-None-Match': etag}).status_code, 304)
+        self.login_user('testuser', 'testpass')
+        self.app.post(f'/report/{other.id}/comment', data={'content': 'Update'})
+        response = self.app.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)['reports'][0]['comments']), 2)
+        
+        self.assertEqual(self.app.get('/api/v1/reports?ids=1,x').status_code, 400)
+        app.config['API_BATCH_MAX_IDS'] = 2
+        try:
+            self.assertEqual(self.app.get(url).status_code, 400)
+        finally:
+            app.config['API_BATCH_MAX_IDS'] = 200
+    
+    def test_api_batch(self):
+        """Test read-only sub-requests are answered in one round-trip"""
+        job_id = task_queue.enqueue('stats.rebuild', owner_id=self.test_user.id)
+        token = json.loads(self.app.post('/api/v1/auth/login', json={
+            'username': 'testuser', 'password': 'testpass'
+        }).data)['token']
+        detail = f'/api/v1/reports/{self.test_report.id}?fields=title'
+        etag = self.app.get(detail).headers['ETag']
+        
+        app.config['RATELIMIT_ENABLED'] = True
+        try:
+            response = self.app.post('/api/v1/batch', headers={'Authorization': f'Bearer {token}'}, json={
+                'requests': [
+                    {'path': detail},
+                    {'path': '/api/v1/categories'},
+                    {'path': f'/api/v1/jobs/{job_id}', 'headers': {'authorization': 'Bearer forged'}},
+                    {'path': '/api/v1/reports?ids=x'},
+                    {'path': detail, 'headers': {'If-None-Match': etag}},
+                    {'path': '/api/v1/reports/999'},
+                ]
+            })
+        finally:
+            app.config['RATELIMIT_ENABLED'] = False
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('RateLimit-Limit', response.headers)
+        
+        responses = json.loads(response.data)['responses']
+        self.assertEqual([r['status'] for r in responses], [200, 200, 200, 400, 304, 404])
+        self.assertEqual(responses[0]['body'], {'id': self.test_report.id, 'title': 'Test Report'})
+        self.assertEqual(responses[0]['headers']['ETag'], etag)
+        self.assertEqual(responses[1]['body'][0]['name'], 'Test Category')
+        self.assertEqual(responses[2]['body']['name'], 'stats.rebuild')
+        self.assertIsNone(responses[4]['body'])
+        self.assertEqual(responses[5]['body'], {'message': 'Not Found'})
+        
+        with app.test_request_context('/api/v1/batch', method='POST', headers={'X-Forwarded-For': '203.0.113.7'}):
+            environ = subrequest_environ('/api/v1/categories', {'X-Forwarded-For': '198.51.100.1',
+                                                                'Accept-Encoding': 'br', 'Accept': 'text/html'})
+        self.assertEqual(environ['HTTP_X_FORWARDED_FOR'], '203.0.113.7')
+        self.assertNotIn('HTTP_ACCEPT_ENCODING', environ)
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html')
+        
+        for subrequest in ({'path': '/api/v1/reports', 'method': 'POST'}, {'path': '/api/v1/stream'},
+                           {'path': '/api/v1/%73tream'}, {'path': '/admin/reports'}, {'path': '/api/v1/batch'},
+                           {'path': '/api/v1/reports/1/comments'}):
+            response = self.app.post('/api/v1/batch', json={'requests': [subrequest]})
+            self.assertEqual(response.status_code, 400, subrequest)
+        self.assertEqual(self.app.post('/api/v1/batch', json={'requests': []}).status_code, 400)
+    
     def test_api_get_categories(self):
         """Test API endpoint for getting categories"""
         response = self.app.get('/api/categories')
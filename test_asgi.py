@@ -0,0 +1,149 @@
+import os
+import json
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from testing import AppTestCase
+from app import app, db, cache, events, User, Category, Report, Comment
+from security import limiter, SQLiteRateLimitStore
+from cache import SQLiteCache
+from werkzeug.security import generate_password_hash
+from asgi import application, database, async_database_url
+
+class AsgiTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+
+        user = User(username='reporter', email='reporter@example.com',
+                    password_hash=generate_password_hash('pass'), full_name='Reporter')
+        category = Category(name='Sampah Ilegal', description='Pembuangan sampah', icon='🗑️')
+        db.session.add_all([user, category])
+        db.session.commit()
+        for i in range(3):
+            db.session.add(Report(title=f'Report {i}', description='Test', location='Test',
+                                  category_id=category.id, user_id=user.id, priority='high'))
+        db.session.commit()
+        db.session.add(Comment(content='Segera ditangani', report_id=1, user_id=user.id))
+        db.session.commit()
+
+    def tearDown(self):
+        self.loop.run_until_complete(database.dispose())
+        self.loop.close()
+        super().tearDown()
+        app.config['RATELIMIT_ENABLED'] = False
+
+    def request(self, path, headers=(), method='GET', until=None):
+        """Status, headers and body of an ASGI request; `until` ends a streaming response"""
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'root_path': '', 'query_string': query.encode(),
+            'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+            'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        }
+        messages = []
+        disconnect = asyncio.Event()
+
+        async def receive():
+            if not messages:
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if until is not None and until(b''.join(m.get('body', b'') for m in messages[1:])):
+                disconnect.set()
+
+        self.loop.run_until_complete(asyncio.wait_for(application(scope, receive, send), 10))
+        headers = {name.decode(): value.decode() for name, value in messages[0]['headers']}
+        return messages[0]['status'], headers, b''.join(m.get('body', b'') for m in messages[1:])
+
+    def test_async_database_url(self):
+        """Test the async driver is picked from the database dialect"""
+        self.assertEqual(str(async_database_url('sqlite:////tmp/eco.db')), 'sqlite+aiosqlite:////tmp/eco.db')
+        self.assertEqual(async_database_url('postgresql://eco:secret@db/eco').drivername, 'postgresql+asyncpg')
+        with self.assertRaises(ValueError):
+            async_database_url('mysql://db/eco')
+
+    def test_payloads_match_the_wsgi_api(self):
+        """Test async views return the same payloads as the WSGI API"""
+        for path in ('/api/v1/reports?per_page=2&page=2', '/api/v1/reports?status=pending', '/api/v1/reports/1',
+                     '/api/v1/reports?fields=title,category', '/api/v1/reports/1?fields=title,comments',
+                     '/api/v1/reports?ids=2,1,99', '/api/v1/reports?ids=1,3&fields=title',
+                     '/api/v1/stats/summary', '/api/v1/categories'):
+            cache.clear()
+            status, headers, body = self.request(path)
+            self.assertEqual(status, 200, path)
+            self.assertEqual(headers['content-type'], 'application/json')
+            cache.clear()
+            self.assertEqual(json.loads(body), self.client.get(path).get_json(), path)
+
+    def test_conditional_get_and_head(self):
+        """Test ETag revalidation and HEAD on an async view"""
+        status, headers, _ = self.request('/api/v1/reports')
+        status, _, body = self.request('/api/v1/reports', headers=[('If-None-Match', headers['etag'])])
+        self.assertEqual((status, body), (304, b''))
+
+        status, headers, body = self.request('/api/v1/reports', method='HEAD')
+        self.assertEqual((status, body), (200, b''))
+        self.assertGreater(int(headers['content-length']), 0)
+
+    def test_rate_limit_applies(self):
+        """Test the API rate limit hook runs for async views"""
+        app.config['RATELIMIT_ENABLED'] = True
+        status, headers, _ = self.request('/api/v1/categories')
+        self.assertEqual(status, 200)
+        self.assertIn('ratelimit-limit', headers)
+
+    def test_other_requests_go_to_flask(self):
+        """Test other routes are served by the Flask app"""
+        status, _, body = self.request('/api/v1/jobs/1')
+        self.assertEqual(status, 401)
+        self.assertEqual(json.loads(body)['message'], 'Token missing')
+        status, headers, _ = self.request('/')
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['content-type'].startswith('text/html'))
+
+    def test_stream_delivers_events(self):
+        """Test the async event stream sends published events"""
+        last_id = events.last_id()
+        events.publish('report.created', {'id': 1, 'title': 'Report 0'})
+        status, headers, body = self.request('/api/v1/stream', headers=[('Last-Event-ID', str(last_id))],
+                                             until=lambda body: b'report.created' in body)
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['content-type'].startswith('text/event-stream'))
+        self.assertIn(b'retry: ', body)
+        self.assertIn(b'event: report.created', body)
+
+    def test_shared_stores_run_off_the_event_loop(self):
+        """Test sqlite cache and rate limit stores are not called on the event loop thread"""
+        threads = []
+
+        class RecordingCache(SQLiteCache):
+            def get(self, key):
+                threads.append(threading.current_thread())
+                return super().get(key)
+
+        class RecordingStore(SQLiteRateLimitStore):
+            def hit(self, *args):
+                threads.append(threading.current_thread())
+                return super().hit(*args)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = limiter.store
+            limiter.store = RecordingStore(os.path.join(tmpdir, 'ratelimit.db'))
+            app.config['RATELIMIT_ENABLED'] = True
+            try:
+                with mock.patch('asgi.cache', RecordingCache(os.path.join(tmpdir, 'cache.db'))):
+                    for path in ('/api/v1/categories', '/api/v1/reports/1', '/api/v1/stats/summary'):
+                        self.assertEqual(self.request(path)[0], 200, path)
+            finally:
+                limiter.store = store
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import os
+import gzip
+import shutil
+import tempfile
+import assets
+import testing  # noqa: F401, sets up the test database before app is imported
+from app import app
+from unittest import mock
+from assets import AssetBuilder, AssetManifest, minify_css, minify_js
+
+class AssetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.static_dir = os.path.join(self.tmpdir.name, 'static')
+        for name in ('css/style.css', 'js/main.js', 'sw.js'):
+            os.makedirs(os.path.join(self.static_dir, os.path.dirname(name)), exist_ok=True)
+            shutil.copy(os.path.join(app.static_folder, name), os.path.join(self.static_dir, name))
+
+        fonts_dir = os.path.join(self.static_dir, 'vendor', 'font-awesome', 'webfonts')
+        css_dir = os.path.join(self.static_dir, 'vendor', 'font-awesome', 'css')
+        os.makedirs(fonts_dir)
+        os.makedirs(css_dir)
+        with open(os.path.join(fonts_dir, 'fa-solid-900.woff2'), 'wb') as f:
+            f.write(b'font')
+        with open(os.path.join(css_dir, 'all.min.css'), 'w') as f:
+            f.write('@font-face{src:url(../webfonts/fa-solid-900.woff2) format("woff2")}')
+
+        self.manifest = AssetBuilder(self.static_dir, log=lambda message: None).build(vendor=False)
+
+        self.original = (app.static_folder, assets.manifest)
+        app.static_folder = self.static_dir
+        assets.manifest = AssetManifest(self.static_dir)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app.static_folder, assets.manifest = self.original
+        self.tmpdir.cleanup()
+
+    @unittest.skipIf(assets.rcssmin is None, 'rcssmin not installed')
+    def test_minify_css(self):
+        """Test comments and whitespace are removed"""
+        self.assertEqual(minify_css('/* c */\na {\n  color: red;\n}\n'), 'a{color:red}')
+
+    def test_sources_unchanged_without_minifiers(self):
+        """Test CSS and JS are copied as they are when rcssmin/rjsmin are missing"""
+        css = 'a::before {\n  content: "a  ,  b";\n}\n'
+        js = 'const help = `\n// not a comment\n`;\n'
+        with mock.patch.object(assets, 'rcssmin', None), mock.patch.object(assets, 'rjsmin', None):
+            self.assertEqual(minify_css(css), css)
+            self.assertEqual(minify_js(js), js)
+
+    def test_build_fingerprints_and_precompresses(self):
+        """Test every asset is hashed, listed and gzipped"""
+        built = self.manifest['assets']['css/style.css']
+        self.assertRegex(built, r'^css/style\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.static_dir, 'dist', built)
+        with open(path, 'rb') as f, gzip.open(path + '.gz') as gz:
+            self.assertEqual(f.read(), gz.read())
+        self.assertIsNotNone(self.manifest['build_id'])
+
+    def test_css_urls_point_at_fingerprinted_files(self):
+        """Test vendored CSS references the hashed font"""
+        built = self.manifest['assets']['vendor/font-awesome/css/all.min.css']
+        with open(os.path.join(self.static_dir, 'dist', built)) as f:
+            css = f.read()
+        font = os.path.basename(self.manifest['assets']['vendor/font-awesome/webfonts/fa-solid-900.woff2'])
+        self.assertIn(f'url(../webfonts/{font})', css)
+
+    def test_asset_url_and_immutable_serving(self):
+        """Test templates link hashed assets served with immutable caching"""
+        with app.test_request_context():
+            url = assets.asset_url('css/style.css')
+            self.assertTrue(url.startswith('/assets/css/style.'))
+            # Vendor bundles that were not downloaded fall back to the CDN
+            self.assertTrue(assets.asset_url('vendor/chart.js/chart.min.js').startswith('https://'))
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(response.mimetype, 'text/css')
+        response.close()
+
+        response = self.client.get('/assets/manifest.json')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        response.close()
+
+    def test_service_worker_served_from_root(self):
+        """Test sw.js is served from / with a root scope and no caching"""
+        response = self.client.get('/sw.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/javascript')
+        self.assertEqual(response.headers['Service-Worker-Allowed'], '/')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        response.close()
+
+        with app.test_request_context():
+            self.assertEqual(assets.asset_build_id(), self.manifest['build_id'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import io
+import os
+import unittest
+import tempfile
+from testing import AppTestCase
+from app import app, db, User, Report, Category, Attachment, Blob, save_attachments
+from werkzeug.datastructures import FileStorage
+from werkzeug.security import generate_password_hash
+from attachments import blob_path, collect_garbage
+
+class AttachmentsTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_folder = app.config['UPLOAD_FOLDER']
+        app.config['UPLOAD_FOLDER'] = self.tmpdir.name
+
+        self.user = User(username='reporter', email='reporter@example.com',
+                         password_hash=generate_password_hash('pass'), full_name='Reporter')
+        category = Category(name='Test Category', icon='🧪')
+        db.session.add_all([self.user, category])
+        db.session.commit()
+        self.reports = [Report(title=f'Report {i}', description='Test', location='Test',
+                               category_id=category.id, user_id=self.user.id, priority='medium')
+                        for i in range(2)]
+        db.session.add_all(self.reports)
+        db.session.commit()
+
+    def tearDown(self):
+        super().tearDown()
+        app.config['UPLOAD_FOLDER'] = self.original_folder
+        self.tmpdir.cleanup()
+
+    def upload(self, report, content, name='bukti.pdf'):
+        file = FileStorage(io.BytesIO(content), filename=name, content_type='application/pdf')
+        saved, _ = save_attachments(report, [file], self.user)
+        return saved[0]
+
+    def blob_files(self):
+        return [name for _, _, files in os.walk(os.path.join(self.tmpdir.name, 'blobs')) for name in files]
+
+    def test_duplicate_uploads_share_one_blob(self):
+        """Test identical uploads are stored once and referenced twice"""
+        first = self.upload(self.reports[0], b'same evidence', 'a.pdf')
+        second = self.upload(self.reports[1], b'same evidence', 'b.pdf')
+        self.upload(self.reports[1], b'other evidence')
+
+        self.assertEqual(first.blob_sha256, second.blob_sha256)
+        self.assertEqual(first.filename, blob_path(first.blob_sha256))
+        self.assertTrue(first.filename.startswith(f'blobs/{first.blob_sha256[:2]}/{first.blob_sha256[2:4]}/'))
+        self.assertEqual(db.session.get(Blob, first.blob_sha256).refcount, 2)
+        self.assertEqual(len(self.blob_files()), 2)
+
+    def test_blobs_are_readable_by_the_proxy(self):
+        """Test blobs are world-readable so a proxy serving X-Accel-Redirect can open them"""
+        attachment = self.upload(self.reports[0], b'evidence')
+        mode = os.stat(os.path.join(self.tmpdir.name, attachment.filename)).st_mode
+        self.assertEqual(mode & 0o777, 0o644)
+
+    def test_gc_removes_unreferenced_blobs(self):
+        """Test garbage collection deletes only blobs no attachment uses"""
+        shared = self.upload(self.reports[0], b'same evidence').blob_sha256
+        self.upload(self.reports[1], b'same evidence')
+
+        db.session.delete(self.reports[0])
+        db.session.commit()
+        self.assertEqual(db.session.get(Blob, shared).refcount, 1)
+        self.assertEqual(collect_garbage(self.tmpdir.name, grace_period=0), [])
+
+        db.session.delete(self.reports[1])
+        db.session.commit()
+        self.assertEqual(collect_garbage(self.tmpdir.name, grace_period=3600), [])
+        self.assertEqual(collect_garbage(self.tmpdir.name, grace_period=0, dry_run=True), [shared])
+        self.assertEqual(len(self.blob_files()), 1)
+
+        self.assertEqual(collect_garbage(self.tmpdir.name, grace_period=0), [shared])
+        self.assertIsNone(db.session.get(Blob, shared))
+        self.assertEqual(self.blob_files(), [])
+
+    def test_gc_recount_repairs_refcounts(self):
+        """Test a recount fixes refcounts that drifted from the attachments"""
+        attachment = self.upload(self.reports[0], b'evidence')
+        sha256 = attachment.blob_sha256
+        # Bulk delete bypasses the ORM events
+        Attachment.query.filter_by(id=attachment.id).delete()
+        db.session.commit()
+        self.assertEqual(db.session.get(Blob, sha256).refcount, 1)
+
+        self.assertEqual(collect_garbage(self.tmpdir.name, grace_period=0, recount=True), [sha256])
+        self.assertEqual(self.blob_files(), [])
+
+    def test_serving_supports_conditional_and_range_requests(self):
+        """Test attachments answer If-None-Match and Range requests"""
+        attachment = self.upload(self.reports[0], b'0123456789', 'bukti.pdf')
+        client = app.test_client()
+        url = f'/attachments/{attachment.id}'
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'0123456789')
+        self.assertEqual(response.mimetype, 'application/pdf')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        etag = response.headers['ETag']
+        self.assertIn(attachment.blob_sha256, etag)
+        response.close()
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        response = client.get(url, headers={'Range': 'bytes=2-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, b'2345')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 2-5/10')
+        response.close()
+
+        # Stale If-Range: the whole file instead of the range
+        response = client.get(url, headers={'Range': 'bytes=2-5', 'If-Range': '"other"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'0123456789')
+        response.close()
+
+        response = client.get(url, headers={'Range': 'bytes=20-30'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */10')
+
+    def test_serving_offloads_to_proxy(self):
+        """Test X-Accel-Redirect and X-Sendfile responses carry no body"""
+        attachment = self.upload(self.reports[0], b'evidence')
+        client = app.test_client()
+        try:
+            app.config['ATTACHMENT_SENDFILE'] = 'x-accel'
+            response = client.get(f'/attachments/{attachment.id}')
+            self.assertEqual(response.headers['X-Accel-Redirect'], f'/_uploads/{attachment.filename}')
+            self.assertEqual(response.data, b'')
+
+            app.config['ATTACHMENT_SENDFILE'] = 'x-sendfile'
+            response = client.get(f'/attachments/{attachment.id}')
+            self.assertEqual(response.headers['X-Sendfile'],
+                             os.path.join(self.tmpdir.name, attachment.filename))
+        finally:
+            app.config['ATTACHMENT_SENDFILE'] = ''
+
+if __name__ == '__main__':
+    unittest.main()
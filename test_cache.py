@@ -0,0 +1,78 @@
+import unittest
+import os
+import time
+import tempfile
+from cache import LocalCache, SQLiteCache, NullCache
+
+class LocalCacheTestCase(unittest.TestCase):
+    def make_cache(self):
+        return LocalCache(max_entries=3, default_ttl=60)
+
+    def test_get_or_set(self):
+        """Test the factory only runs on a miss"""
+        cache = self.make_cache()
+        calls = []
+        factory = lambda: calls.append(1) or ['value']
+        self.assertEqual(cache.get_or_set('key', factory), ['value'])
+        self.assertEqual(cache.get_or_set('key', factory), ['value'])
+        self.assertEqual(len(calls), 1)
+
+    def test_ttl_expiry(self):
+        """Test entries expire after their TTL"""
+        cache = self.make_cache()
+        cache.set('key', 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('key'))
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first"""
+        cache = self.make_cache()
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'a')
+
+    def test_invalidate_tags(self):
+        """Test invalidation only removes entries carrying the tag"""
+        cache = self.make_cache()
+        cache.set('report:1:detail', {'id': 1}, tags=('report:1',))
+        cache.set('report:2:detail', {'id': 2}, tags=('report:2',))
+        cache.set('stats:summary', {}, tags=('stats',))
+        cache.invalidate_tags('report:1', 'stats')
+        self.assertIsNone(cache.get('report:1:detail'))
+        self.assertIsNone(cache.get('stats:summary'))
+        self.assertEqual(cache.get('report:2:detail'), {'id': 2})
+
+class SQLiteCacheTestCase(LocalCacheTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'cache.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_cache(self):
+        return SQLiteCache(self.path, default_ttl=60)
+
+    def test_lru_eviction(self):
+        """SQLite cache relies on TTL and tags, not LRU"""
+
+    def test_shared_between_instances(self):
+        """Test two workers see each other's writes and invalidations"""
+        worker_a = self.make_cache()
+        worker_b = self.make_cache()
+        worker_a.set('categories', [{'id': 1}], tags=('category',))
+        self.assertEqual(worker_b.get('categories'), [{'id': 1}])
+        worker_b.invalidate_tags('category')
+        self.assertIsNone(worker_a.get('categories'))
+
+class NullCacheTestCase(unittest.TestCase):
+    def test_never_stores(self):
+        cache = NullCache()
+        cache.set('key', 1)
+        self.assertIsNone(cache.get('key'))
+
+if __name__ == '__main__':
+    unittest.main()
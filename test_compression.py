@@ -0,0 +1,140 @@
+import gzip
+import json
+import unittest
+import brotli
+from flask import Flask, Response, jsonify, send_file
+from testing import AppTestCase
+from app import db, User, Category, Report
+from werkzeug.security import generate_password_hash
+from compression import ResponseCompressor, is_compressible
+
+TEXT = 'Tumpukan sampah di tepi sungai, bau menyengat. ' * 40
+
+class ResponseCompressorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        ResponseCompressor(self.app)
+
+        @self.app.route('/text')
+        def text():
+            return TEXT
+
+        @self.app.route('/small')
+        def small():
+            return jsonify({'ok': True})
+
+        @self.app.route('/export')
+        def export():
+            def rows():
+                yield 'id,title\n'
+                for i in range(500):
+                    yield f'{i},Laporan {i}\n'
+            return Response(rows(), mimetype='text/csv')
+
+        @self.app.route('/events')
+        def events():
+            return Response(iter([TEXT]), mimetype='text/event-stream')
+
+        @self.app.route('/image')
+        def image():
+            return Response(TEXT, mimetype='image/png')
+
+        @self.app.route('/file')
+        def file():
+            response = send_file(__file__, mimetype='text/plain', conditional=True)
+            response.accept_ranges = 'bytes'
+            return response
+
+        self.client = self.app.test_client()
+
+    def test_negotiates_encoding(self):
+        """Test brotli is preferred and gzip is used otherwise"""
+        response = self.client.get('/text', headers={'Accept-Encoding': 'gzip, deflate, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.data).decode(), TEXT)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+        response = self.client.get('/text', headers={'Accept-Encoding': 'gzip, br;q=0.5'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data).decode(), TEXT)
+
+        response = self.client.get('/text', headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.get_data(as_text=True), TEXT)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_skips_small_bodies_and_other_types(self):
+        """Test small bodies, event streams and images are not compressed"""
+        for path in ('/small', '/events', '/image'):
+            response = self.client.get(path, headers={'Accept-Encoding': 'gzip'})
+            self.assertNotIn('Content-Encoding', response.headers, path)
+
+        self.app.config['COMPRESS_ENABLED'] = False
+        response = self.client.get('/text', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_streamed_body(self):
+        """Test streamed responses are compressed without Content-Length"""
+        response = self.client.get('/export', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        body = gzip.decompress(response.data).decode()
+        self.assertTrue(body.startswith('id,title\n0,Laporan 0\n'))
+        self.assertTrue(body.endswith('499,Laporan 499\n'))
+
+    def test_file_gets_weak_etag_and_no_ranges(self):
+        """Test compressed files get a weak ETag and no byte ranges"""
+        plain = self.client.get('/file')
+        self.assertEqual(plain.headers['Accept-Ranges'], 'bytes')
+
+        response = self.client.get('/file', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Accept-Ranges', response.headers)
+        self.assertEqual(response.headers['ETag'], 'W/' + plain.headers['ETag'])
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+
+        partial = self.client.get('/file', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-9'})
+        self.assertEqual(partial.status_code, 206)
+        self.assertNotIn('Content-Encoding', partial.headers)
+
+        response = self.client.get('/file', headers={'Accept-Encoding': 'gzip',
+                                                     'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_is_compressible(self):
+        """Test which mimetypes are compressed"""
+        for mimetype in ('text/html', 'application/json', 'application/problem+json', 'image/svg+xml'):
+            self.assertTrue(is_compressible(mimetype), mimetype)
+        for mimetype in ('text/event-stream', 'image/jpeg', 'application/pdf', 'application/zip', None):
+            self.assertFalse(is_compressible(mimetype), mimetype)
+
+class ApiCompressionTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+
+        user = User(username='reporter', email='reporter@example.com',
+                    password_hash=generate_password_hash('pass'), full_name='Reporter')
+        category = Category(name='Sampah Ilegal', description='Pembuangan sampah', icon='🗑️')
+        db.session.add_all([user, category])
+        db.session.commit()
+        for i in range(10):
+            db.session.add(Report(title=f'Report {i}', description=TEXT, location='Test',
+                                  category_id=category.id, user_id=user.id))
+        db.session.commit()
+
+    def test_report_list_is_compressed_and_revalidates(self):
+        """Test the report list is compressed and still revalidates"""
+        plain = self.client.get('/api/v1/reports')
+        response = self.client.get('/api/v1/reports', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.data), len(plain.data) / 5)
+        self.assertEqual(json.loads(gzip.decompress(response.data)), plain.get_json())
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+
+        response = self.client.get('/api/v1/reports', headers={'Accept-Encoding': 'gzip',
+                                                               'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+if __name__ == '__main__':
+    unittest.main()
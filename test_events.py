@@ -0,0 +1,65 @@
+import unittest
+import os
+import time
+import tempfile
+from events import EventBus, format_sse
+
+class EventBusTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.bus = EventBus(os.path.join(self.tmpdir.name, 'events.db'), poll_interval=0.01)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_publish_and_replay(self):
+        """Test events are logged in order with increasing ids"""
+        first = self.bus.publish('stats', {'total_reports': 1})
+        second = self.bus.publish('report.created', {'id': 7})
+        self.assertGreater(second, first)
+
+        events = self.bus.events_since(first)
+        self.assertEqual(events, [{'id': second, 'type': 'report.created', 'data': {'id': 7}}])
+        self.assertEqual(format_sse(events[0]), f'id: {second}\nevent: report.created\ndata: {{"id": 7}}\n\n')
+
+    def test_subscriber_receives_events_from_other_writers(self):
+        """Test the dispatcher fans out rows written through another connection"""
+        subscription = self.bus.subscribe()
+        try:
+            # A second bus on the same file plays the part of another worker
+            other_worker = EventBus(self.bus.path)
+            event_id = other_worker.publish('stats', {'total_users': 1})
+
+            event = subscription.get(timeout=2)
+            self.assertIsNotNone(event)
+            self.assertEqual(event['id'], event_id)
+            self.assertEqual(event['data'], {'total_users': 1})
+        finally:
+            subscription.close()
+
+    def test_stream_resumes_from_last_event_id(self):
+        """Test a reconnecting client only gets the events it missed"""
+        first = self.bus.publish('stats', {'total_reports': 1})
+        self.bus.publish('stats', {'total_reports': 1})
+        self.bus.publish('report.status', {'id': 1, 'status': 'resolved'})
+
+        body = ''.join(self.bus.stream(last_event_id=first, timeout=0.05))
+        self.assertTrue(body.startswith('retry: '))
+        self.assertEqual(body.count('event: '), 2)
+        self.assertNotIn(f'id: {first}\n', body)
+
+    def test_stream_resets_when_events_were_pruned(self):
+        """Test clients too far behind are told to reload their state"""
+        stale = self.bus.publish('stats', {'total_reports': 1})
+        self.bus.retention = 0
+        time.sleep(0.01)
+        self.bus.prune()
+        self.bus.retention = 3600
+        self.bus.publish('stats', {'total_reports': 1})
+
+        body = ''.join(self.bus.stream(last_event_id=stale - 1, timeout=0.05))
+        self.assertIn('event: reset', body)
+        self.assertNotIn('event: stats', body)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import time
+import tempfile
+from events import EventBus
+from feed import RecentFeed
+
+def make_item(report_id, status='pending'):
+    return {'id': report_id, 'title': f'Report {report_id}', 'status': status}
+
+class RecentFeedTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loads = []
+
+    def loader(self, limit):
+        self.loads.append(limit)
+        return [make_item(i) for i in range(1, 4)]
+
+    def test_primed_once_and_bounded(self):
+        """Test the buffer loads once and keeps only the newest entries"""
+        feed = RecentFeed(self.loader, size=3)
+        self.assertEqual([item['id'] for item in feed.recent()], [3, 2, 1])
+
+        feed.add(make_item(4))
+        feed.add(make_item(5))
+        self.assertEqual([item['id'] for item in feed.recent()], [5, 4, 3])
+        self.assertEqual(self.loads, [3])
+
+    def test_since_and_limit(self):
+        """Test incremental reads only return newer reports"""
+        feed = RecentFeed(self.loader, size=10)
+        feed.add(make_item(4))
+        self.assertEqual([item['id'] for item in feed.recent(since=2)], [4, 3])
+        self.assertEqual([item['id'] for item in feed.recent(limit=1)], [4])
+        self.assertEqual(feed.recent(since=4), [])
+
+    def test_out_of_order_and_duplicate_adds(self):
+        """Test events from other workers are deduplicated and kept in id order"""
+        feed = RecentFeed(self.loader, size=4)
+        feed.recent()
+        feed.add(make_item(6))
+        feed.add(make_item(5))
+        feed.add(make_item(6))
+        self.assertEqual([item['id'] for item in feed.recent()], [6, 5, 3, 2])
+
+    def test_follows_event_bus(self):
+        """Test reports and status changes published elsewhere reach the buffer"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bus = EventBus(os.path.join(tmpdir, 'events.db'), poll_interval=0.01)
+            feed = RecentFeed(self.loader, size=10, bus=bus)
+            feed.recent()
+
+            other_worker = EventBus(bus.path)
+            other_worker.publish('report.created', make_item(7))
+            other_worker.publish('report.status', {'id': 2, 'status': 'resolved'})
+
+            for _ in range(200):
+                items = {item['id']: item for item in feed.recent()}
+                if 7 in items and items[2]['status'] == 'resolved':
+                    break
+                time.sleep(0.01)
+            self.assertIn(7, items)
+            self.assertEqual(items[2]['status'], 'resolved')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import threading
+import unittest
+from unittest import mock
+from testing import AppTestCase
+from app import db, User, hasher
+from werkzeug.security import generate_password_hash
+from hashing import PasswordHasher, HashingBusy
+
+class PasswordHasherTestCase(AppTestCase):
+    def test_hash_and_verify(self):
+        """Test hashing and verifying in the pool"""
+        pool = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=2)
+        try:
+            pwhash = pool.hash('rahasia')
+            self.assertTrue(pwhash.startswith('pbkdf2:sha256:1000$'))
+            self.assertTrue(pool.verify(pwhash, 'rahasia'))
+            self.assertFalse(pool.verify(pwhash, 'salah'))
+            self.assertFalse(pool.verify(None, 'rahasia'))
+        finally:
+            pool.shutdown()
+
+    def test_saturated_pool_rejects_immediately(self):
+        """Test a full pool raises HashingBusy instead of queueing"""
+        pool = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=1)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_hash(password, method):
+            started.set()
+            release.wait(5)
+            return 'pbkdf2:sha256:1000$salt$hash'
+
+        with mock.patch('hashing.generate_password_hash', slow_hash):
+            worker = threading.Thread(target=pool.hash, args=('first',))
+            worker.start()
+            started.wait(5)
+            try:
+                with self.assertRaises(HashingBusy):
+                    pool.hash('second')
+            finally:
+                release.set()
+                worker.join()
+        # The slot is free again once the first hash finished
+        self.assertTrue(pool.verify(pool.hash('third'), 'third'))
+        pool.shutdown()
+
+    def test_needs_rehash(self):
+        """Test hashes with other parameters need a rehash"""
+        pool = PasswordHasher(method='pbkdf2:sha256:1000')
+        self.assertFalse(pool.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:1000')))
+        self.assertTrue(pool.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:2000')))
+        self.assertTrue(pool.needs_rehash(generate_password_hash('x', 'scrypt')))
+
+    def test_login_upgrades_old_hash(self):
+        """Test logging in rehashes an outdated password hash"""
+        old_hash = generate_password_hash('pass', 'pbkdf2:sha256:1000')
+        user = User(username='reporter', email='reporter@example.com',
+                    password_hash=old_hash, full_name='Reporter')
+        db.session.add(user)
+        db.session.commit()
+
+        response = self.client.post('/api/v1/auth/login', json={'username': 'reporter', 'password': 'pass'})
+        self.assertEqual(response.status_code, 200)
+        new_hash = db.session.get(User, user.id).password_hash
+        self.assertNotEqual(new_hash, old_hash)
+        self.assertFalse(hasher.needs_rehash(new_hash))
+
+        # Still the same password
+        response = self.client.post('/api/v1/auth/login', json={'username': 'reporter', 'password': 'pass'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_busy_pool_answers_503(self):
+        """Test login answers 503 with Retry-After when the pool is busy"""
+        with mock.patch.object(hasher, 'verify', side_effect=HashingBusy()):
+            db.session.add(User(username='reporter', email='reporter@example.com',
+                                password_hash=generate_password_hash('pass'), full_name='Reporter'))
+            db.session.commit()
+
+            response = self.client.post('/api/v1/auth/login', json={'username': 'reporter', 'password': 'pass'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+
+            response = self.client.post('/login', data={'username': 'reporter', 'password': 'pass'})
+            self.assertEqual(response.status_code, 503)
+            self.assertIn(b'sibuk', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import time
+import sqlite3
+import unittest
+from unittest import mock
+import jwt
+from sqlalchemy import event
+from testing import AppTestCase
+from app import db, User, identities, get_identity
+from werkzeug.security import generate_password_hash
+from identity import IdentityCache, TokenMemo
+
+class IdentityCacheTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User(username='reporter', email='reporter@example.com',
+                         password_hash=generate_password_hash('pass'), full_name='Reporter')
+        db.session.add(self.user)
+        db.session.commit()
+        self.user_id = self.user.id
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        super().tearDown()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def user_selects(self):
+        return [s for s in self.statements if s.lstrip().startswith('SELECT') and 'FROM user' in s]
+
+    def test_cached_identity_skips_the_query(self):
+        get_identity(self.user_id)
+        db.session.remove()
+        self.statements.clear()
+
+        user = get_identity(self.user_id)
+        self.assertEqual(user.username, 'reporter')
+        self.assertIs(db.session.get(User, self.user_id), user)
+        self.assertEqual(self.user_selects(), [])
+
+    def test_commit_invalidates_cached_identity(self):
+        get_identity(self.user_id)
+        user = get_identity(self.user_id)
+        user.full_name = 'Renamed'
+        db.session.commit()
+        db.session.remove()
+
+        self.assertEqual(get_identity(self.user_id).full_name, 'Renamed')
+
+    def test_publish_failure_does_not_fail_the_commit(self):
+        user = get_identity(self.user_id)
+        user.full_name = 'Renamed'
+        with mock.patch.object(identities.bus, 'publish', side_effect=sqlite3.OperationalError('locked')):
+            db.session.commit()
+        db.session.remove()
+        self.assertEqual(get_identity(self.user_id).full_name, 'Renamed')
+
+    def test_ttl_and_size_bounds(self):
+        loads = []
+        cache = IdentityCache(lambda user_id: loads.append(user_id) or {'id': user_id}, ttl=0.05, maxsize=2)
+        cache.get(1)
+        cache.get(1)
+        self.assertEqual(loads, [1])
+        time.sleep(0.06)
+        cache.get(1)
+        self.assertEqual(loads, [1, 1])
+
+        cache.get(2)
+        cache.get(3)
+        cache.get(1)
+        self.assertEqual(loads, [1, 1, 2, 3, 1])
+
+    def test_token_memo(self):
+        decoded = []
+
+        def decode(token, key):
+            decoded.append(token)
+            return jwt.decode(token, key, algorithms=['HS256'])
+
+        memo = TokenMemo(decode)
+        token = jwt.encode({'user_id': 1, 'exp': int(time.time()) + 60}, 'secret')
+        self.assertEqual(memo.get(token, 'secret')['user_id'], 1)
+        self.assertEqual(memo.get(token, 'secret')['user_id'], 1)
+        self.assertEqual(len(decoded), 1)
+        with self.assertRaises(jwt.InvalidSignatureError):
+            memo.get(token, 'other-secret')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,20 +1,9 @@
 import unittest
-from app import app, db, User, Report, Category, Comment
+from testing import AppTestCase
+from app import db, User, Report, Category, Comment
 from werkzeug.security import generate_password_hash, check_password_hash
 
-class ModelsTestCase(unittest.TestCase):
-    def setUp(self):
-        app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        self.app_context = app.app_context()
-        self.app_context.push()
-        db.create_all()
-    
-    def tearDown(self):
-        db.session.remove()
-        db.drop_all()
-        self.app_context.pop()
-    
+class ModelsTestCase(AppTestCase):
     def test_user_creation(self):
         """Test user model creation"""
         user = User(
@@ -0,0 +1,131 @@
+import unittest
+import os
+import socket
+import smtplib
+import tempfile
+from testing import AppTestCase
+from app import app, db, User, Report, Category, Notification
+from werkzeug.security import generate_password_hash
+from notifications import Notifier, SMTPPool
+from tasks import TaskQueue, Worker
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # optional, only needed for the end-to-end test
+    Controller = None
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return '250 OK'
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that can simulate a dropped connection"""
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.drop_next = False
+        FakeSMTP.instances.append(self)
+
+    def send_message(self, message):
+        if self.drop_next:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(message)
+
+    def quit(self):
+        pass
+
+class NotificationsTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.reporter = User(username='reporter', email='reporter@example.com',
+                             password_hash=generate_password_hash('pass'), full_name='Reporter')
+        self.other = User(username='other', email='other@example.com',
+                          password_hash=generate_password_hash('pass'), full_name='Other')
+        category = Category(name='Test Category', icon='🧪')
+        db.session.add_all([self.reporter, self.other, category])
+        db.session.commit()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue = TaskQueue(os.path.join(self.tmpdir.name, 'tasks.db'))
+        FakeSMTP.instances = []
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def make_notifier(self, pool):
+        return Notifier(app, self.queue, pool=pool)
+
+    def run_due_jobs(self):
+        self.queue._connect().execute('UPDATE jobs SET run_at = 0')
+        worker = Worker(self.queue, app)
+        while worker.run_once():
+            pass
+
+    def test_notifications_are_coalesced_per_recipient(self):
+        """Test events inside the window become one digest job per user"""
+        notifier = self.make_notifier(SMTPPool('localhost', 25, factory=FakeSMTP))
+        first = notifier.queue(self.reporter.id, 'status', 'Status berubah menjadi investigating.')
+        second = notifier.queue(self.reporter.id, 'comment', 'Tanggapan resmi: sedang ditangani.')
+        other = notifier.queue(self.other.id, 'status', 'Status berubah menjadi resolved.')
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+        self.run_due_jobs()
+        sent = FakeSMTP.instances[0].sent
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(len(sent), 2)
+        digest = next(message for message in sent if message['To'] == 'reporter@example.com')
+        self.assertIn('2 pembaruan', digest['Subject'])
+        self.assertIn('investigating', digest.get_content())
+        self.assertIn('sedang ditangani', digest.get_content())
+        self.assertEqual(Notification.query.filter_by(sent_at=None).count(), 0)
+
+    def test_pool_reconnects_after_drop(self):
+        """Test a dropped connection is replaced and the message still sent"""
+        pool = SMTPPool('localhost', 25, factory=FakeSMTP)
+        notifier = self.make_notifier(pool)
+        notifier.queue(self.reporter.id, 'status', 'Status berubah.')
+        self.run_due_jobs()
+        FakeSMTP.instances[0].drop_next = True
+
+        notifier.queue(self.reporter.id, 'status', 'Status berubah lagi.')
+        self.run_due_jobs()
+        self.assertEqual(pool.connections_opened, 2)
+        self.assertEqual(len(FakeSMTP.instances[1].sent), 1)
+
+    @unittest.skipIf(Controller is None, 'aiosmtpd not installed')
+    def test_digests_sent_over_one_smtp_session(self):
+        """Test digests for several users reuse one connection to a real SMTP server"""
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+
+        handler = RecordingHandler()
+        controller = Controller(handler, hostname='127.0.0.1', port=port)
+        controller.start()
+        try:
+            pool = SMTPPool('127.0.0.1', port)
+            notifier = self.make_notifier(pool)
+            notifier.queue(self.reporter.id, 'status', 'Status berubah menjadi resolved.')
+            notifier.queue(self.other.id, 'comment', 'Tanggapan resmi: terima kasih.')
+            self.run_due_jobs()
+            pool.close()
+        finally:
+            controller.stop()
+
+        self.assertEqual(sorted(e.rcpt_tos[0] for e in handler.messages),
+                         ['other@example.com', 'reporter@example.com'])
+        self.assertEqual(len(handler.sessions), 1)
+        self.assertEqual(pool.connections_opened, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import json
+import tempfile
+import threading
+from testing import AppTestCase
+from app import db, Category, slow_query_log
+from query_log import normalize_statement, summarize, read_entries
+
+class QueryLogTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original = (slow_query_log.threshold, slow_query_log.log_file)
+        slow_query_log.log_file = os.path.join(self.tmpdir.name, 'slow.log')
+
+    def tearDown(self):
+        slow_query_log.flush()
+        slow_query_log.threshold, slow_query_log.log_file = self.original
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def test_normalize_statement(self):
+        """Test literals and placeholder lists collapse to one shape"""
+        self.assertEqual(
+            normalize_statement("SELECT * FROM report WHERE id IN (?, ?, ?) AND status = 'pending'"),
+            "SELECT * FROM report WHERE id IN (...) AND status = ?"
+        )
+        self.assertEqual(
+            normalize_statement("SELECT *\n  FROM report LIMIT 10"),
+            normalize_statement("SELECT * FROM report LIMIT 25")
+        )
+
+    def test_summarize_groups_by_statement(self):
+        """Test summary groups entries and sorts by total time"""
+        entries = [
+            {'statement': 'SELECT * FROM report WHERE id = 1', 'duration_ms': 10, 'route': {'endpoint': 'view_report'}},
+            {'statement': 'SELECT * FROM report WHERE id = 2', 'duration_ms': 30, 'route': {'endpoint': 'view_report'}},
+            {'statement': 'SELECT count(*) FROM user', 'duration_ms': 15, 'route': None},
+        ]
+        summary = summarize(entries)
+        self.assertEqual(len(summary), 2)
+        self.assertEqual(summary[0]['count'], 2)
+        self.assertEqual(summary[0]['total_ms'], 40)
+        self.assertEqual(summary[0]['max_ms'], 30)
+        self.assertEqual(summary[0]['routes'], ['view_report'])
+
+    def test_slow_query_is_logged_with_plan_and_route(self):
+        """Test a request over the threshold writes an entry off-thread"""
+        db.session.add(Category(name='Test Category', icon='🧪'))
+        db.session.commit()
+
+        slow_query_log.threshold = 0
+        response = self.client.get('/api/categories')
+        self.assertEqual(response.status_code, 200)
+        slow_query_log.flush()
+
+        entries = list(read_entries(slow_query_log.log_file))
+        category_entries = [e for e in entries if 'FROM category' in e['statement']]
+        self.assertTrue(category_entries)
+        entry = category_entries[0]
+        self.assertEqual(entry['route']['endpoint'], 'api_get_categories')
+        self.assertTrue(entry['plan'])
+        json.dumps(entry['parameters'])
+
+    def test_explain_runs_on_the_listener_thread(self):
+        """Test EXPLAIN is not run on the request thread"""
+        threads = []
+        explain = slow_query_log._explain
+        slow_query_log._explain = lambda query: threads.append(threading.current_thread()) or explain(query)
+        try:
+            slow_query_log.threshold = 0
+            self.assertEqual(self.client.get('/api/categories').status_code, 200)
+            slow_query_log.flush()
+        finally:
+            del slow_query_log._explain
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+
+if __name__ == '__main__':
+    unittest.main()
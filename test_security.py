@@ -0,0 +1,133 @@
+import os
+import time
+import unittest
+import tempfile
+from security import (gcra, parse_limit, MemoryRateLimitStore, SQLiteRateLimitStore, LoginThrottle, SQLiteLoginStore,
+                      sanitize_input, user_markup)
+
+class RateLimitTestCase(unittest.TestCase):
+    def test_parse_limit(self):
+        self.assertEqual(parse_limit('300/minute'), (300, 60))
+        self.assertEqual(parse_limit('10/hours'), (10, 3600))
+        self.assertEqual(parse_limit('100/30'), (100, 30))
+
+    def test_gcra_allows_burst_then_paces(self):
+        tat, now = None, 1000.0
+        for _ in range(5):
+            allowed, tat = gcra(tat, now, 5, 10)
+            self.assertTrue(allowed)
+        allowed, tat = gcra(tat, now, 5, 10)
+        self.assertFalse(allowed)
+
+        # One request is earned back every window / limit seconds
+        self.assertFalse(gcra(tat, now + 1.9, 5, 10)[0])
+        self.assertTrue(gcra(tat, now + 2.0, 5, 10)[0])
+
+    def test_memory_store_is_bounded(self):
+        store = MemoryRateLimitStore(maxsize=100)
+        for i in range(1000):
+            store.hit(f'ip:{i}', 0.0, 10, 60)
+        self.assertEqual(len(store._tats), 100)
+
+    def test_sqlite_store_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'ratelimit.db')
+            first, second = SQLiteRateLimitStore(path), SQLiteRateLimitStore(path)
+            self.assertTrue(first.hit('ip:1', 0.0, 2, 60)[0])
+            self.assertTrue(second.hit('ip:1', 0.0, 2, 60)[0])
+            self.assertFalse(first.hit('ip:1', 0.0, 2, 60)[0])
+            self.assertTrue(second.hit('ip:2', 0.0, 2, 60)[0])
+
+class LoginThrottleTestCase(unittest.TestCase):
+    def test_username_and_ip_limits(self):
+        throttle = LoginThrottle(max_attempts=3, max_attempts_per_ip=5, window=60)
+        for _ in range(3):
+            self.assertEqual(throttle.retry_after('budi', '10.0.0.1'), 0)
+            throttle.failed('budi', '10.0.0.1')
+        self.assertGreater(throttle.retry_after('Budi', '10.0.0.9'), 0)
+        self.assertEqual(throttle.retry_after('siti', '10.0.0.1'), 0)
+
+        throttle.failed('siti', '10.0.0.1')
+        throttle.failed('andi', '10.0.0.1')
+        self.assertGreater(throttle.retry_after('rina', '10.0.0.1'), 0)
+        self.assertEqual(throttle.retry_after('rina', '10.0.0.2'), 0)
+
+        throttle.succeeded('budi')
+        self.assertEqual(throttle.retry_after('budi', '10.0.0.9'), 0)
+
+    def test_sqlite_store_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'ratelimit.db')
+            first, second = LoginThrottle(max_attempts=2), LoginThrottle(max_attempts=2)
+            first.store, second.store = SQLiteLoginStore(path), SQLiteLoginStore(path)
+            first.failed('budi', '10.0.0.1')
+            second.failed('budi', '10.0.0.2')
+            self.assertGreater(first.retry_after('budi', '10.0.0.3'), 0)
+            for _ in range(5):
+                first.failed('budi', '10.0.0.1')
+            self.assertEqual(len(second.store.recent('user:budi', time.time(), 60)), 2)
+            second.succeeded('budi')
+            self.assertEqual(first.retry_after('budi', '10.0.0.3'), 0)
+
+    def test_window_slides(self):
+        throttle = LoginThrottle(max_attempts=2, window=0.05)
+        throttle.failed('budi', '10.0.0.1')
+        throttle.failed('budi', '10.0.0.1')
+        self.assertEqual(throttle.retry_after('budi', '10.0.0.1'), 1)
+        time.sleep(0.06)
+        self.assertEqual(throttle.retry_after('budi', '10.0.0.1'), 0)
+
+    def test_memory_is_bounded(self):
+        throttle = LoginThrottle(max_attempts=5, max_keys=1000)
+        for i in range(10000):
+            throttle.failed(f'user{i}', f'10.0.{i // 256}.{i % 256}')
+        self.assertEqual(len(throttle.store._failures), 1000)
+
+class SanitizeInputTestCase(unittest.TestCase):
+    def test_plain_text_is_kept(self):
+        self.assertEqual(sanitize_input('  a < b, c > d, onclick= javascript: '), 'a < b, c > d, onclick= javascript:')
+        self.assertEqual(sanitize_input(None), '')
+
+    def test_unterminated_angle_brackets_are_text(self):
+        for text in ('Air naik <dalam 2 jam, tolong cek jembatan', 'kadar PM2.5 <PM10 di area pabrik',
+                     'a <3 b', 'catatan <!-- belum selesai', 'teks <script src=x'):
+            self.assertEqual(sanitize_input(text), text)
+
+    def test_user_markup_renders_only_kept_tags(self):
+        text = sanitize_input('<p>Air <b onclick="x()">meluap</b></p> kadar <PM10')
+        self.assertEqual(str(user_markup(text)), '<p>Air <b>meluap</b></p> kadar &lt;PM10')
+        self.assertEqual(str(user_markup('&lt;b&gt; <i class="x">')), '&amp;lt;b&amp;gt; &lt;i class=&#34;x&#34;&gt;')
+
+    def test_unbalanced_tags_are_closed(self):
+        self.assertEqual(str(user_markup('<b>penting <i>sekali')), '<b>penting <i>sekali</i></b>')
+        self.assertEqual(str(user_markup('</ul>teks</b><br>')), 'teks<br>')
+        self.assertEqual(str(user_markup('<ul><li>satu</ul>')), '<ul><li>satu</li></ul>')
+        self.assertEqual(sanitize_input('<p>Air <b>meluap</p></b> '), '<p>Air <b>meluap</b></p>')
+        self.assertEqual(sanitize_input('<ol><li>satu '), '<ol><li>satu</li></ol>')
+
+    def test_allowed_tags_lose_their_attributes(self):
+        self.assertEqual(sanitize_input('<P class="x" onclick="steal()">Air <B\nonmouseover=1>meluap</B><br/></p>'),
+                         '<p>Air <b>meluap</b><br></p>')
+
+    def test_other_markup_is_stripped(self):
+        cases = {
+            '<a href="javascript:alert(1)">link</a>': 'link',
+            '<img src=x onerror=alert(1)>foto': 'foto',
+            '<ScRiPt>alert(1)</sCrIpT >ok': 'ok',
+            '<svg><script>alert(1)</script></svg>ok': 'ok',
+            '<style>body{}</style><!-- note -->ok<!DOCTYPE html>': 'ok',
+            '<iframe src="data:text/html,x">': '',
+            '<scr<script>ipt>alert(1)</script>ok': '<scrok',
+            'teks <script>alert(1)': 'teks',
+        }
+        for text, expected in cases.items():
+            self.assertEqual(sanitize_input(text), expected, text)
+
+    def test_pathological_input_is_linear(self):
+        start = time.perf_counter()
+        for text in ('<a "' * 20000, '<script>' + '<' * 50000, '<!--' * 20000, '<' * 50000):
+            sanitize_input(text)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
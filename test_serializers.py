@@ -0,0 +1,105 @@
+import json
+import unittest
+from datetime import datetime
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from testing import AppTestCase
+from app import db, User, Category, Report, Comment
+from werkzeug.security import generate_password_hash
+from serializers import (ORJSONProvider, RowSerializer, report_serializer, report_summary_serializer,
+                         comment_serializer, isoformat)
+
+class SerializersTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+
+        user = User(username='reporter', email='reporter@example.com',
+                    password_hash=generate_password_hash('pass'), full_name='Reporter')
+        category = Category(name='Sampah Ilegal', description='Pembuangan sampah', icon='🗑️')
+        db.session.add_all([user, category])
+        db.session.commit()
+        self.report = Report(title='Sampah', description='Tumpukan sampah', location='Jl. Merdeka',
+                             latitude=-6.2, category_id=category.id, user_id=user.id,
+                             created_at=datetime(2024, 5, 1, 8, 30), updated_at=datetime(2024, 5, 2, 9, 0))
+        db.session.add(self.report)
+        db.session.commit()
+        db.session.add(Comment(content='Segera ditangani', report_id=self.report.id, user_id=user.id))
+        db.session.commit()
+
+    def test_rows_build_nested_payloads(self):
+        """Test rows are turned into nested payloads"""
+        serializer = report_serializer()
+        rows = db.session.execute(serializer.select()).all()
+        self.assertEqual(serializer.rows(rows), [{
+            'id': self.report.id,
+            'title': 'Sampah',
+            'description': 'Tumpukan sampah',
+            'location': 'Jl. Merdeka',
+            'latitude': -6.2,
+            'longitude': None,
+            'status': 'pending',
+            'priority': 'medium',
+            'created_at': '2024-05-01T08:30:00',
+            'updated_at': '2024-05-02T09:00:00',
+            'category': {'id': 1, 'name': 'Sampah Ilegal', 'icon': '🗑️'},
+            'reporter': {'id': 1, 'username': 'reporter', 'full_name': 'Reporter'},
+        }])
+
+        comments = comment_serializer().rows(db.session.execute(comment_serializer().select()))
+        self.assertEqual(comments[0]['author'], {'id': 1, 'full_name': 'Reporter'})
+        self.assertFalse(comments[0]['is_official'])
+
+    def test_dump_matches_rows(self):
+        """Test dumping a model matches serializing its row"""
+        for serializer in (report_serializer(), report_summary_serializer()):
+            row = db.session.execute(serializer.select()).first()
+            self.assertEqual(serializer.dump(self.report), serializer(row))
+
+    def test_only_selects_and_joins_what_is_requested(self):
+        """Test only() selects the requested columns and joins"""
+        serializer = report_serializer().only(['title', 'latitude', 'longitude', 'created_at'])
+        self.assertEqual(serializer.keys, ['id', 'title', 'latitude', 'longitude', 'created_at'])
+        sql = str(serializer.select())
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('description', sql)
+
+        serializer = report_serializer().only(['reporter.full_name'])
+        self.assertEqual(serializer(db.session.execute(serializer.select()).first()),
+                         {'id': self.report.id, 'reporter': {'full_name': 'Reporter'}})
+        self.assertEqual(str(serializer.select()).count('JOIN'), 1)
+        self.assertIs(report_serializer().only(['reporter.full_name']), serializer)
+
+        with self.assertRaises(ValueError):
+            report_serializer().only(['title', 'reporter.password_hash'])
+
+    def test_converters_and_keys(self):
+        """Test converters are applied and dotted keys nest"""
+        serializer = RowSerializer({'a': Report.id, 'b.c': (Report.title, str.upper), 'b.d': Report.created_at},
+                                   Report)
+        self.assertEqual(serializer((1, 'x', None)), {'a': 1, 'b': {'c': 'X', 'd': None}})
+        self.assertIsNone(isoformat(None))
+
+class ORJSONProviderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.orjson = ORJSONProvider(self.app)
+        self.stdlib = DefaultJSONProvider(self.app)
+
+    def test_same_documents_as_stdlib(self):
+        """Test orjson produces the same documents as the json module"""
+        value = {'b': [1, 2.5, None, True], 'a': 'Laporan 🗑️', 'when': datetime(2024, 5, 1, 8, 30)}
+        self.assertEqual(json.loads(self.orjson.dumps(value)), json.loads(self.stdlib.dumps(value)))
+        self.assertEqual(self.orjson.dumps({'b': 1, 'a': 2}), '{"a":2,"b":1}')
+        self.assertEqual(self.orjson.loads(b'{"a": [1]}'), {'a': [1]})
+
+        with self.app.test_request_context():
+            response = self.orjson.response(value)
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(json.loads(response.get_data()), json.loads(self.stdlib.response(value).get_data()))
+
+    def test_falls_back_for_stdlib_arguments(self):
+        """Test arguments orjson does not support fall back to the json module"""
+        self.assertEqual(self.orjson.dumps({'a': 1}, indent=1), '{\n "a": 1\n}')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from serve import Server, default_options, shared_state_defaults
+
+class ServeTestCase(unittest.TestCase):
+    def test_defaults_follow_cpu_count(self):
+        options = default_options({}, cpu_count=4)
+        self.assertEqual(options['bind'], '0.0.0.0:5000')
+        self.assertEqual(options['worker_class'], 'gthread')
+        self.assertEqual(options['workers'], 9)
+        self.assertEqual(options['threads'], 8)
+        self.assertTrue(options['preload_app'])
+        self.assertEqual(options['max_requests_jitter'], 100)
+
+        self.assertEqual(default_options({}, cpu_count=1)['threads'], 4)
+
+    def test_environment_overrides(self):
+        options = default_options({'PORT': '8080', 'WEB_CONCURRENCY': '3', 'GUNICORN_THREADS': '16',
+                                   'GUNICORN_KEEPALIVE': '75', 'GUNICORN_PIDFILE': '/tmp/ecoreport.pid'},
+                                  cpu_count=4)
+        self.assertEqual(options['bind'], '0.0.0.0:8080')
+        self.assertEqual((options['workers'], options['threads'], options['keepalive']), (3, 16, 75))
+        self.assertEqual(options['pidfile'], '/tmp/ecoreport.pid')
+
+    def test_shared_state_defaults(self):
+        self.assertEqual(shared_state_defaults({})['RATELIMIT_STORAGE'], 'sqlite')
+        self.assertEqual(shared_state_defaults({})['CACHE_BACKEND'], 'sqlite')
+        self.assertEqual(shared_state_defaults({})['RATELIMIT_TRUSTED_PROXIES'], '1')
+        self.assertEqual(shared_state_defaults({'RATELIMIT_TRUSTED_PROXIES': '0'})['RATELIMIT_TRUSTED_PROXIES'], '0')
+        self.assertEqual(shared_state_defaults({'RATELIMIT_STORAGE': 'redis'})['RATELIMIT_STORAGE'], 'redis')
+
+    def test_command_line_wins(self):
+        server = Server(default_options({}, cpu_count=2), ['--workers', '2', '--log-level', 'debug'])
+        self.assertEqual(server.cfg.workers, 2)
+        self.assertEqual(server.cfg.loglevel, 'debug')
+        self.assertEqual(server.cfg.threads, 4)
+        self.assertTrue(server.cfg.preload_app)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import os
+import time
+import tempfile
+from tasks import TaskQueue, Worker, QUEUED, DONE, FAILED, PRIORITY_HIGH
+
+class TaskQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue = TaskQueue(os.path.join(self.tmpdir.name, 'tasks.db'), max_retries=2, backoff_base=0)
+        self.calls = []
+
+        @self.queue.task('record')
+        def record(value):
+            self.calls.append(value)
+            return {'value': value}
+
+        @self.queue.task('explode')
+        def explode():
+            self.calls.append('boom')
+            raise RuntimeError('boom')
+
+        self.worker = Worker(self.queue)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_runs_by_priority_then_fifo(self):
+        """Test higher priority jobs run first, equal priorities in order"""
+        self.queue.enqueue('record', 'first')
+        self.queue.enqueue('record', 'second')
+        self.queue.enqueue('record', 'urgent', priority=PRIORITY_HIGH)
+
+        while self.worker.run_once():
+            pass
+        self.assertEqual(self.calls, ['urgent', 'first', 'second'])
+
+    def test_result_and_status(self):
+        """Test finished jobs keep their result"""
+        job_id = self.queue.enqueue('record', 42, owner_id=7)
+        self.assertEqual(self.queue.get(job_id)['status'], QUEUED)
+
+        self.worker.run_once()
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], DONE)
+        self.assertEqual(job['result'], {'value': 42})
+        self.assertEqual(job['owner_id'], 7)
+
+    def test_retries_with_backoff_then_fails(self):
+        """Test a failing job is retried max_retries times before failing"""
+        self.queue.backoff_base = 60
+        job_id = self.queue.enqueue('explode')
+        self.worker.run_once()
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], QUEUED)
+        self.assertIn('RuntimeError', job['error'])
+        # Backoff pushes the retry into the future
+        self.assertFalse(self.worker.run_once())
+
+        self.queue.backoff_base = 0
+        self.queue._connect().execute('UPDATE jobs SET run_at = 0')
+        while self.worker.run_once():
+            pass
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], FAILED)
+        self.assertEqual(job['attempts'], 3)
+        self.assertEqual(self.calls, ['boom'] * 3)
+
+    def test_unique_key_coalesces_queued_jobs(self):
+        """Test repeated enqueues with a unique key share one waiting job"""
+        first = self.queue.enqueue('record', 1, unique_key='rebuild')
+        self.assertEqual(self.queue.enqueue('record', 2, unique_key='rebuild'), first)
+
+        self.worker.run_once()
+        self.assertNotEqual(self.queue.enqueue('record', 3, unique_key='rebuild'), first)
+
+    def test_stale_running_job_is_recovered(self):
+        """Test jobs left running by a dead worker are requeued after the lease"""
+        job_id = self.queue.enqueue('record', 'lost')
+        self.queue.claim('dead-worker')
+        self.assertEqual(self.queue.recover_stale(), 0)
+
+        self.queue.lease = 0
+        time.sleep(0.01)
+        self.assertEqual(self.queue.recover_stale(), 1)
+        self.worker.run_once()
+        self.assertEqual(self.queue.get(job_id)['status'], DONE)
+        self.assertEqual(self.queue.get(job_id)['attempts'], 2)
+
+    def test_stalled_counts_overdue_jobs_without_a_worker(self):
+        """Test overdue jobs count as stalled until a worker claims one"""
+        self.queue.enqueue('record', 'late', delay=-600)
+        self.queue.enqueue('record', 'new')
+        self.assertEqual(self.queue.stalled(), 1)
+        self.worker.run_once()
+        self.assertEqual(self.queue.stalled(), 0)
+
+    def test_eager_mode_runs_inline(self):
+        """Test eager queues run jobs during enqueue"""
+        self.queue.eager = True
+        job_id = self.queue.enqueue('record', 'now')
+        self.assertEqual(self.calls, ['now'])
+        self.assertEqual(self.queue.get(job_id)['status'], DONE)
+
+if __name__ == '__main__':
+    unittest.main()
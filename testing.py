@@ -0,0 +1,64 @@
+"""
+Shared test setup untuk EcoReport Application
+
+app.py creates its engine, task queue and event bus from DATABASE_URL,
+TASKS_DB_PATH and EVENTS_DB_PATH when it is imported, so test modules
+import this module before app: the suite then runs against throwaway
+SQLite files and never touches the databases in instance/.
+"""
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+import unittest
+
+if 'app' in sys.modules:
+    raise ImportError('import testing before app, the app engine would point at the real database')
+
+TEST_DIR = tempfile.mkdtemp(prefix='ecoreport-tests-')
+atexit.register(shutil.rmtree, TEST_DIR, ignore_errors=True)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEST_DIR, 'test.db')
+os.environ['TASKS_DB_PATH'] = os.path.join(TEST_DIR, 'tasks.db')
+os.environ['EVENTS_DB_PATH'] = os.path.join(TEST_DIR, 'events.db')
+
+from app import app, db, cache, events, identities, recent_feed, task_queue  # noqa: E402
+from security import login_throttle  # noqa: E402
+
+
+class AppTestCase(unittest.TestCase):
+    """Empty tables, cleared caches and a pushed app context around every test
+
+    Every test also gets its own job queue and event log, reopened
+    afterwards on the session-wide ones.
+    """
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['RATELIMIT_ENABLED'] = False
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        cache.clear()
+        identities.clear()
+        recent_feed.reset()
+        login_throttle.reset()
+
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.original_paths = (task_queue.path, events.path, app.config['TASKS_DB_PATH'], app.config['EVENTS_DB_PATH'])
+        app.config['TASKS_DB_PATH'] = os.path.join(self.data_dir.name, 'tasks.db')
+        app.config['EVENTS_DB_PATH'] = os.path.join(self.data_dir.name, 'events.db')
+        task_queue.open(app.config['TASKS_DB_PATH'])
+        events.open(app.config['EVENTS_DB_PATH'])
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        tasks_path, events_path, app.config['TASKS_DB_PATH'], app.config['EVENTS_DB_PATH'] = self.original_paths
+        task_queue.open(tasks_path)
+        events.open(events_path)
+        self.data_dir.cleanup()